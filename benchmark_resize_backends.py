@@ -0,0 +1,100 @@
+# benchmark_resize_backends.py
+import argparse
+
+from src.file_discovery import FileDiscovery
+from src.file_tools import FileTools
+import numpy as np
+import os
+from pathlib import Path
+from PIL import Image
+import tempfile
+import time
+
+"""
+Description: Compare the resize backends of FileTools.create_numpy_archive_from_images_dir on throughput and output
+fidelity. Without a source directory, synthetic JPEGs are generated. Fidelity is measured against a reference
+resize of the full resolution image with PIL's Lanczos filter.
+
+Example usage:
+py benchmark_resize_backends.py
+py benchmark_resize_backends.py -s C:/temp/Images -ns 64,64,3
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark image resize backends for numpy archives.')
+    parser.add_argument('-s', '--src_dir', type=str, default='',
+                        help='Directory of images; synthetic JPEGs are generated if not given')
+    parser.add_argument('-ext', '--suffix', type=str, default='.jpg',
+                        help='Suffix/extension of images')
+    parser.add_argument('-ns', '--new_shape', type=str, default='64,64,3',
+                        help='Target shape of resized images, comma separated')
+    parser.add_argument('-n', '--count', type=int, default=50,
+                        help='Number of synthetic images')
+    parser.add_argument('-is', '--image_size', type=str, default='1200,1600',
+                        help='Height and width of synthetic images, comma separated')
+
+    args = parser.parse_args()
+
+    return args
+
+
+def make_synthetic_images(target_dir: str, count: int, height: int, width: int):
+    """Save smooth gradients with noise as JPEGs, roughly as compressible as photographs."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    for i in range(count):
+        channels = [(np.sin((x * (i % 5 + 1) + y * c) / 197.0) + 1) * 100 for c in range(1, 4)]
+        image = np.stack(channels, axis=-1) + rng.normal(0, 10, size=(height, width, 3))
+        Image.fromarray(np.clip(image, 0, 255).astype(np.uint8)).save(os.path.join(target_dir, f'{i:04d}.jpg'),
+                                                                      quality=90)
+
+
+def reference_image(image_path: str, new_shape: tuple) -> np.ndarray:
+    """Resize a full resolution image with a high quality filter, as the reference for fidelity."""
+    with Image.open(image_path) as img:
+        img = img.convert({1: 'L', 3: 'RGB', 4: 'RGBA'}[new_shape[2]]) if len(new_shape) > 2 else img
+        resized = np.asarray(img.resize((new_shape[1], new_shape[0]), resample=Image.LANCZOS), dtype=np.float64)
+
+    return resized.reshape(new_shape) if len(new_shape) > 2 else resized
+
+
+def main():
+    args = parse_args()
+    new_shape = tuple(int(size) for size in args.new_shape.split(','))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        src_dir = args.src_dir
+        suffix = args.suffix
+        if not src_dir:
+            src_dir = os.path.join(temp_dir, 'images')
+            Path(src_dir).mkdir()
+            height, width = [int(size) for size in args.image_size.split(',')]
+            make_synthetic_images(src_dir, args.count, height, width)
+            suffix = '.jpg'
+
+        count = len(list(FileDiscovery.iter_file_paths(src_dir, suffix, recursive=False)))
+        archives = {}
+        for backend in FileTools.RESIZE_BACKENDS:
+            target_path = os.path.join(temp_dir, backend)
+            start = time.perf_counter()
+            FileTools.create_numpy_archive_from_images_dir(src_dir, target_path, new_shape=new_shape, suffix=suffix,
+                                                           resize_backend=backend)
+            seconds = time.perf_counter() - start
+            archives[backend] = np.load(target_path + '.npy')
+            print(f'{backend}: {count} images in {seconds:.2f}s, {count / seconds:.1f} images/s, '
+                  f'archive {archives[backend].dtype} {archives[backend].nbytes / 1e6:.1f} MB')
+
+        # Same order as the archives
+        image_paths = list(FileDiscovery.iter_file_paths(src_dir, suffix, recursive=False))
+        reference = np.stack([reference_image(image_path, new_shape) for image_path in image_paths])
+        for backend, archive in archives.items():
+            difference = archive.astype(np.float64) - reference
+            mse = np.mean(difference ** 2)
+            psnr = 10 * np.log10(255 ** 2 / mse) if mse > 0 else float('inf')
+            print(f'{backend} vs reference: mean absolute difference {np.mean(np.abs(difference)):.2f}, '
+                  f'PSNR {psnr:.1f} dB')
+
+
+if __name__ == '__main__':
+    main()
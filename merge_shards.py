@@ -0,0 +1,47 @@
+# merge_shards.py
+import argparse
+import datetime
+
+from src.shard_tools import ShardTools
+
+"""
+Description: Merge the collated outputs of a sharded tokenize_meta_data.py run into a single collated file.
+
+Example usage:
+py merge_shards.py -td C:/temp/TableMetaData/Results
+py merge_shards.py -td C:/temp/TableMetaData/Results -dd -dc
+py merge_shards.py -td C:/temp/TableMetaData/Results -n 4
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Merge collated outputs of shards of tokenize_meta_data.py runs.')
+    parser.add_argument('-td', '--target_dir', type=str, required=True,
+                        help='Target directory of the sharded run, holding the shard directories')
+    parser.add_argument('-n', '--shards', type=int, default=None,
+                        help='Number of shards of the run to merge, needed if target_dir also holds shard '
+                             'directories of runs with other shard counts')
+    parser.add_argument('-ext', '--suffix', type=str, default='.txt',
+                        help='Suffix/extension of collated files')
+    parser.add_argument('-dd', '--deduplicate', action='store_true',
+                        help='Drop rows of the collated output duplicating an earlier row in Fields, '
+                             'Tokenized Descriptors and Labels')
+    parser.add_argument('-dc', '--dedup_counts', action='store_true',
+                        help='With -dd, add columns Count and Sources, the occurrences and sources of each row')
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = parse_args()
+
+    prefix = datetime.datetime.now().strftime('%y%m%d_%H%M%S')
+    ShardTools.merge_shard_outputs(args.target_dir, save_name=f'collated{args.suffix}', prefix=prefix,
+                                   deduplicate=args.deduplicate, with_counts=args.dedup_counts,
+                                   with_sources=args.dedup_counts, count=args.shards)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# split_labelled_data.py
+import argparse
+
+from src.dataset_splitter import DatasetSplitter
+import os
+from pathlib import Path
+
+"""
+Description: Split the output of tokenize_labelled_meta_data.py into train, validation and test files, stratified by 
+label.
+
+Example usage:
+py split_labelled_data.py -s "C:/temp/TableMetaData/Results/220101_120000labelled.txt" -td C:/temp/TableMetaData/Splits
+py split_labelled_data.py -s "C:/temp/TableMetaData/Results/220101_120000labelled.txt" -td C:/temp/TableMetaData/Splits -r 0.7,0.15,0.15 -b
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Split labelled, tokenized data into train, validation and test files.')
+    parser.add_argument('-s', '--src_path', type=str, required=True,
+                        help='Labelled file output by tokenize_labelled_meta_data.py (tokenized or bert type)')
+    parser.add_argument('-td', '--target_dir', type=str, default=Path(__file__).parent,
+                        help='Directory for saving split files')
+    parser.add_argument('-r', '--ratios', type=str, default='0.8,0.1,0.1',
+                        help='Ratios of train, validation and test splits')
+    parser.add_argument('-sd', '--seed', type=str, default='',
+                        help='Seed for the hash assignment of rows to splits')
+    parser.add_argument('-b', '--balanced', action='store_true',
+                        help='Divide each label\'s rows in the split ratios to within one row')
+
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = parse_args()
+
+    label_counts = DatasetSplitter.split_file(args.src_path, args.target_dir,
+                                              ratios=DatasetSplitter.parse_ratios(args.ratios),
+                                              seed=args.seed, balanced=args.balanced)
+
+    for split, counts in label_counts.items():
+        print(f'{split}: {sum(counts.values())} rows saved to '
+              f'{os.path.join(args.target_dir, f"{split}_{Path(args.src_path).name}")}')
+
+
+if __name__ == '__main__':
+    main()
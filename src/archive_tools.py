@@ -0,0 +1,191 @@
+# archive_tools.py
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import lzma
+import os
+import tarfile
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class ParallelCompressedWriter:
+    """Write-only file object that compresses fixed size chunks in parallel threads.
+
+    Each chunk is compressed independently and written out in order, giving a multi-member gzip file or a
+    multi-stream xz file. Both are valid for the standard gzip/xz tools and for Python's tarfile, and zlib/lzma
+    release the GIL while compressing, so chunks are compressed concurrently.
+
+    With compression None, data is stored as is.
+    """
+
+    def __init__(self, outfile, compression: str = None, compress_level: int = None, workers: int = None,
+                 chunk_size: int = 16 * 1024 * 1024, progress_interval: float = 10.0):
+        """
+        :param outfile: Binary file object to write the final output to.
+        :param compression: One of None, 'gzip', 'xz' (default: None).
+        :param compress_level: Compression level, None for the codec default.
+        :param workers: Number of compressing threads (default: None, number of CPUs).
+        :param chunk_size: Size in bytes of each independently compressed chunk (default: 16 MiB).
+        :param progress_interval: Seconds between progress messages, 0 to disable (default: 10.0).
+        """
+        self.outfile = outfile
+        self.compress_chunk = ArchiveTools.chunk_compressor(compression, compress_level)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.progress_interval = progress_interval
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.start = time.perf_counter()
+
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._last_progress = self.start
+        self._executor = ThreadPoolExecutor(max_workers=self.workers) if self.compress_chunk else None
+
+    def write(self, data) -> int:
+        self.bytes_in += len(data)
+        if self.compress_chunk is None:
+            self._write_out(data)
+        else:
+            self._buffer += data
+            while len(self._buffer) >= self.chunk_size:
+                self._submit(bytes(self._buffer[:self.chunk_size]))
+                del self._buffer[:self.chunk_size]
+
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """Compress any remaining data and wait for all chunks to be written. Does not close outfile."""
+        if self._executor is not None:
+            if len(self._buffer) > 0:
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            while self._pending:
+                self._write_out(self._pending.popleft().result())
+            self._executor.shutdown()
+            self._executor = None
+
+    def abort(self):
+        """Discard pending chunks and shut down the compressing threads, e.g. after a failure. No-op once closed."""
+        if self._executor is not None:
+            for future in self._pending:
+                future.cancel()
+            self._pending.clear()
+            self._executor.shutdown()
+            self._executor = None
+
+    def _submit(self, chunk: bytes):
+        self._pending.append(self._executor.submit(self.compress_chunk, chunk))
+        # Bound memory: at most two chunks in flight per worker
+        while len(self._pending) > 2 * self.workers:
+            self._write_out(self._pending.popleft().result())
+
+    def _write_out(self, data):
+        self.outfile.write(data)
+        self.bytes_out += len(data)
+
+        now = time.perf_counter()
+        if self.progress_interval and now - self._last_progress >= self.progress_interval:
+            self._last_progress = now
+            print(ArchiveTools.throughput_message(self.bytes_in, self.bytes_out, now - self.start))
+
+
+class ArchiveTools:
+    """Utilities for creating tar archives with tunable, multi-threaded compression"""
+
+    FORMAT_EXTENSIONS = {'tar': '.tar', 'gztar': '.tar.gz', 'xztar': '.tar.xz', 'zsttar': '.tar.zst'}
+    """Supported archive formats and their file extensions."""
+
+    @staticmethod
+    def chunk_compressor(compression: str, compress_level: int = None):
+        """Return a function compressing a single chunk of bytes into a self-contained member/stream.
+
+        :param compression: One of None, 'gzip', 'xz'.
+        :param compress_level: Compression level, None for the codec default.
+        :return: Function bytes -> bytes, or None if storing only.
+        """
+        if compression is None:
+            return None
+        if compression == 'gzip':
+            level = 6 if compress_level is None else compress_level
+            return lambda chunk: gzip.compress(chunk, compresslevel=level)
+        if compression == 'xz':
+            preset = 6 if compress_level is None else compress_level
+            return lambda chunk: lzma.compress(chunk, preset=preset)
+
+        raise ValueError(f'Unsupported chunk compression: {compression}')
+
+    @staticmethod
+    def throughput_message(bytes_in: int, bytes_out: int, seconds: float) -> str:
+        rate = (bytes_in / 1e6) / seconds if seconds > 0 else 0.0
+        return f'{bytes_in / 1e6:.1f} MB archived to {bytes_out / 1e6:.1f} MB in {seconds:.1f}s, {rate:.1f} MB/s'
+
+    @staticmethod
+    def make_tar_archive(base_name: str, format: str, root_dir: str, base_dir: str, compress_level: int = None,
+                         workers: int = None, chunk_size: int = 16 * 1024 * 1024,
+                         progress_interval: float = 10.0) -> str:
+        """Make a tar archive, streaming files into multi-threaded compression.
+
+        Formats:
+        - tar: store only, best for already compressed content such as JPEG images
+        - gztar: gzip, compressed in parallel chunks
+        - xztar: xz, compressed in parallel chunks
+        - zsttar: zstandard, using its own worker threads; requires the zstandard package
+
+        Keyword arguments:
+        :param base_name: str, the full path of the file to create, minus any format-specific extension
+        :param format: str, the archive format, one of FORMAT_EXTENSIONS
+        :param root_dir: str, directory that paths in the archive are relative to
+        :param base_dir: str, directory within root_dir to archive
+        :param compress_level: int, compression level, None for the codec default
+        :param workers: int, number of compressing threads (default: None, number of CPUs)
+        :param chunk_size: int, size in bytes of each independently compressed chunk (default: 16 MiB)
+        :param progress_interval: float, seconds between progress messages, 0 to disable (default: 10.0)
+        :return: path of the archive file; on failure, the partial archive is deleted
+        """
+        if format not in ArchiveTools.FORMAT_EXTENSIONS:
+            raise ValueError(f'Unsupported archive format: {format}')
+        if format == 'zsttar' and zstandard is None:
+            raise ValueError('Archive format zsttar requires the zstandard package.')
+
+        archive_path = base_name + ArchiveTools.FORMAT_EXTENSIONS[format]
+        compression = {'gztar': 'gzip', 'xztar': 'xz'}.get(format)
+
+        try:
+            with open(archive_path, 'wb') as raw_file:
+                if format == 'zsttar':
+                    compressor = zstandard.ZstdCompressor(level=3 if compress_level is None else compress_level,
+                                                          threads=workers or -1)
+                    outfile = compressor.stream_writer(raw_file, closefd=False)
+                else:
+                    outfile = raw_file
+
+                writer = ParallelCompressedWriter(outfile, compression, compress_level, workers, chunk_size,
+                                                  progress_interval)
+                try:
+                    with tarfile.open(fileobj=writer, mode='w|') as tar:
+                        tar.add(os.path.join(root_dir, base_dir), arcname=base_dir)
+                    writer.close()
+                finally:
+                    writer.abort()
+
+                if outfile is not raw_file:
+                    outfile.close()
+                bytes_out = raw_file.tell()
+        except BaseException:
+            # A truncated archive must not be left under the final name
+            if os.path.isfile(archive_path):
+                os.remove(archive_path)
+            raise
+
+        print(ArchiveTools.throughput_message(writer.bytes_in, bytes_out, time.perf_counter() - writer.start))
+
+        return archive_path
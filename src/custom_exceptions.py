@@ -1,2 +1,10 @@
 class DataFrameException(Exception):
     """Custom exception class for DataFrame issues"""
+
+
+class FileProcessingException(Exception):
+    """Custom exception class for a file that failed in an isolated worker, e.g. timed out or ran out of memory"""
+
+
+class RunJournalException(Exception):
+    """Custom exception class for a run that cannot resume from its journal, e.g. because its options differ"""
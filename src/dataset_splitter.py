@@ -0,0 +1,133 @@
+# dataset_splitter.py
+import csv
+import hashlib
+import os
+from pathlib import Path
+
+
+class DatasetSplitter:
+    """Split labelled, tokenized corpora into train/validation/test files in a single streaming pass.
+
+    Each row is assigned by a stable hash of its text (all columns but the label). Unbalanced, the assignment is
+    therefore reproducible, independent of row order and unchanged for existing rows when the corpus grows, and
+    duplicate rows always land in the same split. Balanced, the hash assignment is corrected per label so each label's
+    rows are divided in the requested ratios to within one row; a row's split then depends on the rows of its label
+    before it, so the assignment is reproducible for the same input only, and duplicate rows may be divided between
+    splits. Memory is bounded by the number of labels, not rows.
+    """
+
+    SPLITS = ['train', 'validation', 'test']
+    """Split names, matching the dataset types of FileTools.dataset_type_from_name."""
+
+    LABEL_COLUMNS = ['Labels', 'category']
+    """Label columns of tokenize_labelled_meta_data.py outputs, tokenized and bert types respectively."""
+
+    @staticmethod
+    def parse_ratios(ratios: str) -> list:
+        """Parse comma separated split ratios, e.g. '0.8,0.1,0.1', normalised to sum to 1.
+
+        :param ratios: Ratios of train, validation and test splits.
+        :return: List of 3 floats.
+        """
+        try:
+            values = [float(value) for value in ratios.split(',')]
+        except ValueError:
+            raise ValueError(f'Invalid ratios "{ratios}", expected 3 numbers, e.g. 0.8,0.1,0.1.')
+        if len(values) != len(DatasetSplitter.SPLITS) or min(values) < 0 or sum(values) <= 0:
+            raise ValueError(f'Invalid ratios "{ratios}", expected 3 non-negative numbers, e.g. 0.8,0.1,0.1.')
+
+        return [value / sum(values) for value in values]
+
+    @staticmethod
+    def stable_fraction(key: str, seed: str = '') -> float:
+        """Map a key to a number in [0, 1), the same on every run and platform.
+
+        :param key: Text to hash.
+        :param seed: Seed, giving a different but equally stable assignment (default: '').
+        :return: Float in [0, 1).
+        """
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8, key=seed.encode('utf-8')[:64]).digest()
+        return int.from_bytes(digest, 'big') / 2 ** 64
+
+    @staticmethod
+    def split_of(fraction: float, ratios: list) -> int:
+        """Return the index of the split whose cumulative ratio interval holds fraction."""
+        cumulative = 0.0
+        for i, ratio in enumerate(ratios):
+            cumulative += ratio
+            if fraction < cumulative:
+                return i
+
+        return len(ratios) - 1
+
+    @staticmethod
+    def balanced_split_of(split: int, label_counts: list, ratios: list) -> int:
+        """Correct a hash assignment so a label's rows follow ratios.
+
+        If the hashed split already holds its share of the label's rows, the row goes instead to the split furthest
+        below its share.
+
+        :param split: Split index from the hash.
+        :param label_counts: Rows of the label assigned so far, per split.
+        :param ratios: Split ratios.
+        :return: Split index.
+        """
+        total = sum(label_counts) + 1
+        deficits = [ratio * total - count for ratio, count in zip(ratios, label_counts)]
+        if deficits[split] > 0:
+            return split
+
+        return max(range(len(ratios)), key=lambda i: deficits[i])
+
+    @staticmethod
+    def split_file(src_path: str, target_dir: str, ratios: list = None, seed: str = '',
+                   balanced: bool = False) -> dict:
+        """Split a tokenize_labelled_meta_data.py output file into train, validation and test files.
+
+        Tab and comma separated files (tokenized and bert output types) are detected from the header. Split files
+        are saved to target_dir as '{split}_{source file name}', with the header of the source file.
+
+        :param src_path: Path to labelled file.
+        :param target_dir: Directory for saving split files.
+        :param ratios: Ratios of train, validation and test splits (default: None, [0.8, 0.1, 0.1]).
+        :param seed: Seed for the hash assignment (default: '').
+        :param balanced: Whether to correct the assignment per label to follow ratios exactly (default: False).
+        :return: Dict of split name to dict of label to row count.
+        """
+        ratios = [0.8, 0.1, 0.1] if ratios is None else ratios
+        label_counts = {}
+
+        with open(src_path, 'r', encoding='utf-8', newline='') as infile:
+            sep = '\t' if '\t' in infile.readline() else ','
+            infile.seek(0)
+            reader = csv.reader(infile, delimiter=sep)
+            header = next(reader)
+            label_index = next((header.index(column) for column in DatasetSplitter.LABEL_COLUMNS
+                                if column in header), None)
+            if label_index is None:
+                raise ValueError(f'No label column ({", ".join(DatasetSplitter.LABEL_COLUMNS)}) in {src_path}.')
+
+            Path(target_dir).mkdir(parents=True, exist_ok=True)
+            outfiles = [open(os.path.join(target_dir, f'{split}_{Path(src_path).name}'), 'w', encoding='utf-8',
+                             newline='')
+                        for split in DatasetSplitter.SPLITS]
+            try:
+                writers = [csv.writer(outfile, delimiter=sep, lineterminator=os.linesep) for outfile in outfiles]
+                for writer in writers:
+                    writer.writerow(header)
+
+                for row in reader:
+                    label = row[label_index] if label_index < len(row) else ''
+                    key = sep.join(row[:label_index] + row[label_index + 1:])
+                    split = DatasetSplitter.split_of(DatasetSplitter.stable_fraction(key, seed), ratios)
+                    counts = label_counts.setdefault(label, [0] * len(DatasetSplitter.SPLITS))
+                    if balanced:
+                        split = DatasetSplitter.balanced_split_of(split, counts, ratios)
+                    counts[split] += 1
+                    writers[split].writerow(row)
+            finally:
+                for outfile in outfiles:
+                    outfile.close()
+
+        return {split: {label: counts[i] for label, counts in label_counts.items()}
+                for i, split in enumerate(DatasetSplitter.SPLITS)}
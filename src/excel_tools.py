@@ -1,12 +1,13 @@
 # excel_tools.py
 import pandas as pd
+from src.workbook_cache import WorkbookCache
 
 
 class ExcelTools:
     """Utilities for handling Microsoft Excel files"""
 
     @staticmethod
-    def dataframes_dictionary_from_excel_file(src_path: str):
+    def dataframes_dictionary_from_excel_file(src_path: str, cache_dir: str = None, use_hash: bool = False):
         """Extract 'Excel tables' into a dictionary of DataFrames.
 
         Toy method, just to see how ExcelFile works.
@@ -14,13 +15,16 @@ class ExcelTools:
         Assumes all desired data is in the form of a single block of data cells per worksheet.
 
         :param src_path: Full path to source Excel file
+        :param cache_dir: Optional directory of a WorkbookCache, to serve repeated reads from (default: None)
+        :param use_hash: Whether the cache is keyed by content hash rather than path, size and modification time
+        (default: False)
         :return: Dictionary of DataFrames
         """
+        if cache_dir:
+            return WorkbookCache(cache_dir, use_hash).read_workbook(src_path)
 
         # read file
         wb = pd.ExcelFile(src_path)
 
-        dfs = pd.read_excel(wb, sheet_name=None)
-
-        return dfs
+        return WorkbookCache.read_sheets(wb, src_path)
 
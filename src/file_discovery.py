@@ -0,0 +1,91 @@
+# file_discovery.py
+import os
+from pathlib import Path
+
+
+class FileDiscovery:
+    """Lazy, single pass discovery of files in directory trees, built on os.scandir"""
+
+    @staticmethod
+    def normalise_suffixes(suffix) -> tuple:
+        """Normalise a suffix filter into a tuple of suffixes.
+
+        :param suffix: None, a single suffix (e.g. '.txt') or an iterable of suffixes.
+        :return: Tuple of suffixes; empty tuple means no filtering.
+        """
+        if not suffix:
+            return ()
+        if isinstance(suffix, str):
+            return (suffix,)
+        return tuple(suffix)
+
+    @staticmethod
+    def iter_file_entries(root: str, suffix=None, recursive: bool = True, max_depth: int = None,
+                          parent_name_endswith: str = ''):
+        """Yield os.DirEntry objects for files found under root, scanning each directory once.
+
+        DirEntry objects cache their stat results, so calling entry.stat() afterwards does not hit the
+        file system again (and on Windows is free, as it comes from the directory listing itself).
+
+        Directories that cannot be read are skipped, as with os.walk.
+
+        :param root: Top level directory to scan.
+        :param suffix: Suffix or iterable of suffixes, including preceding full-stop, to filter by (default: None, all).
+        :param recursive: Whether to descend into sub-directories (default: True).
+        :param max_depth: Optional maximum depth of sub-directories to descend, root being depth 0 (default: None).
+        :param parent_name_endswith: Only yield files whose immediate parent directory name ends with this (default: '').
+        :return: Generator of os.DirEntry.
+        """
+        suffixes = FileDiscovery.normalise_suffixes(suffix)
+
+        # Iterative depth-first scan, avoids recursion limits on deep trees
+        pending = [(os.fspath(root), 0)]
+        while pending:
+            dir_path, depth = pending.pop()
+            parent_matches = Path(dir_path).name.endswith(parent_name_endswith)
+            sub_dirs = []
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                sub_dirs.append(entry.path)
+                                continue
+                            if not entry.is_file():
+                                continue
+                        except OSError:
+                            continue
+
+                        if not parent_matches:
+                            continue
+                        if suffixes and os.path.splitext(entry.name)[1] not in suffixes:
+                            continue
+
+                        yield entry
+            except OSError:
+                continue
+
+            if recursive and (max_depth is None or depth < max_depth):
+                # Reverse so that sub-directories are visited in listing order
+                pending.extend((sub_dir, depth + 1) for sub_dir in reversed(sub_dirs))
+
+    @staticmethod
+    def iter_file_paths(root: str, suffix=None, recursive: bool = True, max_depth: int = None,
+                        parent_name_endswith: str = ''):
+        """Yield paths of files found under root. See iter_file_entries for parameters.
+
+        :return: Generator of str file paths.
+        """
+        for entry in FileDiscovery.iter_file_entries(root, suffix, recursive, max_depth, parent_name_endswith):
+            yield entry.path
+
+    @staticmethod
+    def first_file_path(root: str, suffix=None, recursive: bool = True) -> str:
+        """Return path of the first file found of the given type, stopping the scan as soon as it is found.
+
+        :param root: Top level directory to scan.
+        :param suffix: Suffix or iterable of suffixes, including preceding full-stop (default: None, any file).
+        :param recursive: Whether to descend into sub-directories (default: True).
+        :return: Path of file, or '' if none found.
+        """
+        return next(FileDiscovery.iter_file_paths(root, suffix, recursive), '')
@@ -1,6 +1,11 @@
 # file_tools.py
 
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+import hashlib
+from itertools import islice
 import numpy as np
 import pandas as pd
 from pathlib import Path
@@ -10,27 +15,78 @@ import random
 import re
 import shutil
 from skimage.transform import resize
+from src.archive_tools import ArchiveTools
+from src.file_discovery import FileDiscovery
+from src.image_statistics import ImageStatistics
 import sys
+import threading
+import time
 
 
 class FileTools:
     """Utilities for managing data from and to files"""
 
-    @staticmethod
-    def chunks_generator(input_list: list, chunk_size: int) -> list:
-        """Yield chunks of supplied data by given size
+    RESIZE_BACKENDS = ['skimage', 'pil']
+    """Backends for resizing images in create_numpy_archive_from_images_dir."""
+
+    MTIME_WINDOW = 2.0
+    """Seconds by which modification times of a file and its copy may differ and still match, covering filesystems
+    with coarse timestamps (e.g. FAT's 2 seconds), as rsync's --modify-window."""
 
-        :param input_list: the list from which chunks are to be yielded
-        :param chunk_size: number of items in each chunk
-        :return: list of length chunk_size
+    @staticmethod
+    def chunks_generator(items, chunk_size: int):
+        """Lazily yield chunks of supplied data by given size
+
+        - NumPy arrays and memoryviews: slices, which are zero-copy views
+        - DataFrames and Series: row slices via iloc
+        - other sequences supporting len and slicing (e.g. list): slices of the same type
+        - any other iterable (e.g. generators, DataFrame.itertuples(), file discovery): lists, consuming only one
+          chunk of the iterable at a time
+
+        :param items: the data from which chunks are to be yielded
+        :param chunk_size: number of items in each chunk; the last chunk may be smaller
+        :return: chunks of at most chunk_size items
         """
-        remainder = len(input_list) - (int(len(input_list)/chunk_size) * chunk_size)
+        if chunk_size < 1:
+            raise ValueError('Chunk size must be at least 1.')
+
+        if isinstance(items, (pd.DataFrame, pd.Series)):
+            for start in range(0, len(items), chunk_size):
+                yield items.iloc[start:start + chunk_size]
+        elif isinstance(items, (np.ndarray, memoryview, Sequence)):
+            for start in range(0, len(items), chunk_size):
+                yield items[start:start + chunk_size]
+        else:
+            iterator = iter(items)
+            chunk = list(islice(iterator, chunk_size))
+            while chunk:
+                yield chunk
+                chunk = list(islice(iterator, chunk_size))
+
+    @staticmethod
+    def bounded_map(executor, function, items, max_pending: int):
+        """Lazily yield function of each of items, in order, run by executor with a bounded number of tasks pending.
 
-        for i in range(0, int(len(input_list) / chunk_size)):
-            yield input_list[i * chunk_size: (i + 1) * chunk_size]
-        if remainder > 0:
-            i = int(len(input_list)/chunk_size)
-            yield input_list[i * chunk_size: i * chunk_size + remainder]
+        Unlike executor.map, which submits every item up front, items are consumed only as results are taken, so a
+        long generator of items (e.g. chunks of file discovery) is never held in memory, nor are their results.
+
+        :param executor: concurrent.futures executor
+        :param function: function of a single item
+        :param items: iterable of items
+        :param max_pending: maximum number of tasks submitted but not yet yielded
+        :return: results of function, in the order of items
+        """
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(function, item))
+                while len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
 
     @staticmethod
     def create_dirs_from_file_header(file_path: str, separator: str, target_root: str) -> list():
@@ -56,7 +112,8 @@ class FileTools:
 
     @staticmethod
     def copy_files_to_class_dirs(info_file_path: str, separator: str, src_root: str, target_root: str,
-                                 extension: str = ''):
+                                 extension: str = '', incremental: bool = False, prune: bool = False,
+                                 link_duplicates: bool = False):
         """Copy files from source dir to class dirs
 
         Keyword arguments:
@@ -67,6 +124,11 @@ class FileTools:
         :param src_root: root for source files
         :param target_root: root for class dirs
         :param extension: if extension given, then suffix to file names
+        :param incremental: whether to copy only new or changed files, see copy_files_in_parallel (default: False)
+        :param prune: whether incremental copying deletes files from class dirs that are no longer in the class
+        (default: False)
+        :param link_duplicates: whether to hard link files with the same content as one already copied, across all
+        classes, see copy_files_in_parallel (default: False)
         :return (dataframe) list of folder names
         """
 
@@ -74,8 +136,23 @@ class FileTools:
 
         FileTools.create_dirs_from_file_header(info_file_path, separator, target_root)
 
+        if incremental or link_duplicates:
+            copy_pairs = [(os.path.join(src_root, '.'.join([filename, extension])),
+                           os.path.join(target_root, col, '.'.join([filename, extension])))
+                          for col in df.columns for filename in df[df[col] == 1].index]
+            FileTools.copy_files_in_parallel(copy_pairs, incremental=incremental, link_duplicates=link_duplicates)
+            if incremental and prune:
+                for col in df.columns:
+                    target_dir = os.path.join(target_root, col)
+                    pruned_files, pruned_bytes = FileTools.prune_stale_files(
+                        target_dir, {os.path.abspath(target_path) for _, target_path in copy_pairs
+                                     if os.path.dirname(target_path) == target_dir})
+                    print(f'{pruned_files} stale files ({pruned_bytes / 1e6:.1f} MB) pruned from {target_dir}')
+            return df
+
         for col in df.columns:
             target_dir = os.path.join(target_root, col)
+
             count = 0
             for filename in df[df[col] == 1].index:
                 src_file = os.path.join(src_root, '.'.join([filename, extension]))
@@ -263,10 +340,15 @@ class FileTools:
         return line_list
 
     @staticmethod
-    def make_datetime_named_archive(base_name: str, format: str, dir_path_to_archive: str):
+    def make_datetime_named_archive(base_name: str, format: str, dir_path_to_archive: str, parallel: bool = False,
+                                    compress_level: int = None, workers: int = None):
         """Make archive, name prefixed with current datetime (yyyymmdd_HHMM_).
         For more detail of each parameter, see definition of shutil.make_archive.
 
+        With parallel set, the archive is streamed through ArchiveTools.make_tar_archive instead, supporting
+        formats tar (store only, for already compressed images), gztar and xztar (compressed in parallel chunks)
+        and zsttar (zstandard, if installed), with tunable compression level and progress reporting.
+
         Example usage:
 
         shutil.make_archive('/home/code/target_file_name', 'zip', '/home/code/', 'base_directory')
@@ -277,6 +359,9 @@ class FileTools:
         extension; datetime will be prefixed to the base name
         :param format: str, the archive format
         :param dir_path_to_archive: str, the path to the directory that is to be archived
+        :param parallel: bool, whether to use multi-threaded tar archiving (default: False)
+        :param compress_level: int, compression level for parallel archiving, None for the codec default
+        :param workers: int, number of compressing threads for parallel archiving (default: None, number of CPUs)
         :return: name of file
         """
         print('Archiving files...')
@@ -291,9 +376,13 @@ class FileTools:
         # print('root_dir: {}'.format(root_dir))
         # print('base_dir: {}'.format(base_dir))
 
-        result = shutil.make_archive(base_name, format, root_dir, base_dir)
-
-        end_file_name = base_name + '.' + format
+        if parallel:
+            result = ArchiveTools.make_tar_archive(base_name, format, str(root_dir), base_dir,
+                                                   compress_level=compress_level, workers=workers)
+            end_file_name = result
+        else:
+            result = shutil.make_archive(base_name, format, root_dir, base_dir)
+            end_file_name = base_name + '.' + format
 
         print('Images saved at {}'.format(end_file_name))
 
@@ -333,71 +422,221 @@ class FileTools:
     @staticmethod
     def create_numpy_archive_from_images_dir(src_dir: str, target_path: str,
                                              new_shape: tuple = 0,
-                                             suffix: str = '.jpg'):
+                                             suffix: str = '.jpg',
+                                             deduplicate: bool = False,
+                                             save_stats: bool = False,
+                                             resize_backend: str = 'skimage',
+                                             max_workers: int = None,
+                                             chunk_size: int = 64):
         """Create a numpy array archive of images sourced from a single directory.
 
         If new_shape is not provided, and images are of different dimensions, then this will generate
         an exception.
 
+        Deduplicated, image files with the same content (see find_duplicate_files) are decoded and stored once, and
+        an index saved alongside, target_path + '_index.csv', maps each image file name to its row of the archive.
+
+        The 'skimage' resize backend decodes images at full resolution and resizes float arrays, storing int arrays.
+        The 'pil' backend decodes JPEGs directly at a reduced scale where the target is much smaller (draft) and
+        resizes with PIL, keeping the image's own dtype (uint8 for 8-bit images), which is much faster and smaller
+        for thumbnails; see pil_resized_image.
+
+        Images are streamed: chunks of files are decoded and resized by a pool of threads, as for
+        image_statistics_from_dir, and each processed image written straight into the archive, a memory mapped .npy
+        file, so neither the decoded images nor the archive are ever held in memory as a whole.
+
+        With save_stats, per-channel mean and standard deviation and a histogram of shapes of the archived images
+        are accumulated by each chunk as it is processed, merged and saved alongside, as target_path + '_stats.json'.
+
         Keyword arguments:
 
         :param src_dir: path to source directory
         :param target_path: path to final final, excluding extension
         :param new_shape: optional, end shape of resized image arrays
         :param suffix: suffix of images to be processed, including preceding full-stop (default '.jpg')
+        :param deduplicate: whether to store each distinct image once, with an index (default False)
+        :param save_stats: whether to save statistics of the archived images (default False)
+        :param resize_backend: one of RESIZE_BACKENDS (default 'skimage')
+        :param max_workers: maximum number of threads (default: None, the number of CPUs)
+        :param chunk_size: number of images per task (default 64)
         """
         # Catch items where None passed in
         if new_shape is None:
             new_shape = 0
         if suffix is None:
             suffix = '.jpg'
+        if resize_backend not in FileTools.RESIZE_BACKENDS:
+            raise ValueError(f'Unknown resize backend "{resize_backend}", expected one of {FileTools.RESIZE_BACKENDS}.')
 
         if src_dir == '':
             result = f'No source directory supplied for images, so no npy file created.'
         elif not Path(src_dir).is_dir():
             result = f'"{src_dir}" is not a directory, so no npy file created.'
         else:
-            image_files = [os.path.join(src_dir, f) for f in os.listdir(src_dir)
-                           if os.path.isfile(os.path.join(src_dir, f))
-                           and Path(os.path.join(src_dir, f)).suffix == suffix]
+            image_files = list(FileDiscovery.iter_file_paths(src_dir, suffix, recursive=False))
 
             if len(image_files) == 0:
                 result = f'No {suffix} files at {src_dir} so no npy file created.'
             else:
-                processed_images = []
+                all_image_files = image_files
+                if deduplicate:
+                    duplicates = FileTools.find_duplicate_files(image_files)
+                    image_files = [image_path for image_path in image_files if image_path not in duplicates]
+
+                def processed_of(image_paths: list) -> (list, ImageStatistics):
+                    images = [FileTools.archive_image(image_path, new_shape, resize_backend)
+                              for image_path in image_paths]
+                    partial = ImageStatistics()
+                    if save_stats:
+                        for image in images:
+                            partial.update(image)
+                    return images, partial
 
+                final_path = target_path + '.npy'
+                statistics = ImageStatistics()
+                archive = None
+                row = 0
                 try:
-                    for img in [np.array(Image.open(image_path)) for image_path in image_files]:
-                        processed_images.append(
-                            np.asarray(
-                                np.asarray(img, dtype='int') if new_shape == 0 else
-                                resize(img, new_shape, preserve_range=True, anti_aliasing=False),
-                                dtype='int'
-                            )
-                        )
+                    workers = max_workers or os.cpu_count() or 1
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        # At most two chunks in flight per worker, so decoded images do not pile up
+                        for images, partial in FileTools.bounded_map(
+                                executor, processed_of, FileTools.chunks_generator(image_files, chunk_size),
+                                2 * workers):
+                            for image in images:
+                                # The first image fixes the shape and dtype of the archive
+                                if archive is None:
+                                    archive = np.lib.format.open_memmap(
+                                        final_path, mode='w+', dtype=image.dtype,
+                                        shape=(len(image_files),) + image.shape)
+                                elif image.shape != archive.shape[1:] or not np.can_cast(image.dtype, archive.dtype):
+                                    raise ValueError(f'Image {image_files[row]} of shape {image.shape} and dtype '
+                                                     f'{image.dtype} differs from those of earlier images, '
+                                                     f'{archive.shape[1:]} and {archive.dtype}; give new_shape.')
+                                archive[row] = image
+                                row += 1
+                            statistics.merge(partial)
+                    archive.flush()
+                    del archive
                 except Exception as err:
+                    # Close and remove the partial archive
+                    archive = None
+                    if Path(final_path).is_file():
+                        os.remove(final_path)
                     error_message = \
                         "Unexpected error in FileTools.create_numpy_archive_from_images_dir\n"\
                         + str(err.args)
                     raise Exception(error_message)
 
-                final_path = target_path + '.npy'
-                np.save(final_path, processed_images)
-
                 result = f'Npy file saved at {final_path}'
 
+                if deduplicate:
+                    rows = {image_path: row for row, image_path in enumerate(image_files)}
+                    index = pd.DataFrame({'FileName': [Path(image_path).name for image_path in all_image_files],
+                                          'Row': [rows[duplicates.get(image_path, image_path)]
+                                                  for image_path in all_image_files]})
+                    index.to_csv(target_path + '_index.csv', index=False)
+                    result += f', {len(image_files)} distinct of {len(all_image_files)} images, index saved at ' \
+                              f'{target_path}_index.csv'
+
+                if save_stats:
+                    statistics.save_json(target_path + '_stats.json')
+                    result += f', statistics saved at {target_path}_stats.json'
+
         return result
 
+    @staticmethod
+    def archive_image(image_path: str, new_shape: tuple = 0, resize_backend: str = 'skimage') -> np.ndarray:
+        """Decode an image and resize it for create_numpy_archive_from_images_dir.
+
+        :param image_path: path of image
+        :param new_shape: end shape of resized image array; 0 for no resizing (default 0)
+        :param resize_backend: one of RESIZE_BACKENDS (default 'skimage')
+        :return: image array, int for 'skimage', of the image's own dtype for 'pil'
+        """
+        if resize_backend == 'pil':
+            return FileTools.pil_resized_image(image_path, new_shape)
+
+        with Image.open(image_path) as img:
+            img = np.array(img)
+
+        return np.asarray(np.asarray(img, dtype='int') if new_shape == 0 else
+                          resize(img, new_shape, preserve_range=True, anti_aliasing=False),
+                          dtype='int')
+
+    @staticmethod
+    def pil_resized_image(image_path: str, new_shape: tuple = 0) -> np.ndarray:
+        """Decode an image and resize it with PIL, without a float intermediate.
+
+        For JPEGs, draft() has the decoder scale the image down by up to 8 while decoding, to no less than the
+        target size, so full resolution pixels are never produced. resize() then reduces by whole factors (reduce)
+        before the final antialiased bilinear resample.
+
+        :param image_path: path of image
+        :param new_shape: (height, width) or (height, width, channels) of result; 0 for no resizing (default 0)
+        :return: image array, of the image's own dtype
+        """
+        with Image.open(image_path) as img:
+            if new_shape == 0:
+                return np.asarray(img)
+
+            height, width = new_shape[0], new_shape[1]
+            # Must come before anything loads the image
+            if img.format == 'JPEG':
+                img.draft(img.mode, (width, height))
+            if len(new_shape) > 2:
+                channel_modes = {1: 'L', 3: 'RGB', 4: 'RGBA'}
+                if new_shape[2] not in channel_modes:
+                    raise ValueError(f'Cannot resize to {new_shape[2]} channels.')
+                if img.mode != channel_modes[new_shape[2]]:
+                    img = img.convert(channel_modes[new_shape[2]])
+
+            resized = np.asarray(img.resize((width, height), resample=Image.BILINEAR, reducing_gap=2.0))
+
+        return resized.reshape(new_shape) if len(new_shape) > 2 else resized
+
+    @staticmethod
+    def image_statistics_from_dir(src_dir: str, suffix: str = '.jpg', recursive: bool = False,
+                                  max_workers: int = None, chunk_size: int = 64) -> ImageStatistics:
+        """Compute per-channel mean and standard deviation and a histogram of shapes of the images in a directory.
+
+        Images are streamed, never all held in memory: chunks of files are decoded and accumulated by a pool of
+        threads, each into its own ImageStatistics, and the partial statistics merged.
+
+        :param src_dir: path to source directory
+        :param suffix: suffix of images, including preceding full-stop (default '.jpg')
+        :param recursive: whether to include images in sub-directories (default False)
+        :param max_workers: maximum number of threads (default: None, the number of CPUs)
+        :param chunk_size: number of images per task (default 64)
+        :return: ImageStatistics
+        """
+        def statistics_of(image_paths: list) -> ImageStatistics:
+            partial = ImageStatistics()
+            for image_path in image_paths:
+                with Image.open(image_path) as img:
+                    partial.update(np.asarray(img))
+            return partial
+
+        statistics = ImageStatistics()
+        workers = max_workers or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = FileTools.chunks_generator(FileDiscovery.iter_file_paths(src_dir, suffix, recursive=recursive),
+                                                chunk_size)
+            # At most two chunks in flight per worker, so discovery is not run ahead of decoding
+            for partial in FileTools.bounded_map(executor, statistics_of, chunks, 2 * workers):
+                statistics.merge(partial)
+
+        return statistics
+
     @staticmethod
     def path_of_first_file_of_type(directory: str, extension: str = '.jpg'):
-        found_path = ''
-        for root, dirs, files in os.walk(directory, topdown=False):
-            for file in files:
-                if Path(file).suffix == extension:
-                    found_path = os.path.join(root, file)
-                    break
+        """Return path of the first file found of the given type, searching sub-directories too.
 
-        return found_path
+        :param directory: top level directory to search
+        :param extension: suffix of file, including preceding full-stop (default '.jpg')
+        :return: path of file, or '' if none found
+        """
+        return FileDiscovery.first_file_path(directory, extension)
 
     @staticmethod
     def dataset_type_from_name(name: str) -> str:
@@ -416,7 +655,20 @@ class FileTools:
         return dataset_type
 
     @staticmethod
-    def copy_dir_as_unclassed(source_dir: str, target_dir: str, replace_content: bool = False) -> str:
+    def copy_dir_as_unclassed(source_dir: str, target_dir: str, replace_content: bool = False,
+                              incremental: bool = False, prune: bool = False, link_duplicates: bool = False) -> str:
+        """Copy all files under a train|validation|test directory into a single unclassed directory.
+
+        :param source_dir: source directory, named for its dataset type
+        :param target_dir: target root; files go to target_dir/dataset type/unknown
+        :param replace_content: whether to replace existing content of the target (default: False)
+        :param incremental: whether to update existing content instead, copying only new or changed files; the
+        target is never emptied (default: False)
+        :param prune: whether incremental copying deletes target files no longer in the source (default: False)
+        :param link_duplicates: whether to hard link files with the same content as one already copied, see
+        copy_files_in_parallel (default: False)
+        :return: path of target directory, or 'Invalid' or 'Not replaced'
+        """
         dataset_type = FileTools.dataset_type_from_name(Path(source_dir).name)
         can_copy_files = replace_content
 
@@ -427,6 +679,13 @@ class FileTools:
 
         # Need extra directory levels to allow PyTorch Dataset to work on unclassified data
         leaf_target_dir = os.path.join(target_dir, dataset_type, 'unknown')
+        if incremental:
+            copy_pairs = ((file_path, os.path.join(leaf_target_dir, Path(file_path).name))
+                          for file_path in FileDiscovery.iter_file_paths(source_dir))
+            FileTools.copy_files_in_parallel(copy_pairs, incremental=True, link_duplicates=link_duplicates,
+                                             prune_dir=leaf_target_dir if prune else '')
+            return leaf_target_dir
+
         if replace_content or not Path(leaf_target_dir).exists():
             FileTools.ensure_empty_directory(leaf_target_dir)
             can_copy_files = True
@@ -438,16 +697,267 @@ class FileTools:
             Path(leaf_target_dir).mkdir(parents=True, exist_ok=True)
             can_copy_files = True
 
-        if can_copy_files:
-            for root, dirs, files in os.walk(source_dir, topdown=False):
-                for file in files:
-                    shutil.copy(os.path.join(source_dir, file), leaf_target_dir)
+        if can_copy_files and link_duplicates:
+            FileTools.copy_files_in_parallel(((file_path, os.path.join(leaf_target_dir, Path(file_path).name))
+                                              for file_path in FileDiscovery.iter_file_paths(source_dir)),
+                                             link_duplicates=True)
+        elif can_copy_files:
+            for file_path in FileDiscovery.iter_file_paths(source_dir):
+                shutil.copy(file_path, leaf_target_dir)
 
         return leaf_target_dir
 
     @staticmethod
-    def collate_files_by_low_level_dir_name(source_dir: str, low_level_dir_name: str, path_parts_re: list)\
-            -> np.ndarray:
+    def file_digest(file_path: str, chunk_size: int = 1024 * 1024, max_bytes: int = None) -> bytes:
+        """Return a blake2b digest of a file's content, read in chunks.
+
+        :param file_path: path of file
+        :param chunk_size: bytes read at a time (default: 1 MiB)
+        :param max_bytes: optional number of leading bytes to digest, for a quick partial digest (default: None, all)
+        :return: 16 byte digest
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        remaining = max_bytes
+        with open(file_path, 'rb') as infile:
+            while remaining is None or remaining > 0:
+                chunk = infile.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                if remaining is not None:
+                    remaining -= len(chunk)
+
+        return digest.digest()
+
+    @staticmethod
+    def find_duplicate_files(file_paths, max_workers: int = None, partial_bytes: int = 64 * 1024) -> dict:
+        """Identify files with exactly the same content.
+
+        Files are grouped by size first, so files of a unique size are never read. Same size files are then
+        compared by a digest of their first partial_bytes, and only those still matching by a digest of their whole
+        content. Digests are computed by a pool of threads, as hashlib releases the GIL on large buffers.
+
+        :param file_paths: iterable of file paths
+        :param max_workers: maximum number of hashing threads (default: None, as for ThreadPoolExecutor)
+        :param partial_bytes: leading bytes compared before whole files (default: 64 KiB)
+        :return: dict of path of each duplicate file to path of the first file (in file_paths order) with its content
+        """
+        by_size = {}
+        for file_path in file_paths:
+            by_size.setdefault(os.path.getsize(file_path), []).append(file_path)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            def regroup(groups: list, digest_of) -> list:
+                paths = [file_path for group in groups for file_path in group]
+                digests = dict(zip(paths, executor.map(digest_of, paths)))
+                regrouped = []
+                for group in groups:
+                    by_digest = {}
+                    for file_path in group:
+                        by_digest.setdefault(digests[file_path], []).append(file_path)
+                    regrouped.extend(paths for paths in by_digest.values() if len(paths) > 1)
+                return regrouped
+
+            groups = [group for group in by_size.values() if len(group) > 1]
+            groups = regroup(groups, lambda file_path: FileTools.file_digest(file_path, max_bytes=partial_bytes))
+            # Files no longer than partial_bytes were digested whole already
+            groups = [group for group in groups if os.path.getsize(group[0]) <= partial_bytes] + \
+                regroup([group for group in groups if os.path.getsize(group[0]) > partial_bytes],
+                        FileTools.file_digest)
+
+        return {file_path: group[0] for group in groups for file_path in group[1:]}
+
+    @staticmethod
+    def is_unchanged_copy(src_path: str, target_path: str, use_hash: bool = False) -> bool:
+        """Return whether target_path is an up to date copy of src_path.
+
+        As rsync, a copy is up to date if it has the same size and modification time (within MTIME_WINDOW), or,
+        with use_hash, the same size and content.
+
+        :param src_path: path of source file
+        :param target_path: path of copy, which need not exist
+        :param use_hash: whether to compare content hashes instead of modification times (default: False)
+        :return: True if the copy need not be made again
+        """
+        try:
+            target_stat = os.stat(target_path)
+        except FileNotFoundError:
+            return False
+        src_stat = os.stat(src_path)
+        if src_stat.st_size != target_stat.st_size:
+            return False
+        if use_hash:
+            return FileTools.file_digest(src_path) == FileTools.file_digest(target_path)
+
+        return abs(src_stat.st_mtime - target_stat.st_mtime) <= FileTools.MTIME_WINDOW
+
+    @staticmethod
+    def replace_with_copy(src_path: str, target_path: str, with_metadata: bool = False):
+        """Copy src_path to target_path, replacing rather than overwriting any existing target.
+
+        The copy is made to a temporary file beside the target and moved into place, so a target hard linked to
+        other files, e.g. by copy_files_in_parallel with link_duplicates, is unlinked from them rather than written
+        through, and an interrupted copy leaves the old target intact.
+
+        :param src_path: path of source file
+        :param target_path: path of copy
+        :param with_metadata: whether to copy modification times etc. as shutil.copy2 (default: False)
+        """
+        temp_path = f'{target_path}.{threading.get_ident()}.tmp'
+        try:
+            (shutil.copy2 if with_metadata else shutil.copy)(src_path, temp_path)
+            os.replace(temp_path, target_path)
+        except BaseException:
+            if Path(temp_path).exists():
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def prune_stale_files(target_dir: str, keep_paths: set) -> (int, int):
+        """Delete files under target_dir that are not in keep_paths, e.g. copies of source files since removed.
+
+        :param target_dir: top level directory to prune
+        :param keep_paths: set of absolute paths of files to keep
+        :return: number of files and bytes deleted
+        """
+        files = 0
+        total_bytes = 0
+        for entry in list(FileDiscovery.iter_file_entries(target_dir)):
+            if os.path.abspath(entry.path) not in keep_paths:
+                total_bytes += entry.stat().st_size
+                os.remove(entry.path)
+                files += 1
+
+        return files, total_bytes
+
+    @staticmethod
+    def copy_files_in_parallel(copy_pairs, max_workers: int = None, to_print: bool = True,
+                               batch_size: int = 1000, incremental: bool = False, use_hash: bool = False,
+                               prune_dir: str = '', link_duplicates: bool = False) -> dict:
+        """Copy files using a bounded pool of threads, creating each distinct target directory once.
+
+        File copying is I/O bound and shutil releases the GIL while copying, so threads give real overlap.
+        Pairs are consumed lazily in batches, so generators of any length can be supplied.
+
+        Incremental, files whose copy is already up to date (see is_unchanged_copy) are skipped, and files are
+        copied with their modification times so later runs can recognise them. Copies made by earlier non
+        incremental runs have new modification times, so the first incremental run over them copies them again,
+        unless use_hash is set.
+
+        Linking duplicates, sources with the same content (see find_duplicate_files) are copied once and their other
+        targets made hard links to that copy, falling back to copying where the filesystem cannot link. Linked
+        targets share their data, so changing one in place changes all of them; copies made here always replace
+        targets (see replace_with_copy), so later runs never write through a link.
+
+        Keyword arguments:
+        :param copy_pairs: iterable of (source path, target path) pairs
+        :param max_workers: maximum number of copying threads (default: None, as for ThreadPoolExecutor)
+        :param to_print: whether to print the aggregate throughput (default: True)
+        :param batch_size: number of pairs handed to the pool at a time (default: 1000)
+        :param incremental: whether to skip files whose copy is up to date (default: False)
+        :param use_hash: whether incremental copying compares content hashes instead of modification times
+        (default: False)
+        :param prune_dir: directory from which to delete files that are not targets of copy_pairs, after copying;
+        '' for none (default: '')
+        :param link_duplicates: whether to hard link targets of duplicate sources instead of copying them; all pairs
+        are then held in memory (default: False)
+        :return: dict summary with keys files, bytes, seconds, mb_per_second, skipped_files, skipped_bytes,
+        pruned_files, pruned_bytes, linked_files, linked_bytes
+        """
+        created_dirs = set()
+        target_paths = set()
+
+        linked_pairs = []
+        if link_duplicates:
+            copy_pairs = list(copy_pairs)
+            duplicates = FileTools.find_duplicate_files([src_path for src_path, _ in copy_pairs],
+                                                        max_workers=max_workers)
+            first_targets = {}
+            primary_pairs = []
+            for src_path, target_path in copy_pairs:
+                original = duplicates.get(src_path, src_path)
+                if original in first_targets:
+                    linked_pairs.append((first_targets[original], target_path))
+                else:
+                    first_targets[original] = target_path
+                    primary_pairs.append((src_path, target_path))
+            copy_pairs = primary_pairs
+
+        def copy_one(pair) -> (int, bool):
+            if incremental:
+                if FileTools.is_unchanged_copy(pair[0], pair[1], use_hash):
+                    return os.path.getsize(pair[1]), True
+            FileTools.replace_with_copy(pair[0], pair[1], with_metadata=incremental)
+            return os.path.getsize(pair[1]), False
+
+        total_files = 0
+        total_bytes = 0
+        skipped_files = 0
+        skipped_bytes = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch in FileTools.chunks_generator(copy_pairs, batch_size):
+                for target_dir in {os.path.dirname(target_path) for _, target_path in batch} - created_dirs:
+                    Path(target_dir).mkdir(parents=True, exist_ok=True)
+                    created_dirs.add(target_dir)
+                if prune_dir:
+                    target_paths.update(os.path.abspath(target_path) for _, target_path in batch)
+                for size, is_skipped in executor.map(copy_one, batch):
+                    if is_skipped:
+                        skipped_files += 1
+                        skipped_bytes += size
+                    else:
+                        total_files += 1
+                        total_bytes += size
+
+        linked_bytes = 0
+        for original_target, target_path in linked_pairs:
+            Path(os.path.dirname(target_path)).mkdir(parents=True, exist_ok=True)
+            if prune_dir:
+                target_paths.add(os.path.abspath(target_path))
+            linked_bytes += os.path.getsize(original_target)
+            if Path(target_path).exists():
+                if os.path.samefile(original_target, target_path):
+                    continue
+                os.remove(target_path)
+            try:
+                os.link(original_target, target_path)
+            except OSError:
+                FileTools.replace_with_copy(original_target, target_path, with_metadata=True)
+        seconds = time.perf_counter() - start
+
+        pruned_files, pruned_bytes = FileTools.prune_stale_files(prune_dir, target_paths) if prune_dir else (0, 0)
+
+        summary = {
+            'files': total_files,
+            'bytes': total_bytes,
+            'seconds': seconds,
+            'mb_per_second': (total_bytes / 1e6) / seconds if seconds > 0 else 0.0,
+            'skipped_files': skipped_files,
+            'skipped_bytes': skipped_bytes,
+            'pruned_files': pruned_files,
+            'pruned_bytes': pruned_bytes,
+            'linked_files': len(linked_pairs),
+            'linked_bytes': linked_bytes
+        }
+
+        if to_print:
+            print(f'{summary["files"]} files ({total_bytes / 1e6:.1f} MB) copied in {seconds:.2f}s, '
+                  f'{summary["mb_per_second"]:.1f} MB/s')
+            if incremental:
+                print(f'{skipped_files} unchanged files ({skipped_bytes / 1e6:.1f} MB) skipped')
+            if link_duplicates:
+                print(f'{len(linked_pairs)} duplicate files ({linked_bytes / 1e6:.1f} MB) linked')
+            if prune_dir:
+                print(f'{pruned_files} stale files ({pruned_bytes / 1e6:.1f} MB) pruned from {prune_dir}')
+
+        return summary
+
+    @staticmethod
+    def collate_files_by_low_level_dir_name(source_dir: str, low_level_dir_name: str, path_parts_re: list,
+                                            max_workers: int = None, incremental: bool = False,
+                                            use_hash: bool = False, prune_dir: str = '',
+                                            link_duplicates: bool = False) -> np.ndarray:
         """
         Collate files within a regular structure but deep structure into an alternative one.
         Assume source files of interest are in commonly named sub-directories.
@@ -459,32 +969,31 @@ class FileTools:
         :param source_dir: top level source directory
         :param low_level_dir_name: lowest level commonly named directory, or common suffix
         :param path_parts_re: list of common parts of file paths to rename or remove, defined as regular expressions
-        :return: data list of lists [file path, file name, copy path]
+        :param max_workers: maximum number of copying threads (default: None, as for ThreadPoolExecutor)
+        :param incremental: whether to skip files whose copy is up to date, see copy_files_in_parallel
+        (default: False)
+        :param use_hash: whether incremental copying compares content hashes (default: False)
+        :param prune_dir: target directory to delete stale files from, e.g. TargetDir above; '' for none (default: '')
+        :param link_duplicates: whether to hard link files with the same content as one already copied, see
+        copy_files_in_parallel (default: False)
+        :return: structured array of [file path, file name, copy path], stored as variable length strings
         """
-        path = Path(source_dir)
-
-        file_paths = []
-        file_names = []
-
-        for p in [p for p in path.rglob("*") if p.is_file() and p.parent.name.endswith(low_level_dir_name)]:
-            file_paths.append(str(p))
-            file_names.append(p.name)
-
-        data = np.zeros(len(file_paths), dtype={'names': ('FilePath', 'FileName', 'CopyPath'),
-                                                'formats': ('U256', 'U64', 'U256')})
+        # Compile the chain once, then apply the whole chain to each path in a single pass
+        path_parts = [(re.compile(part[0]), part[1]) for part in path_parts_re]
 
-        copy_paths = [str(fp) for fp in file_paths]
+        def copy_path_of(file_path: str) -> str:
+            for pattern, replacement in path_parts:
+                file_path = pattern.sub(replacement, file_path)
+            return file_path
 
-        for part in path_parts_re:
-            copy_paths = [re.sub(part[0], part[1], fp) for fp in copy_paths]
+        rows = [(entry.path, entry.name, copy_path_of(entry.path))
+                for entry in FileDiscovery.iter_file_entries(source_dir, parent_name_endswith=low_level_dir_name)]
 
-        data['FilePath'] = file_paths
-        data['FileName'] = file_names
-        data['CopyPath'] = copy_paths
+        # Object fields hold variable length strings, so long paths are never truncated
+        data = np.array(rows, dtype={'names': ('FilePath', 'FileName', 'CopyPath'), 'formats': ('O', 'O', 'O')})
 
-        for item in data:
-            Path(Path(item['CopyPath']).parent).mkdir(parents=True, exist_ok=True)
-            shutil.copy(item['FilePath'], item['CopyPath'])
-            print(f'Copy {item["FileName"]} from {Path(item["FilePath"]).parent} to {Path(item["CopyPath"]).parent}')
+        FileTools.copy_files_in_parallel(zip(data['FilePath'], data['CopyPath']), max_workers=max_workers,
+                                         incremental=incremental, use_hash=use_hash, prune_dir=prune_dir,
+                                         link_duplicates=link_duplicates)
 
         return data
@@ -0,0 +1,174 @@
+# identifier_tools.py
+import numpy as np
+import pandas as pd
+import re
+
+
+class AbbreviationTrie:
+    """Character trie of abbreviations, for longest-prefix matching"""
+
+    _END = ''
+    """Key marking the end of an abbreviation; never a character of one."""
+
+    def __init__(self, abbreviations: dict = None):
+        """
+        :param abbreviations: Optional dict of lower case abbreviation to expansion.
+        """
+        self.root = {}
+        for abbreviation, expansion in (abbreviations or {}).items():
+            self.insert(abbreviation, expansion)
+
+    def insert(self, abbreviation: str, expansion: str):
+        node = self.root
+        for char in abbreviation.lower():
+            node = node.setdefault(char, {})
+        node[AbbreviationTrie._END] = expansion
+
+    def longest_prefix(self, text: str, start: int = 0) -> tuple:
+        """Find the longest abbreviation that text starts with, from position start.
+
+        :param text: Lower case text.
+        :param start: Position in text to match from (default: 0).
+        :return: Tuple (end position, expansion), or (start, None) if no abbreviation matches.
+        """
+        node = self.root
+        match = (start, None)
+        for i in range(start, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if AbbreviationTrie._END in node:
+                match = (i + 1, node[AbbreviationTrie._END])
+
+        return match
+
+    def prefixes(self, text: str, start: int = 0) -> list:
+        """Find all abbreviations that text starts with, from position start.
+
+        :param text: Lower case text.
+        :param start: Position in text to match from (default: 0).
+        :return: List of tuples (end position, expansion), shortest first.
+        """
+        node = self.root
+        matches = []
+        for i in range(start, len(text)):
+            node = node.get(text[i])
+            if node is None:
+                break
+            if AbbreviationTrie._END in node:
+                matches.append((i + 1, node[AbbreviationTrie._END]))
+
+        return matches
+
+
+class IdentifierTools:
+    """Split field names (identifiers) into words and expand abbreviations"""
+
+    DEFAULT_ABBREVIATIONS = {
+        'addr': 'address', 'adm': 'admission', 'amt': 'amount', 'bew': 'movement', 'cd': 'code', 'dept': 'department',
+        'desc': 'description', 'dob': 'date of birth', 'dt': 'date', 'einri': 'institution', 'fal': 'case',
+        'gschl': 'sex', 'id': 'identifier', 'nr': 'number', 'no': 'number', 'num': 'number', 'pat': 'patient',
+        'qty': 'quantity', 'tm': 'time', 'ts': 'timestamp', 'ty': 'type', 'typ': 'type'
+    }
+    """Common abbreviations in SAP (including IS-H) and clinical field names."""
+
+    SEPARATOR_RE = re.compile(r'[^0-9A-Za-z]+')
+    """Runs of characters separating parts, e.g. '_' in snake_case."""
+
+    WORD_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+    """Words within a part: acronyms before a capitalised word, capitalised or lower case words, acronyms, digits."""
+
+    @staticmethod
+    def load_abbreviations(file_path: str, sep: str = '\t') -> dict:
+        """Load an abbreviation table from a file of abbreviation and expansion per line, no header.
+
+        :param file_path: Path to file.
+        :param sep: Separator (default: '\\t').
+        :return: Dict of lower case abbreviation to expansion.
+        """
+        abbreviations = {}
+        with open(file_path, 'r', encoding='utf-8') as infile:
+            for line in infile:
+                parts = line.rstrip('\r\n').split(sep)
+                if len(parts) >= 2 and parts[0]:
+                    abbreviations[parts[0].lower()] = parts[1].lower()
+
+        return abbreviations
+
+    @staticmethod
+    def expand_word(word: str, trie: AbbreviationTrie, compounds: bool = False) -> list:
+        """Expand a lower case word by its abbreviations.
+
+        By default only a word that is an abbreviation as a whole is expanded. With compounds, a word may also be
+        covered by a sequence of abbreviations, e.g. 'bewty' becomes 'movement type', preferring longer ones first
+        and backtracking when the rest of the word cannot be covered. Compounds suit SAP style names, but can break
+        up real words that happen to be covered, e.g. 'patty' as 'patient type'.
+
+        A word that cannot be expanded is left as is.
+
+        :param word: Lower case word.
+        :param trie: AbbreviationTrie.
+        :param compounds: Whether to split words into sequences of abbreviations (default: False).
+        :return: List of words.
+        """
+        if not compounds:
+            end, expansion = trie.longest_prefix(word)
+            return expansion.split() if expansion is not None and end == len(word) else [word]
+
+        covers = {len(word): []}
+
+        def cover(position: int):
+            if position not in covers:
+                covers[position] = None
+                for end, expansion in reversed(trie.prefixes(word, position)):
+                    rest = cover(end)
+                    if rest is not None:
+                        covers[position] = expansion.split() + rest
+                        break
+            return covers[position]
+
+        expansions = cover(0)
+
+        return [word] if expansions is None else expansions
+
+    @staticmethod
+    def split_identifier(identifier: str, trie: AbbreviationTrie = None, compounds: bool = False) -> list:
+        """Split an identifier into lower case words, expanding abbreviations.
+
+        E.g. 'ADMIT_DT' -> ['admit', 'date'], 'PatientIdNo' -> ['patient', 'identifier', 'number'].
+
+        :param identifier: Field name.
+        :param trie: AbbreviationTrie; None for no expansion (default: None).
+        :param compounds: Whether to split words into sequences of abbreviations, see expand_word (default: False).
+        :return: List of words.
+        """
+        words = []
+        for part in IdentifierTools.SEPARATOR_RE.split(str(identifier)):
+            for word in IdentifierTools.WORD_RE.findall(part):
+                word = word.lower()
+                words.extend([word] if trie is None else IdentifierTools.expand_word(word, trie, compounds))
+
+        return words
+
+    @staticmethod
+    def tokenize_identifiers(identifiers: pd.Series, sep: str = ',', abbreviations: dict = None,
+                             compounds: bool = False) -> pd.Series:
+        """Split a column of identifiers into tokenized text.
+
+        Each distinct identifier is split once and the results mapped back by code, so columns with many repeated
+        field names cost little more than their distinct values.
+
+        :param identifiers: Series of field names.
+        :param sep: Separator for words in tokenized text (default: ',').
+        :param abbreviations: Dict of abbreviation to expansion; None for DEFAULT_ABBREVIATIONS (default: None).
+        :param compounds: Whether to split words into sequences of abbreviations, see expand_word (default: False).
+        :return: Series of tokenized text, with the index of identifiers. Missing values give ''.
+        """
+        trie = AbbreviationTrie(IdentifierTools.DEFAULT_ABBREVIATIONS if abbreviations is None else abbreviations)
+
+        codes, uniques = pd.factorize(identifiers)
+        tokenized = np.array([sep.join(IdentifierTools.split_identifier(identifier, trie, compounds))
+                              for identifier in uniques] + [''], dtype=object)
+
+        # Code -1 (missing) picks the trailing ''
+        return pd.Series(tokenized[codes], index=identifiers.index)
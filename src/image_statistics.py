@@ -0,0 +1,79 @@
+# image_statistics.py
+import json
+import numpy as np
+
+
+class ImageStatistics:
+    """Per-channel mean and standard deviation, and a histogram of shapes, accumulated over a stream of images.
+
+    Images are added one at a time with Welford's algorithm in its batched form (Chan et al.), so no more than one
+    image is held at a time and the results are numerically stable. Accumulators built over separate parts of a
+    dataset, e.g. by parallel workers, are combined exactly with merge.
+    """
+
+    def __init__(self):
+        self.images = 0
+        self.pixels = 0
+        self.mean = None
+        self.m2 = None
+        self.shapes = {}
+
+    @staticmethod
+    def pixels_by_channel(image: np.ndarray) -> np.ndarray:
+        """Return an image's pixels as a (pixels, channels) float64 array; 2D images have one channel."""
+        image = np.asarray(image, dtype=np.float64)
+        return image.reshape(-1, 1) if image.ndim == 2 else image.reshape(-1, image.shape[-1])
+
+    def _combine(self, pixels: int, mean: np.ndarray, m2: np.ndarray):
+        if self.mean is None:
+            self.pixels, self.mean, self.m2 = pixels, mean, m2
+            return
+        if len(mean) != len(self.mean):
+            raise ValueError(f'Images with {len(mean)} channels cannot be combined with images with '
+                             f'{len(self.mean)} channels.')
+
+        total = self.pixels + pixels
+        delta = mean - self.mean
+        self.mean = self.mean + delta * pixels / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.pixels * pixels / total
+        self.pixels = total
+
+    def update(self, image: np.ndarray):
+        """Add an image, of shape (height, width) or (height, width, channels)."""
+        pixels = ImageStatistics.pixels_by_channel(image)
+        if len(pixels) == 0:
+            return
+        mean = pixels.mean(axis=0)
+        self._combine(len(pixels), mean, ((pixels - mean) ** 2).sum(axis=0))
+
+        shape = 'x'.join(str(size) for size in np.shape(image))
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+        self.images += 1
+
+    def merge(self, other: 'ImageStatistics') -> 'ImageStatistics':
+        """Add the images accumulated by other, as if they had been added here. Returns self."""
+        if other.mean is not None:
+            self._combine(other.pixels, other.mean, other.m2)
+        for shape, count in other.shapes.items():
+            self.shapes[shape] = self.shapes.get(shape, 0) + count
+        self.images += other.images
+
+        return self
+
+    @property
+    def std(self) -> np.ndarray:
+        """Population standard deviation per channel."""
+        return None if self.mean is None else np.sqrt(self.m2 / self.pixels)
+
+    def to_dict(self) -> dict:
+        return {
+            'images': self.images,
+            'pixels': self.pixels,
+            'mean': [] if self.mean is None else self.mean.tolist(),
+            'std': [] if self.mean is None else self.std.tolist(),
+            'shapes': dict(sorted(self.shapes.items(), key=lambda item: -item[1]))
+        }
+
+    def save_json(self, save_path: str):
+        with open(save_path, 'w', encoding='utf-8') as outfile:
+            json.dump(self.to_dict(), outfile, indent=2)
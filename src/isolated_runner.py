@@ -0,0 +1,124 @@
+# isolated_runner.py
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import time
+from src.custom_exceptions import FileProcessingException
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; memory limits are then not enforced
+    resource = None
+
+
+def _isolated_call(conn, function, item, args: tuple, memory_limit_mb: int):
+    """Entry point of a worker process: apply limits, run function and send back its result or exception."""
+    if memory_limit_mb and resource is not None:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    try:
+        outcome = ('result', function(item, *args))
+    except MemoryError:
+        outcome = ('error', FileProcessingException(f'Memory limit of {memory_limit_mb} MB exceeded'))
+    except Exception as ex:
+        outcome = ('error', ex)
+
+    try:
+        conn.send(outcome)
+    except Exception as ex:
+        # E.g. an exception that cannot be pickled
+        conn.send(('error', FileProcessingException(f'{type(outcome[1]).__name__}: {outcome[1]} ({ex})')))
+    finally:
+        conn.close()
+
+
+class IsolatedRunner:
+    """Run a function over items, each in its own worker process with time and memory limits.
+
+    A malformed input that makes parsing hang or balloon memory then only costs its own worker: the worker is
+    killed, the cause recorded against the item and the run continues with the other items.
+    """
+
+    def __init__(self, function, args: tuple = (), timeout: float = None, memory_limit_mb: int = None,
+                 workers: int = None, on_failure=None, on_success=None):
+        """
+        :param function: Module level function (item, *args) -> result; must be picklable.
+        :param args: Further arguments to function (default: ()).
+        :param timeout: Seconds allowed per item; None for no limit (default: None).
+        :param memory_limit_mb: Address space allowed per worker in MB, POSIX only; None for no limit (default: None).
+        :param workers: Number of concurrent worker processes (default: None, number of CPUs).
+        :param on_failure: Optional function item -> None, called after an item fails, e.g. to remove partial
+        output (default: None).
+        :param on_success: Optional function (item, result) -> None, called as each item succeeds, e.g. to record
+        progress (default: None).
+        """
+        self.function = function
+        self.args = args
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.workers = workers or os.cpu_count() or 1
+        self.on_failure = on_failure
+        self.on_success = on_success
+
+    def _fail(self, outcomes: dict, index: int, item, ex: Exception):
+        outcomes[index] = [item, None, ex]
+        if self.on_failure is not None:
+            self.on_failure(item)
+
+    def run(self, items) -> list:
+        """Run all items.
+
+        :param items: Iterable of items, e.g. file paths.
+        :return: List of [item, result, exception] in the order of items; one of result and exception is None.
+        """
+        pending = list(enumerate(items))
+        pending.reverse()
+        running = {}
+        outcomes = {}
+
+        while pending or running:
+            while pending and len(running) < self.workers:
+                index, item = pending.pop()
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=_isolated_call,
+                                                  args=(sender, self.function, item, self.args, self.memory_limit_mb),
+                                                  daemon=True)
+                process.start()
+                sender.close()
+                running[receiver] = (index, item, process, time.monotonic())
+
+            wait_timeout = None
+            if self.timeout is not None:
+                now = time.monotonic()
+                wait_timeout = max(0.0, min(started + self.timeout - now for _, _, _, started in running.values()))
+
+            for receiver in wait(list(running), timeout=wait_timeout):
+                index, item, process, started = running.pop(receiver)
+                try:
+                    kind, value = receiver.recv()
+                except EOFError:
+                    # Worker died without reporting, e.g. killed by the operating system for using too much memory
+                    process.join()
+                    kind, value = 'error', FileProcessingException(
+                        f'Worker exited with code {process.exitcode}, possibly out of memory')
+                receiver.close()
+                process.join()
+                if kind == 'result':
+                    outcomes[index] = [item, value, None]
+                    if self.on_success is not None:
+                        self.on_success(item, value)
+                else:
+                    self._fail(outcomes, index, item, value)
+
+            if self.timeout is not None:
+                now = time.monotonic()
+                for receiver in [r for r, (_, _, _, started) in running.items() if now - started >= self.timeout]:
+                    index, item, process, started = running.pop(receiver)
+                    process.kill()
+                    process.join()
+                    receiver.close()
+                    self._fail(outcomes, index, item, FileProcessingException(f'Timed out after {self.timeout}s'))
+
+        return [outcomes[index] for index in sorted(outcomes)]
@@ -0,0 +1,177 @@
+# memory_profiler.py
+import contextlib
+import json
+import threading
+import tracemalloc
+from src.run_metrics import RunMetrics
+
+
+class MemoryProfiler:
+    """Attribute peak memory to pipeline stages and their files or sheets, and find the top allocation sites.
+
+    Code marks its stages with MemoryProfiler.stage(name, item), which costs nothing unless a profiler has been
+    started. While one is, each stage records the peak of memory traced by tracemalloc above its starting level, and
+    the peak resident memory of the process sampled by a background thread. Stages nest: a stage inherits the item
+    of the stage enclosing it, and the enclosing stage's peak includes that of the stages within it.
+
+    Allocations are process wide, so that peaks can be attributed, stages run one at a time while profiling,
+    serialising threaded pipelines; timings in this mode are not representative.
+    """
+
+    active = None
+    """Profiler that stages report to, set by start; None when not profiling."""
+
+    SITE_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+                    tracemalloc.Filter(False, '<unknown>')]
+    """Allocations not reported as sites: those of profiling itself and of imports."""
+
+    def __init__(self, top_sites: int = 10, frames: int = 1, sample_interval: float = 0.01):
+        """
+        :param top_sites: Number of allocation sites to keep per stage and report, by memory allocated in the stage
+        and still held at its end; 0 to skip, which avoids taking two snapshots per stage (default: 10).
+        :param frames: Number of frames stored per allocation (default: 1).
+        :param sample_interval: Seconds between samples of resident memory (default: 0.01).
+        """
+        self.top_sites = top_sites
+        self.frames = frames
+        self.sample_interval = sample_interval
+        self.records = []
+        self.sites = {}
+        self._stack = []
+        self._lock = threading.RLock()
+        self._peak_rss = 0
+        self._stop = threading.Event()
+        self._sampler = None
+
+    @staticmethod
+    def _reset_peak():
+        # Python 3.9+; earlier, stage peaks are the highest traced since profiling started
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+
+    def start(self) -> 'MemoryProfiler':
+        """Start tracing allocations and sampling resident memory, and make this the active profiler. Returns self."""
+        tracemalloc.start(self.frames)
+        self._peak_rss = RunMetrics.current_rss_bytes()
+
+        def sample():
+            while not self._stop.wait(self.sample_interval):
+                self._peak_rss = max(self._peak_rss, RunMetrics.current_rss_bytes())
+
+        self._sampler = threading.Thread(target=sample, daemon=True)
+        self._sampler.start()
+        MemoryProfiler.active = self
+
+        return self
+
+    def stop(self):
+        MemoryProfiler.active = None
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        tracemalloc.stop()
+
+    @staticmethod
+    def stage(name: str, item: str = ''):
+        """Context manager marking a stage for the active profiler, if any.
+
+        :param name: Stage, e.g. 'read_excel'.
+        :param item: File or sheet processed; '' for that of the enclosing stage (default: '').
+        """
+        profiler = MemoryProfiler.active
+        if profiler is None:
+            return contextlib.nullcontext()
+
+        return profiler._profile_stage(name, str(item))
+
+    @contextlib.contextmanager
+    def _profile_stage(self, name: str, item: str):
+        with self._lock:
+            parent = self._stack[-1] if self._stack else None
+            start_snapshot = tracemalloc.take_snapshot() if self.top_sites else None
+            current, peak = tracemalloc.get_traced_memory()
+            rss = RunMetrics.current_rss_bytes()
+            if parent is not None:
+                parent['peak'] = max(parent['peak'], peak)
+                parent['peak_rss'] = max(parent['peak_rss'], self._peak_rss)
+            MemoryProfiler._reset_peak()
+            self._peak_rss = rss
+            record = {'stage': name, 'item': item or (parent['item'] if parent else ''), 'start': current,
+                      'peak': current, 'start_rss': rss, 'peak_rss': rss}
+            self._stack.append(record)
+            try:
+                yield
+            finally:
+                self._stack.pop()
+                record['peak'] = max(record['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_rss'] = max(record['peak_rss'], self._peak_rss, RunMetrics.current_rss_bytes())
+                if start_snapshot is not None:
+                    end_snapshot = tracemalloc.take_snapshot().filter_traces(MemoryProfiler.SITE_FILTERS)
+                    self._add_sites(name, end_snapshot.compare_to(
+                        start_snapshot.filter_traces(MemoryProfiler.SITE_FILTERS), 'lineno'))
+                if parent is not None:
+                    parent['peak'] = max(parent['peak'], record['peak'])
+                    parent['peak_rss'] = max(parent['peak_rss'], record['peak_rss'])
+                # The enclosing stage measures its own peak from here
+                MemoryProfiler._reset_peak()
+                self.records.append({'stage': record['stage'],
+                                     'item': record['item'],
+                                     'peak_bytes': record['peak'] - record['start'],
+                                     'peak_rss_bytes': record['peak_rss'],
+                                     'rss_growth_bytes': record['peak_rss'] - record['start_rss']})
+
+    def _add_sites(self, name: str, statistics: list):
+        for stat in [stat for stat in statistics if stat.size_diff > 0][:self.top_sites]:
+            key = (name, str(stat.traceback))
+            self.sites[key] = max(self.sites.get(key, 0), stat.size_diff)
+
+    def summary(self) -> list:
+        """Return per stage: calls, largest peak with its item, and largest resident memory, largest peak first."""
+        stages = {}
+        for record in self.records:
+            stage = stages.setdefault(record['stage'], {'stage': record['stage'], 'calls': 0, 'peak_bytes': -1,
+                                                         'peak_item': '', 'peak_rss_bytes': 0})
+            stage['calls'] += 1
+            if record['peak_bytes'] > stage['peak_bytes']:
+                stage['peak_bytes'] = record['peak_bytes']
+                stage['peak_item'] = record['item']
+            stage['peak_rss_bytes'] = max(stage['peak_rss_bytes'], record['peak_rss_bytes'])
+
+        return sorted(stages.values(), key=lambda stage: -stage['peak_bytes'])
+
+    def top_allocation_sites(self) -> list:
+        """Return [stage, site, bytes] of the allocation sites holding most memory at the end of a stage."""
+        sites = sorted(self.sites.items(), key=lambda item: -item[1])[:self.top_sites]
+        return [[stage, site, size] for (stage, site), size in sites]
+
+    @staticmethod
+    def size_text(size: int) -> str:
+        return f'{size / 2 ** 20:.1f} MB' if size >= 2 ** 20 else f'{size / 2 ** 10:.1f} KB'
+
+    def report(self):
+        print('Memory profile, peak traced above start of stage (peak resident memory of process):')
+        for stage in self.summary():
+            print(f"  {stage['stage']}: {MemoryProfiler.size_text(stage['peak_bytes'])} on "
+                  f"{stage['peak_item'] or '-'} ({MemoryProfiler.size_text(stage['peak_rss_bytes'])}), "
+                  f"{stage['calls']} calls")
+        if self.sites:
+            print('Top allocation sites, memory allocated in a stage and held at its end:')
+            for stage, site, size in self.top_allocation_sites():
+                print(f'  {MemoryProfiler.size_text(size)} {site} ({stage})')
+
+    def save_json(self, save_path: str):
+        profile = {'stages': self.summary(),
+                   'top_allocation_sites': [{'stage': stage, 'site': site, 'bytes': size}
+                                            for stage, site, size in self.top_allocation_sites()],
+                   'records': self.records}
+        with open(save_path, 'w', encoding='utf-8') as outfile:
+            json.dump(profile, outfile, indent=2)
+
+    def finish(self, save_path: str):
+        """Stop profiling, print the report and save it as JSON."""
+        self.stop()
+        self.report()
+        self.save_json(save_path)
+        print(f'Memory profile saved to {save_path}.')
@@ -1,19 +1,77 @@
 # meta_data.py
 import pandas as pd
+from pathlib import Path
+from src.custom_exceptions import DataFrameException
 from src.meta_data_tools import MetaDataTools as MDT
 
 
 class MetaData:
-    """Meta Data File object"""
-    def __init__(self, source_path: str):
+    """Meta Data File object.
+
+    Main handle for a source file. Nothing is read until first needed, and each derived view is computed once
+    and cached until release() is called. Uses __slots__ to keep per-object overhead low when holding thousands.
+    """
+    __slots__ = ('source_path', 'is_labelled', 'sep', '_raw_data', '_descriptor_column', '_tokenized', '_bert')
+
+    def __init__(self, source_path: str, is_labelled: bool = False, sep: str = ','):
         """A Meta Data File.
 
         Keyword arguments:
         :param source_path: Path to source data file
+        :param is_labelled: Whether the data includes a labels column, assumed to be last (default: False)
+        :param sep: String separator in tokenized text (default: ',')
         """
-
         self.source_path = source_path
-        """Path to original data."""
+        self.is_labelled = is_labelled
+        self.sep = sep
+        self.release()
+
+    @property
+    def source(self) -> str:
+        """Name of source, as used in the Source column of tokenized output."""
+        return Path(self.source_path).stem
+
+    @property
+    def raw_data(self) -> pd.DataFrame:
+        """Original unprocessed data, read on first use."""
+        if self._raw_data is None:
+            self._raw_data = MDT.read_raw_data(self.source_path)
+        return self._raw_data
+
+    @property
+    def descriptor_column(self) -> list:
+        """[descriptor column index, original descriptor column name], as from identify_descriptor_column."""
+        if self._descriptor_column is None:
+            self._descriptor_column = MDT.identify_descriptor_column(self.raw_data)
+        return self._descriptor_column
+
+    @property
+    def tokenized(self) -> pd.DataFrame:
+        """DataFrame of fields against tokenized descriptors, as from field_tokenized_descriptor_df_from_df."""
+        if self._tokenized is None:
+            self._tokenized = MDT.field_tokenized_descriptor_df_from_df(
+                self.raw_data, self.source, is_labelled=self.is_labelled, sep=self.sep)
+        return self._tokenized
+
+    @property
+    def bert(self) -> pd.DataFrame:
+        """DataFrame of category against text, as from prep_df_for_bert. Only available when labelled."""
+        if self._bert is None:
+            if not self.is_labelled:
+                raise DataFrameException('BERT output requires labelled data.')
+
+            df = self.tokenized
+            if self.sep != ' ':
+                # Tokens never contain punctuation, so swapping the separator is safe and avoids re-cleansing
+                df = df.copy()
+                for column in ['Tokenized Source', 'Tokenized Descriptors']:
+                    df[column] = df[column].str.replace(self.sep, ' ', regex=False)
+            self._bert = MDT.prep_df_for_bert(df)
+        return self._bert
 
-        self.raw_data = MDT.read_raw_data(source_path)
-        """Original unprocessed data."""
+    def release(self):
+        """Drop raw data and all cached views; they are recomputed on next use."""
+        self._raw_data = None
+        self._descriptor_column = None
+        self._tokenized = None
+        self._bert = None
@@ -1,17 +1,50 @@
 # meta_data_tools.py
+import csv
 import datetime
 import nltk
+import openpyxl
 import os
 from pathlib import Path
 import pandas as pd
+from pandas.api.types import union_categoricals
 import re
 import string
 from src.custom_exceptions import DataFrameException
+from src.file_discovery import FileDiscovery
+from src.file_tools import FileTools
+from src.identifier_tools import IdentifierTools
+from src.isolated_runner import IsolatedRunner
+from src.memory_profiler import MemoryProfiler
+from src.pipeline import StagedPipeline
+from src.run_journal import RunJournal
+from src.run_metrics import RunMetrics
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
 
 
 class MetaDataTools:
     """Static methods to work with Meta Data"""
 
+    CATEGORY_COLUMNS = ['Source', 'Labels']
+    """Columns of tokenized DataFrames with few distinct values, held as category."""
+
+    EXCEL_SUFFIXES = ['.xlsx', '.xlsm']
+    """Suffixes of workbooks read by iter_field_tokens; other files are read as TSV."""
+
+    DEDUP_COLUMNS = ['Fields', 'Tokenized Descriptors', 'Labels']
+    """Columns identifying duplicate rows of tokenized DataFrames, where present."""
+
+    SOURCES_SEP = '|'
+    """Separator of source names in the Sources column of deduplicated DataFrames."""
+
+    STRING_DTYPE = pd.StringDtype('pyarrow') if pa is not None else pd.StringDtype()
+    """Dtype for other text columns of tokenized DataFrames."""
+
     @staticmethod
     def cleanse_text_in_dataframe(df: pd.DataFrame, columns_to_lower: list, columns_to_tokenize: list,
                                   sep: str = ',') -> pd.DataFrame:
@@ -49,10 +82,98 @@ class MetaDataTools:
         return new_df
 
     @staticmethod
-    def read_raw_data(source_path: str) -> pd.DataFrame:
-        raw_data = pd.read_csv(source_path, sep='\t', header='infer')
+    def read_raw_data(source_path: str, engine: str = 'default', usecols: list = None,
+                      column_names: list = None) -> pd.DataFrame:
+        """Read a TSV file into a DataFrame.
+
+        Engines:
+        - default: pandas parser with type inference on every column
+        - pyarrow: pyarrow's multithreaded CSV reader, all columns read as strings; requires pyarrow
+        - auto: pyarrow if available, otherwise the pandas parser with all columns read as strings. Files pyarrow
+          cannot parse, e.g. with rows short of columns, are read by the pandas parser too, which fills the gaps
+          with NaN.
+
+        :param source_path: Path to source file.
+        :param engine: One of 'default', 'pyarrow', 'auto' (default: 'default').
+        :param usecols: Optional list of column indices to read, all columns if None (default: None).
+        :param column_names: Optional column names as from read_header, if already read (default: None).
+        :return: DataFrame of raw data.
+        """
+        if engine not in ['default', 'pyarrow', 'auto']:
+            raise ValueError(f'Unknown engine: {engine}')
+        if engine == 'pyarrow' and pa_csv is None:
+            raise ValueError('Engine pyarrow requires the pyarrow package.')
+
+        if engine == 'default':
+            raw_data = pd.read_csv(source_path, sep='\t', header='infer', usecols=usecols)
+        elif pa_csv is None:
+            raw_data = pd.read_csv(source_path, sep='\t', header='infer', usecols=usecols, dtype=str)
+        else:
+            # Supply the (de-duplicated) header names so that columns can be projected by name
+            column_names = column_names if column_names is not None else MetaDataTools.read_header(source_path)
+            include_columns = column_names if usecols is None else [column_names[i] for i in usecols]
+            try:
+                table = pa_csv.read_csv(
+                    source_path,
+                    read_options=pa_csv.ReadOptions(column_names=column_names, skip_rows=1, use_threads=True),
+                    parse_options=pa_csv.ParseOptions(delimiter='\t'),
+                    convert_options=pa_csv.ConvertOptions(include_columns=include_columns,
+                                                          column_types={c: pa.string() for c in include_columns},
+                                                          strings_can_be_null=True))
+            except pa.ArrowInvalid:
+                if engine != 'auto':
+                    raise
+                return pd.read_csv(source_path, sep='\t', header='infer', usecols=usecols, dtype=str)
+            raw_data = table.to_pandas()
+
         return raw_data
 
+    @staticmethod
+    def read_header(source_path: str, sep: str = '\t') -> list:
+        """Read the column names from the first line of a delimited file, without reading the rest.
+
+        Blank and duplicate names are renamed as pandas does, e.g. 'Unnamed: 3', 'Table.1'.
+
+        :param source_path: Path to source file.
+        :param sep: Separator (default: '\t').
+        :return: List of column names.
+        """
+        with open(source_path, 'r', encoding='utf-8-sig', newline='') as infile:
+            header = next(csv.reader(infile, delimiter=sep), [])
+
+        column_names = []
+        counts = {}
+        for i, name in enumerate(header):
+            name = name if name else f'Unnamed: {i}'
+            if name in counts:
+                counts[name] += 1
+                name = f'{name}.{counts[name]}'
+            else:
+                counts[name] = 0
+            column_names.append(name)
+
+        return column_names
+
+    @staticmethod
+    def needed_column_indices(column_names: list, is_labelled: bool = False) -> list:
+        """Identify from the column names alone which columns field_tokenized_descriptor_df_from_df would use.
+
+        :param column_names: List of column names.
+        :param is_labelled: Whether the last column is labels (default: False).
+        :return: Sorted list of column indices (fields, descriptors, [labels]), or None if they cannot be
+        identified, in which case all columns should be read.
+        """
+        try:
+            indices = MetaDataTools.field_descriptor_label_indices(column_names, is_labelled)
+        except DataFrameException:
+            return None
+        indices = [index for index in indices if index is not None]
+        # Projected to these columns, the table must be read the same way, so each must be a different column
+        if len(set(indices)) < len(indices):
+            return None
+
+        return indices
+
     @staticmethod
     def cleanse_text(text: str) -> list:
         """Pre process text prior to tokenizing.
@@ -133,31 +254,23 @@ class MetaDataTools:
         :param is_labelled: Whether DataFrame includes labels column. Assumed to be last column.
         :returns: See description.
         """
-        min_column_count = 2
-        if is_labelled:
-            min_column_count = 3
+        field_column_index, descriptor_column_index, label_column_index = \
+            MetaDataTools.field_descriptor_label_indices(list(df.columns), is_labelled)
 
-        if len(df.columns) < min_column_count:
-            raise DataFrameException(f'Data set has too few columns, should have at least {min_column_count}.')
-        elif len(df.columns) == min_column_count:
-            descriptor_column_index = 1
-        else:
-            descriptor_column_index = MetaDataTools.identify_descriptor_column(df)[0]
-            if descriptor_column_index < 0:
-                raise DataFrameException('No descriptor column identified for DataFrame.')
-
-        field_names = df[df.columns[0]]
+        field_names = df[df.columns[field_column_index]]
         descriptions = [','.join(MetaDataTools.cleanse_text(text)) for text in df[df.columns[descriptor_column_index]]]
         result = [field_names, descriptions]
 
         if is_labelled:
-            labels = df[df.columns[min_column_count - 1]]
+            labels = df[df.columns[label_column_index]]
             result.append(labels)
 
         return result
 
     @staticmethod
-    def field_tokenized_descriptor_df_from_df(df: pd.DataFrame, source: str, is_labelled: bool = False, sep: str = ',') -> pd.DataFrame:
+    def field_tokenized_descriptor_df_from_df(df: pd.DataFrame, source: str, is_labelled: bool = False, sep: str = ',',
+                                              compact: bool = True, split_fields: bool = False,
+                                              abbreviations: dict = None, compounds: bool = False) -> pd.DataFrame:
         """Derive a reduced DataFrame of field names against tokenized descriptions from a source DataFrame.
 
         Assume that Field names are the first column, and that if only a minimum number of columns (2 if not labelled,
@@ -169,21 +282,18 @@ class MetaDataTools:
         :param source: Source of data.
         :param is_labelled: Whether labelled (Default: False)
         :param sep: String separator in tokenized text. (Default ',')
+        :param compact: Whether to use compact column dtypes, see compact_dtypes. (Default True)
+        :param split_fields: Whether to add column 'Tokenized Fields', field names split into words with
+        abbreviations expanded, see IdentifierTools. (Default False)
+        :param abbreviations: Abbreviation table for split_fields; None for IdentifierTools.DEFAULT_ABBREVIATIONS.
+        (Default None)
+        :param compounds: Whether split_fields also splits words into sequences of abbreviations, e.g. BEWTY, see
+        IdentifierTools.expand_word. (Default False)
         :returns: DataFrame. See description.
         """
 
-        min_column_count = 2
-        if is_labelled:
-            min_column_count = 3
-
-        if len(df.columns) < min_column_count:
-            raise DataFrameException('Data set has too few columns, should have at least two.')
-        elif len(df.columns) == min_column_count:
-            descriptor_column_index = 1
-        else:
-            descriptor_column_index = MetaDataTools.identify_descriptor_column(df)[0]
-            if descriptor_column_index < 0:
-                raise DataFrameException('No descriptor column identified for DataFrame.')
+        field_column_index, descriptor_column_index, label_column_index = \
+            MetaDataTools.field_descriptor_label_indices(list(df.columns), is_labelled)
 
         # Once fully generated, cleansed_df will have these columns, potentially with different names:
         # - 0 - Source
@@ -191,47 +301,437 @@ class MetaDataTools:
         # - 2 - Descriptors
         # - 3 - [optional] Labels
         df_to_cleanse = pd.DataFrame()
-        df_to_cleanse['Fields'] = df[df.columns[0]]
+        df_to_cleanse['Fields'] = df[df.columns[field_column_index]]
         df_to_cleanse['Descriptors'] = df[df.columns[descriptor_column_index]]
 
         columns_to_lower = [1]
         columns_to_tokenize = [0, 2]
         if is_labelled:
-            df_to_cleanse['Labels'] = df[df.columns[len(df.columns) - 1]]
+            df_to_cleanse['Labels'] = df[df.columns[label_column_index]]
             columns_to_lower.append(3)
         df_to_cleanse.insert(0, 'Source', source)
 
-        new_df = MetaDataTools.cleanse_text_in_dataframe(df_to_cleanse, columns_to_lower, columns_to_tokenize, sep)
+        with MemoryProfiler.stage('cleanse', source):
+            new_df = MetaDataTools.cleanse_text_in_dataframe(df_to_cleanse, columns_to_lower, columns_to_tokenize,
+                                                             sep)
+        if split_fields:
+            # Split before lower casing is lost, as camelCase boundaries are needed
+            new_df.insert(new_df.columns.get_loc('Fields') + 1, 'Tokenized Fields',
+                          IdentifierTools.tokenize_identifiers(df_to_cleanse['Fields'], sep, abbreviations, compounds))
+        if compact:
+            new_df = MetaDataTools.compact_dtypes(new_df)
 
         return new_df
 
+    @staticmethod
+    def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+        """Convert columns of a tokenized DataFrame to memory efficient dtypes.
+
+        Source and Labels hold few distinct values, so become category. All other columns become strings, backed
+        by Arrow when pyarrow is available, rather than Python objects.
+
+        :param df: DataFrame, as from field_tokenized_descriptor_df_from_df.
+        :return: DataFrame with converted columns.
+        """
+        dtypes = {column: 'category' if column in MetaDataTools.CATEGORY_COLUMNS else MetaDataTools.STRING_DTYPE
+                  for column in df.columns}
+
+        return df.astype(dtypes)
+
+    @staticmethod
+    def field_token_lists_from_df(df: pd.DataFrame, source: str, is_labelled: bool = False,
+                                  split_fields: bool = False, abbreviations: dict = None,
+                                  compounds: bool = False) -> list:
+        """Derive token lists per field directly from a source DataFrame, without joining tokens into strings.
+
+        Tokens of each field are those of the BERT text (see prep_df_for_bert): the tokenized source, the lower
+        case field name, the split field name if split_fields, then the tokenized descriptor. Column assumptions
+        are as for field_tokenized_descriptor_df_from_df.
+
+        :param df: Source DataFrame.
+        :param source: Source of data.
+        :param is_labelled: Whether labelled (Default: False)
+        :param split_fields: Whether to add the words of field names, see IdentifierTools (Default: False)
+        :param abbreviations: Abbreviation table for split_fields; None for IdentifierTools.DEFAULT_ABBREVIATIONS
+        (Default: None)
+        :param compounds: Whether split_fields also splits words into sequences of abbreviations (Default: False)
+        :returns: List [token lists, labels]; labels is None if not labelled.
+        """
+        field_column_index, descriptor_column_index, label_column_index = \
+            MetaDataTools.field_descriptor_label_indices(list(df.columns), is_labelled)
+
+        source_tokens = MetaDataTools.cleanse_text(str(source))
+        fields = df[df.columns[field_column_index]]
+        field_words = IdentifierTools.tokenize_identifiers(fields, ' ', abbreviations, compounds).str.split() \
+            if split_fields \
+            else [[]] * len(fields)
+        with MemoryProfiler.stage('cleanse', source):
+            token_lists = [source_tokens + [str.lower(str(field))] + words + MetaDataTools.cleanse_text(str(descriptor))
+                           for field, words, descriptor in zip(fields, field_words,
+                                                               df[df.columns[descriptor_column_index]])]
+
+        labels = None
+        if is_labelled:
+            labels = [str.lower(str(label)) for label in df[df.columns[label_column_index]]]
+
+        return [token_lists, labels]
+
+    @staticmethod
+    def field_descriptor_label_indices(column_names: list, is_labelled: bool = False) -> list:
+        """Identify field, descriptor and label columns by name, for every reader of source tables.
+
+        Field names are the first column. With only the minimum number of columns (2 if not labelled, 3 if
+        labelled) the second column is the descriptors, otherwise the first named as a description, see
+        identify_descriptor_column. If labelled, the last column is the labels.
+
+        :param column_names: List of column names.
+        :param is_labelled: Whether the last column is labels (default: False).
+        :return: List [field index, descriptor index, label index]; label index is None if not labelled.
+        """
+        min_column_count = 3 if is_labelled else 2
+
+        if len(column_names) < min_column_count:
+            raise DataFrameException(f'Data set has too few columns, should have at least {min_column_count}.')
+        elif len(column_names) == min_column_count:
+            descriptor_column_index = 1
+        else:
+            descriptor_column_index = \
+                MetaDataTools.identify_descriptor_column(pd.DataFrame(columns=column_names))[0]
+            if descriptor_column_index < 0:
+                raise DataFrameException('No descriptor column identified for DataFrame.')
+
+        return [0, descriptor_column_index, len(column_names) - 1 if is_labelled else None]
+
+    @staticmethod
+    def cell_text(value) -> str:
+        """Return a cell value as text; missing values (None, NaN) give ''."""
+        return '' if value is None or pd.isna(value) else str(value)
+
+    @staticmethod
+    def iter_field_tokens_from_rows(source: str, column_names: list, rows, is_labelled: bool = False):
+        """Lazily tokenize rows of a table, see iter_field_tokens.
+
+        :param source: Source of data.
+        :param column_names: List of column names.
+        :param rows: Iterable of rows, each a sequence of cell values; short rows are padded with missing values.
+        :param is_labelled: Whether the last column is labels (default: False).
+        :return: Generator of tuples (source, field, descriptor tokens, label).
+        """
+        field_index, descriptor_index, label_index = \
+            MetaDataTools.field_descriptor_label_indices(column_names, is_labelled)
+
+        def cell(row, index: int) -> str:
+            return MetaDataTools.cell_text(row[index]) if index < len(row) else ''
+
+        for row in rows:
+            yield (source,
+                   str.lower(cell(row, field_index)),
+                   MetaDataTools.cleanse_text(cell(row, descriptor_index)),
+                   str.lower(cell(row, label_index)) if is_labelled else None)
+
+    @staticmethod
+    def iter_field_tokens(source, is_labelled: bool = False, source_name: str = '', skip_sheets: tuple = ()):
+        """Lazily yield the field names, tokenized descriptors and labels of a source, one field at a time.
+
+        Nothing is materialized beyond the current row: TSV files are read line by line, workbooks sheet by sheet
+        and row by row through openpyxl's read-only mode, and DataFrames row by row. Consumers such as indexers and
+        feature builders can therefore process corpora of any size. Column assumptions are as for
+        field_tokenized_descriptor_df_from_df; a table whose columns cannot be identified raises DataFrameException
+        when reached. Empty cells (and NaN in DataFrames) give ''; unlike pandas readers, no text such as 'null' is
+        taken as missing. Entirely empty rows of files are skipped.
+
+        :param source: Path to a TSV file or workbook (see EXCEL_SUFFIXES), or a DataFrame.
+        :param is_labelled: Whether the last column is labels (default: False).
+        :param source_name: Source of data for a DataFrame; for files the file stem, for workbooks each sheet name
+        (default: '').
+        :param skip_sheets: Names of workbook sheets to skip, e.g. ('Status list',) (default: ()).
+        :return: Generator of tuples (source, field, descriptor tokens, label); field is lower case, as in
+        field_token_lists_from_df, and label lower case, or None if not labelled.
+        """
+        if isinstance(source, pd.DataFrame):
+            yield from MetaDataTools.iter_field_tokens_from_rows(
+                source_name, list(source.columns), source.itertuples(index=False, name=None), is_labelled)
+        elif Path(source).suffix.lower() in MetaDataTools.EXCEL_SUFFIXES:
+            wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+            try:
+                for ws in wb.worksheets:
+                    if ws.title in skip_sheets:
+                        continue
+                    rows = ws.iter_rows(values_only=True)
+                    header = list(next(rows, ()))
+                    # Read-only sheets may report empty trailing columns
+                    while header and header[-1] is None:
+                        header.pop()
+                    if not header:
+                        continue
+                    column_names = [f'Unnamed: {i}' if name is None else str(name) for i, name in enumerate(header)]
+                    rows = (row[:len(column_names)] for row in rows if any(value is not None for value in row))
+                    yield from MetaDataTools.iter_field_tokens_from_rows(ws.title, column_names, rows, is_labelled)
+            finally:
+                wb.close()
+        else:
+            with open(source, 'r', encoding='utf-8', newline='') as infile:
+                reader = csv.reader(infile, delimiter='\t')
+                next(reader, None)
+                rows = (row for row in reader if row)
+                yield from MetaDataTools.iter_field_tokens_from_rows(
+                    source_name or Path(source).stem, MetaDataTools.read_header(source), rows, is_labelled)
+
+    @staticmethod
+    def read_source_file(src_path: str, engine: str = 'auto') -> pd.DataFrame:
+        """Read a source TSV file for tokenizing.
+
+        Only the field and descriptor columns are read where they can be identified from the header.
+
+        :param src_path: Path to source file.
+        :param engine: Parsing engine, see read_raw_data (default: 'auto').
+        :return: DataFrame of raw data.
+        """
+        with MemoryProfiler.stage('read', Path(src_path).name):
+            column_names = MetaDataTools.read_header(src_path)
+            usecols = MetaDataTools.needed_column_indices(column_names)
+            return MetaDataTools.read_raw_data(src_path, engine=engine, usecols=usecols, column_names=column_names)
+
+    @staticmethod
+    def field_descriptors_save_path(src_path: str, target_dir: str, prefix: str = '') -> str:
+        """Return the path field descriptors derived from a source file are saved to."""
+        return os.path.join(Path(target_dir), f'{prefix}_ProcessedDF {Path(src_path).stem}.txt')
+
+    @staticmethod
+    def save_field_descriptors_df(df: pd.DataFrame, src_path: str, target_dir: str, prefix: str = '') -> str:
+        """Save DataFrame of field descriptors derived from a source file.
+
+        :param df: DataFrame of processed data.
+        :param src_path: Path to source file.
+        :param target_dir: Path to directory for saving files.
+        :param prefix: String to use as a common prefix for saving files (default: '').
+        :return: Path of saved file.
+        """
+        save_path = MetaDataTools.field_descriptors_save_path(src_path, target_dir, prefix)
+        MetaDataTools.write_df(df, save_path)
+        print('Tokenized file saved to {}.'.format(save_path))
+
+        return save_path
+
     @staticmethod
     def field_descriptors_df_from_file(src_path: str, target_dir: str, prefix: str = '',
-                                       to_save: bool = False) -> pd.DataFrame:
+                                       to_save: bool = False, engine: str = 'auto',
+                                       split_fields: bool = False, abbreviations: dict = None,
+                                       compounds: bool = False) -> pd.DataFrame:
         """Create DataFrame of field descriptors from file
 
+        Only the field and descriptor columns are read where they can be identified from the header.
+
         :param src_path: Path to source file.
         :param target_dir: Path to directory for saving files.
         :param prefix: String to use as a common prefix for saving files (default: '').
         :param to_save: Whether to save the file to the working directory (default: False).
+        :param engine: Parsing engine, see read_raw_data (default: 'auto').
+        :param split_fields: Whether to add column 'Tokenized Fields' (default: False).
+        :param abbreviations: Abbreviation table for split_fields, see IdentifierTools.tokenize_identifiers; None for
+        IdentifierTools.DEFAULT_ABBREVIATIONS (default: None).
+        :param compounds: Whether split_fields also splits words into sequences of abbreviations, e.g. BEWTY, see
+        IdentifierTools.expand_word (default: False).
         :return: DataFrame of processed data.
         """
-        df = MetaDataTools.read_raw_data(src_path)
+        df = MetaDataTools.read_source_file(src_path, engine)
 
-        field_descriptors = MetaDataTools.field_tokenized_descriptor_df_from_df(df, Path(src_path).stem)
+        field_descriptors = MetaDataTools.field_tokenized_descriptor_df_from_df(
+            df, Path(src_path).stem, split_fields=split_fields, abbreviations=abbreviations, compounds=compounds)
         if to_save:
-            save_name = f'{prefix}_ProcessedDF {Path(src_path).stem}.txt'
-            save_path = os.path.join(Path(target_dir), save_name)
-            # Open file with newline='' to prevent blank intermediate lines
-            with open(save_path, 'w', encoding='utf-8', newline='') as outfile:
-                outfile.write(field_descriptors.to_csv(sep='\t', index=False))
-                print('Tokenized file saved to {}.'.format(save_path))
+            MetaDataTools.save_field_descriptors_df(field_descriptors, src_path, target_dir, prefix)
 
         return field_descriptors
 
+    @staticmethod
+    def read_field_descriptors_output(save_path: str) -> pd.DataFrame:
+        """Read back a DataFrame saved by save_field_descriptors_df, e.g. the output of a resumed run.
+
+        Every column is read as a string, whatever the run's engine, so that fields such as '007' or 'NA' are kept
+        as saved; only empty cells are missing values.
+
+        :param save_path: Path to saved file.
+        :return: DataFrame with compact dtypes, as from compact_dtypes.
+        """
+        df = pd.read_csv(save_path, sep='\t', dtype=str, keep_default_na=False, na_values=[''])
+
+        return MetaDataTools.compact_dtypes(df)
+
+    @staticmethod
+    def field_descriptors_dfs_from_files(src_path: str, target_dir: str, prefix: str = '', to_save: bool = False,
+                                         suffix: str = '.txt', engine: str = 'auto', split_fields: bool = False,
+                                         abbreviations: dict = None, compounds: bool = False, readers: int = 2,
+                                         queue_size: int = 4,
+                                         journal: RunJournal = None, file_paths=None, isolated: bool = False,
+                                         timeout: float = None, memory_limit_mb: int = None,
+                                         workers: int = None, metrics: RunMetrics = None) -> (list, list):
+        """Process files in folder through a staged pipeline to generate DataFrames of fields vs tokenized descriptors
+
+        Files are read by prefetching reader threads, tokenized in the calling thread and saved by a background
+        writer thread, connected by bounded queues, so that disk reads and writes overlap with tokenizing.
+
+        With a journal, each saved file is recorded as completed, and files completed by an earlier run are not
+        processed again: their saved output is read back instead.
+
+        Isolated, each file is instead processed in its own worker process, within the given time and memory limits.
+        A file that fails in any way, including a hung or runaway parse, is recorded in the errors with its cause,
+        any partial output is removed, and the run continues.
+
+        :param src_path: Source path to directory holding files to process.
+        :param target_dir: Folder where temporary and final files are to be saved.
+        :param prefix: String for prefixing the final filename (default: '').
+        :param to_save: Whether to save the file to the working directory (default: False).
+        :param suffix: Suffix of source files (default: '.txt').
+        :param engine: Parsing engine, see read_raw_data (default: 'auto').
+        :param split_fields: Whether to add column 'Tokenized Fields' (default: False).
+        :param abbreviations: Abbreviation table for split_fields, see IdentifierTools.tokenize_identifiers; None for
+        IdentifierTools.DEFAULT_ABBREVIATIONS (default: None).
+        :param compounds: Whether split_fields also splits words into sequences of abbreviations, e.g. BEWTY, see
+        IdentifierTools.expand_word (default: False).
+        :param readers: Number of reader threads (default: 2).
+        :param queue_size: Maximum number of files waiting between stages (default: 4).
+        :param journal: Optional RunJournal for checkpointing and resuming; requires to_save (default: None).
+        :param file_paths: Optional iterable of files to process instead of all those found, e.g. a shard of them
+        (default: None).
+        :param isolated: Whether to process each file in an isolated worker process (default: False).
+        :param timeout: Seconds allowed per file when isolated; None for no limit (default: None).
+        :param memory_limit_mb: Memory allowed per worker in MB when isolated, POSIX only; None for no limit
+        (default: None).
+        :param workers: Number of worker processes when isolated (default: None, number of CPUs).
+        :param metrics: Optional RunMetrics, updated as each file completes or fails; files completed by an earlier
+        run count as cache hits (default: None).
+        :return: List, List. List of [file path, DataFrame] in discovery order and list of files with errors.
+        """
+        if journal is not None and not to_save:
+            raise ValueError('A run journal requires outputs to be saved.')
+
+        if file_paths is None:
+            file_paths = FileDiscovery.iter_file_paths(src_path, suffix)
+        if isolated:
+            return MetaDataTools._isolated_field_descriptors_dfs_from_files(
+                file_paths, target_dir, prefix, to_save, engine, split_fields, abbreviations, compounds, journal,
+                timeout, memory_limit_mb,
+                workers, metrics)
+
+        def read(file_path: str) -> list:
+            completed_output = journal.completed_output(file_path) if journal is not None else ''
+            if metrics is not None:
+                metrics.increment('cache_hits' if completed_output else 'cache_misses')
+            if completed_output:
+                return [True, MetaDataTools.read_field_descriptors_output(completed_output)]
+            return [False, MetaDataTools.read_source_file(file_path, engine)]
+
+        def tokenize(file_path: str, data: list) -> list:
+            is_resumed, df = data
+            if not is_resumed:
+                df = MetaDataTools.field_tokenized_descriptor_df_from_df(
+                    df, Path(file_path).stem, split_fields=split_fields, abbreviations=abbreviations,
+                    compounds=compounds)
+            if metrics is not None and not to_save:
+                metrics.record_file('' if is_resumed else file_path, len(df))
+            return [is_resumed, df]
+
+        def save(file_path: str, data: list):
+            is_resumed, df = data
+            save_path = ''
+            if not is_resumed:
+                save_path = MetaDataTools.save_field_descriptors_df(df, file_path, target_dir, prefix)
+                if journal is not None:
+                    journal.record(file_path, save_path, len(df))
+            if metrics is not None:
+                metrics.record_file('' if is_resumed else file_path, len(df), save_path)
+
+        if metrics is not None:
+            read, tokenize, save = [metrics.counting_failures(stage) for stage in [read, tokenize, save]]
+
+        pipeline = StagedPipeline(read=read,
+                                  process=tokenize,
+                                  write=save if to_save else None,
+                                  readers=readers,
+                                  queue_size=queue_size,
+                                  is_recoverable=lambda ex: isinstance(ex, DataFrameException))
+
+        results = []
+        errors = []
+        resumed_count = 0
+        for file_path, data, ex in pipeline.run(file_paths):
+            if ex is None:
+                resumed_count += data[0]
+                results.append([file_path, data[1]])
+            else:
+                errors.append([file_path, ex])
+
+        if resumed_count > 0:
+            print(f'{resumed_count} files already completed, outputs reused.')
+
+        return results, errors
+
+    @staticmethod
+    def _isolated_field_descriptors_dfs_from_files(file_paths, target_dir: str, prefix: str, to_save: bool,
+                                                   engine: str, split_fields: bool, abbreviations: dict,
+                                                   compounds: bool, journal: RunJournal,
+                                                   timeout: float, memory_limit_mb: int, workers: int,
+                                                   metrics: RunMetrics) -> (list, list):
+        """Isolated variant of field_descriptors_dfs_from_files, see there."""
+        outcomes = {}
+        to_process = []
+        for index, file_path in enumerate(file_paths):
+            completed_output = journal.completed_output(file_path) if journal is not None else ''
+            if completed_output:
+                outcomes[index] = [file_path, MetaDataTools.read_field_descriptors_output(completed_output), None]
+                if metrics is not None:
+                    metrics.increment('cache_hits')
+                    metrics.record_file(rows=len(outcomes[index][1]))
+            else:
+                to_process.append([index, file_path])
+        resumed_count = len(outcomes)
+
+        def remove_partial_output(file_path: str):
+            save_path = MetaDataTools.field_descriptors_save_path(file_path, target_dir, prefix)
+            if to_save and Path(save_path).is_file():
+                os.remove(save_path)
+            if metrics is not None:
+                metrics.increment('cache_misses')
+                metrics.increment('files_failed')
+
+        # Recorded as each file completes, so progress is visible and kept if the run is interrupted
+        def record_output(file_path: str, df: pd.DataFrame):
+            save_path = MetaDataTools.field_descriptors_save_path(file_path, target_dir, prefix) if to_save else ''
+            if journal is not None:
+                journal.record(file_path, save_path, len(df))
+            if metrics is not None:
+                metrics.increment('cache_misses')
+                metrics.record_file(file_path, len(df), save_path)
+
+        runner = IsolatedRunner(MetaDataTools.field_descriptors_df_from_file,
+                                args=(target_dir, prefix, to_save, engine, split_fields, abbreviations, compounds),
+                                timeout=timeout,
+                                memory_limit_mb=memory_limit_mb,
+                                workers=workers,
+                                on_failure=remove_partial_output,
+                                on_success=record_output)
+        run_outcomes = runner.run([file_path for index, file_path in to_process])
+        for (index, file_path), outcome in zip(to_process, run_outcomes):
+            outcomes[index] = outcome
+
+        results = []
+        errors = []
+        for file_path, df, ex in [outcomes[index] for index in sorted(outcomes)]:
+            if ex is None:
+                results.append([file_path, df])
+            else:
+                errors.append([file_path, ex])
+
+        if resumed_count > 0:
+            print(f'{resumed_count} files already completed, outputs reused.')
+
+        return results, errors
+
     @staticmethod
     def dict_of_field_descriptors_dfs_from_files(src_path: str, target_dir: str, prefix: str = '',
-                                                 to_save: bool = False, suffix: str = '.txt') -> (dict, list):
+                                                 to_save: bool = False, suffix: str = '.txt',
+                                                 engine: str = 'auto', split_fields: bool = False,
+                                                 abbreviations: dict = None, compounds: bool = False) -> (dict, list):
         """Process files in folder to generate a dictionary of DataFrames of fields vs tokenized descriptors
 
         :param src_path: Source path to directory holding files to process.
@@ -239,25 +739,27 @@ class MetaDataTools:
         :param prefix: String for prefixing the final filename (default: '').
         :param to_save: Whether to save the file to the working directory (default: False).
         :param suffix: Suffix of source files (default: .txt).
+        :param engine: Parsing engine, see read_raw_data (default: 'auto').
+        :param split_fields: Whether to add column 'Tokenized Fields' (default: False).
+        :param abbreviations: Abbreviation table for split_fields, see IdentifierTools.tokenize_identifiers; None for
+        IdentifierTools.DEFAULT_ABBREVIATIONS (default: None).
+        :param compounds: Whether split_fields also splits words into sequences of abbreviations, e.g. BEWTY, see
+        IdentifierTools.expand_word (default: False).
         :return: Dict, List. Dictionary of DataFrames and list of files with errors.
         """
-        df_dict = {}
-        errors = []
-        for root, dirs, files in os.walk(src_path, topdown=False):
-            for file_name in [file_name for file_name in files if Path(file_name).suffix == suffix]:
-                file_path = os.path.join(src_path, file_name)
-                try:
-                    df = MetaDataTools.field_descriptors_df_from_file(file_path, target_dir, prefix, to_save=to_save)
-                    key = Path(file_path).name
-                    df_dict[key] = df
-                except DataFrameException as ex:
-                    errors.append([file_path, ex])
+        results, errors = MetaDataTools.field_descriptors_dfs_from_files(
+            src_path, target_dir, prefix, to_save=to_save, suffix=suffix, engine=engine, split_fields=split_fields,
+            abbreviations=abbreviations, compounds=compounds)
+        df_dict = {Path(file_path).name: df for file_path, df in results}
 
         return df_dict, errors
 
     @staticmethod
     def list_of_field_descriptors_dfs_from_files(src_path: str, target_dir: str, prefix: str = '',
-                                                 to_save: bool = False, suffix: str = '.txt') -> (list, list):
+                                                 to_save: bool = False, suffix: str = '.txt',
+                                                 engine: str = 'auto', split_fields: bool = False,
+                                                 abbreviations: dict = None, compounds: bool = False,
+                                                 journal: RunJournal = None) -> (list, list):
         """Process files in folder to generate a list of DataFrames of fields vs tokenized descriptors
 
         :param src_path: Source path to directory holding files to process.
@@ -265,18 +767,19 @@ class MetaDataTools:
         :param prefix: String for prefixing the final filename (default: '').
         :param to_save: Whether to save the file to the working directory (default: False).
         :param suffix: Suffix of source files (default: '.txt').
+        :param engine: Parsing engine, see read_raw_data (default: 'auto').
+        :param split_fields: Whether to add column 'Tokenized Fields' (default: False).
+        :param abbreviations: Abbreviation table for split_fields, see IdentifierTools.tokenize_identifiers; None for
+        IdentifierTools.DEFAULT_ABBREVIATIONS (default: None).
+        :param compounds: Whether split_fields also splits words into sequences of abbreviations, e.g. BEWTY, see
+        IdentifierTools.expand_word (default: False).
+        :param journal: Optional RunJournal for checkpointing and resuming; requires to_save (default: None).
         :return: List, List. List of DataFrames and list of files with errors.
         """
-        df_list = []
-        errors = []
-        for root, dirs, files in os.walk(src_path, topdown=False):
-            for file_name in [file_name for file_name in files if Path(file_name).suffix == suffix]:
-                file_path = os.path.join(src_path, file_name)
-                try:
-                    df = MetaDataTools.field_descriptors_df_from_file(file_path, target_dir, prefix, to_save=to_save)
-                    df_list.append(df)
-                except DataFrameException as ex:
-                    errors.append([file_path, ex])
+        results, errors = MetaDataTools.field_descriptors_dfs_from_files(
+            src_path, target_dir, prefix, to_save=to_save, suffix=suffix, engine=engine, split_fields=split_fields,
+            abbreviations=abbreviations, compounds=compounds, journal=journal)
+        df_list = [df for file_path, df in results]
 
         return df_list, errors
 
@@ -291,12 +794,52 @@ class MetaDataTools:
         collated_dfs = pd.DataFrame()
 
         if len(df_list) > 0:
-
-            collated_dfs = pd.concat(df_list)
+            # Concatenating categories that differ gives object columns, so give all frames the union first
+            for column in df_list[0].columns:
+                if all(isinstance(df[column].dtype, pd.CategoricalDtype) for df in df_list if column in df.columns):
+                    categories = union_categoricals([df[column] for df in df_list if column in df.columns]).categories
+                    df_list = [df.assign(**{column: df[column].cat.set_categories(categories)})
+                               if column in df.columns else df for df in df_list]
+
+            with MemoryProfiler.stage('concat', f'{len(df_list)} DataFrames'):
+                collated_dfs = pd.concat(df_list)
             collated_dfs.reset_index(inplace=True, drop=True)
 
         return collated_dfs
 
+    @staticmethod
+    def deduplicate_df(df: pd.DataFrame, columns: list = None, with_counts: bool = False,
+                       with_sources: bool = False) -> pd.DataFrame:
+        """Drop rows duplicating an earlier row in the given columns, in one pass over a 64-bit hash per row.
+
+        The first occurrence of each row is kept, in its original position. Distinct rows colliding on their 64-bit
+        hash would be dropped too; the chance is negligible below billions of rows.
+
+        :param df: DataFrame, e.g. collated by collate_dfs_from_list.
+        :param columns: Columns identifying duplicates; None for those of DEDUP_COLUMNS present in df (default: None).
+        :param with_counts: Whether to add column 'Count', the number of occurrences of each row (default: False).
+        :param with_sources: Whether to add column 'Sources', the distinct sources of each row separated by
+        SOURCES_SEP (default: False).
+        :return: DataFrame of distinct rows.
+        """
+        columns = [column for column in MetaDataTools.DEDUP_COLUMNS if column in df.columns] \
+            if columns is None else columns
+        hashes = pd.util.hash_pandas_object(df[columns], index=False)
+        is_first = ~hashes.duplicated().to_numpy()
+
+        deduplicated = df[is_first].reset_index(drop=True)
+        first_hashes = hashes[is_first]
+        if with_counts:
+            deduplicated['Count'] = first_hashes.map(hashes.value_counts()).to_numpy()
+        if with_sources and 'Source' in df.columns:
+            sources = df['Source'].astype(str).groupby(hashes.to_numpy()).agg(
+                lambda values: MetaDataTools.SOURCES_SEP.join(sorted(set(values))))
+            deduplicated['Sources'] = first_hashes.map(sources).to_numpy()
+
+        print(f'{len(df) - len(deduplicated)} duplicate rows dropped, {len(deduplicated)} distinct rows kept.')
+
+        return deduplicated
+
     @staticmethod
     def save_df(df: pd.DataFrame, save_dir: str = '', save_name: str = '', prefix: str = '', sep: str = '\t'):
         """Save list of DataFrames
@@ -312,10 +855,8 @@ class MetaDataTools:
 
             if len(save_dir) > 0 and len(save_name) > 0:
                 save_path = os.path.join(save_dir, f'{prefix}{save_name}')
-                # Open file with newline='' to prevent blank intermediate lines
-                with open(save_path, 'w', encoding='utf-8', newline='') as outfile:
-                    outfile.write(df.to_csv(sep=sep, index=False))
-                    print('Data from DataFrames saved to {}.'.format(save_path))
+                MetaDataTools.write_df(df, save_path, sep=sep)
+                print('Data from DataFrames saved to {}.'.format(save_path))
             else:
                 print('No DataFrames saved.')
         else:
@@ -323,6 +864,23 @@ class MetaDataTools:
 
         return df
 
+    @staticmethod
+    def write_df(df: pd.DataFrame, save_path: str, sep: str = '\t', chunk_size: int = 100000):
+        """Write DataFrame to a delimited text file in batches of rows, avoiding building the whole text in memory.
+
+        :param df: DataFrame.
+        :param save_path: Path to target file.
+        :param sep: Separator (default: '\t')
+        :param chunk_size: Number of rows written per batch (default: 100000)
+        """
+        # Open file with newline='' to prevent blank intermediate lines
+        with MemoryProfiler.stage('to_csv', Path(save_path).name), \
+                open(save_path, 'w', encoding='utf-8', newline='') as outfile:
+            if len(df) == 0:
+                df.to_csv(outfile, sep=sep, index=False)
+            for i, chunk in enumerate(FileTools.chunks_generator(df, chunk_size)):
+                chunk.to_csv(outfile, sep=sep, index=False, header=(i == 0))
+
     @staticmethod
     def prep_df_for_bert(df: pd.DataFrame) -> pd.DataFrame:
         """Save list of DataFrames
@@ -333,7 +891,10 @@ class MetaDataTools:
         new_df = pd.DataFrame()
         new_df['category'] = df['Labels']
 
-        new_df['text'] = df[['Tokenized Source', 'Fields', 'Tokenized Descriptors']].agg(' '.join, axis=1)
+        # Split field names, if added, follow the field names as in field_token_lists_from_df
+        text_columns = [column for column in ['Tokenized Source', 'Fields', 'Tokenized Fields', 'Tokenized Descriptors']
+                        if column in df.columns]
+        new_df['text'] = df[text_columns].astype(str).agg(' '.join, axis=1).str.split().str.join(' ')
 
         return new_df
 
@@ -0,0 +1,244 @@
+# near_duplicates.py
+import numpy as np
+import pandas as pd
+import zlib
+
+
+class NearDuplicateTools:
+    """Find fields with near identical tokenized descriptors across sources, using MinHash and
+    locality-sensitive hashing (LSH).
+
+    Each set of tokens is reduced to a fixed length MinHash signature, whose agreement estimates Jaccard similarity.
+    Rows with identical signatures are grouped and each distinct signature is split into bands; only distinct
+    signatures sharing an identical band are compared, so the work and the number of pairs reported grow roughly
+    linearly with the number of fields rather than quadratically, even when standard fields repeat in every source.
+    """
+
+    PRIME = np.uint64(4294967291)
+    """Largest prime below 2^32: with operands reduced below it, a * x + b cannot overflow 64 bits."""
+
+    MAX_HASH = np.uint64((1 << 32) - 1)
+    """Signature value of rows without tokens; above any permuted hash, which is below PRIME."""
+
+    @staticmethod
+    def minhash_signatures(token_lists, num_perm: int = 128, seed: int = 1) -> np.ndarray:
+        """Compute MinHash signatures for sets of tokens.
+
+        Tokens are hashed with CRC32, so signatures are reproducible across processes and machines.
+
+        :param token_lists: Iterable of lists of tokens, one per row.
+        :param num_perm: Number of hash permutations, i.e. signature length (default: 128).
+        :param seed: Seed for the permutations (default: 1).
+        :return: Array of shape (rows, num_perm), dtype uint64. Rows without tokens are all MAX_HASH.
+        """
+        generator = np.random.RandomState(seed)
+        a = generator.randint(1, int(NearDuplicateTools.PRIME), size=num_perm, dtype=np.int64).astype(np.uint64)
+        b = generator.randint(0, int(NearDuplicateTools.PRIME), size=num_perm, dtype=np.int64).astype(np.uint64)
+
+        token_hashes = {}
+        signatures = []
+        for tokens in token_lists:
+            hashes = []
+            for token in set(tokens):
+                if token:
+                    if token not in token_hashes:
+                        token_hashes[token] = zlib.crc32(token.encode('utf-8'))
+                    hashes.append(token_hashes[token])
+            if len(hashes) == 0:
+                signatures.append(np.full(num_perm, NearDuplicateTools.MAX_HASH, dtype=np.uint64))
+                continue
+            hv = np.array(hashes, dtype=np.uint64)[:, np.newaxis] % NearDuplicateTools.PRIME
+            # All operands are below 2^32, so hv * a + b < 2^64 and the universal hash is exact
+            permuted = (hv * a + b) % NearDuplicateTools.PRIME
+            signatures.append(permuted.min(axis=0))
+
+        if len(signatures) == 0:
+            return np.zeros((0, num_perm), dtype=np.uint64)
+
+        return np.vstack(signatures)
+
+    @staticmethod
+    def bands_and_rows(threshold: float, num_perm: int) -> tuple:
+        """Choose the LSH band layout whose similarity threshold, (1/bands)^(1/rows), is closest to the given one.
+
+        :param threshold: Target Jaccard similarity.
+        :param num_perm: Signature length.
+        :return: Tuple (bands, rows), bands * rows <= num_perm.
+        """
+        layouts = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)]
+        return min(layouts, key=lambda layout: abs((1.0 / layout[0]) ** (1.0 / layout[1]) - threshold))
+
+    @staticmethod
+    def buckets(values: np.ndarray) -> list:
+        """Group rows of a 2D array by identical value.
+
+        :param values: Array of shape (rows, columns).
+        :return: List of arrays of row indices, one per group of more than one row.
+        """
+        values = np.ascontiguousarray(values)
+        keys = values.view(np.dtype((np.void, values.dtype.itemsize * values.shape[1]))).ravel()
+        _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        order = np.argsort(inverse.ravel(), kind='stable')
+        bucket_starts = np.concatenate([[0], np.cumsum(counts)])
+
+        return [order[bucket_starts[bucket]:bucket_starts[bucket + 1]] for bucket in np.flatnonzero(counts > 1)]
+
+    @staticmethod
+    def candidate_pairs(signatures: np.ndarray, bands: int, rows: int, max_bucket_size: int = 1000) -> np.ndarray:
+        """Find pairs of rows sharing at least one identical band of their signatures.
+
+        Meant for distinct signatures, see unique_signatures: rows with identical signatures would otherwise share
+        every band and be paired with each other quadratically.
+
+        :param signatures: Array of MinHash signatures, shape (rows, signature length).
+        :param bands: Number of bands.
+        :param rows: Number of signature values per band.
+        :param max_bucket_size: Band buckets larger than this are skipped, as they come from very common token sets
+        and would make the comparison quadratic; the number of such buckets is printed (default: 1000).
+        :return: Array of shape (pairs, 2) of row indices, first index lower than second, no repeats.
+        """
+        # Rows without tokens would all share every bucket
+        valid = np.flatnonzero((signatures != NearDuplicateTools.MAX_HASH).any(axis=1))
+        pair_keys = []
+        skipped_buckets = 0
+        skipped_rows = 0
+        for band in range(bands):
+            for bucket in NearDuplicateTools.buckets(signatures[valid, band * rows:(band + 1) * rows]):
+                if len(bucket) <= max_bucket_size:
+                    members = valid[bucket]
+                    first, second = np.triu_indices(len(members), k=1)
+                    pair_keys.append(members[first].astype(np.int64) * len(signatures) + members[second])
+                else:
+                    skipped_buckets += 1
+                    skipped_rows += len(bucket)
+
+        if skipped_buckets > 0:
+            print(f'{skipped_buckets} band buckets of more than {max_bucket_size} rows ({skipped_rows} rows in all) '
+                  f'skipped.')
+
+        if len(pair_keys) == 0:
+            return np.zeros((0, 2), dtype=np.int64)
+
+        pair_keys = np.unique(np.concatenate(pair_keys))
+        pairs = np.column_stack([pair_keys // len(signatures), pair_keys % len(signatures)])
+
+        return np.sort(pairs, axis=1)
+
+    @staticmethod
+    def unique_signatures(signatures: np.ndarray) -> tuple:
+        """Group rows by identical signature, almost always identical token sets.
+
+        :param signatures: Array of MinHash signatures, shape (rows, signature length).
+        :return: Tuple (distinct signatures, group of each row, first row of each group), groups numbered in order
+        of their first row.
+        """
+        if len(signatures) == 0:
+            return signatures, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        _, first_rows, inverse = np.unique(signatures, axis=0, return_index=True, return_inverse=True)
+        # Renumber groups by first row, so group order follows row order
+        order = np.argsort(first_rows, kind='stable')
+        renumber = np.empty_like(order)
+        renumber[order] = np.arange(len(order))
+
+        return signatures[first_rows[order]], renumber[inverse.ravel()], first_rows[order]
+
+    @staticmethod
+    def representative_pairs(first: np.ndarray, alternative: np.ndarray, source_codes: np.ndarray,
+                             pairs: np.ndarray, cross_source_only: bool) -> np.ndarray:
+        """Choose one pair of rows to report for each pair of identical signature groups.
+
+        :param first: First row of each group.
+        :param alternative: First row of each group from another source than its first row, -1 if none.
+        :param source_codes: Source code of each row.
+        :param pairs: Array of shape (pairs, 2) of group indices.
+        :param cross_source_only: Whether rows must be from different sources, if the groups allow.
+        :return: Array of shape (pairs, 2) of row indices, -1 where no pair of rows qualifies.
+        """
+        row_a = first[pairs[:, 0]]
+        row_b = first[pairs[:, 1]]
+        if cross_source_only:
+            same = source_codes[row_a] == source_codes[row_b]
+            alternative_b = alternative[pairs[:, 1]]
+            alternative_a = alternative[pairs[:, 0]]
+            use_b = same & (alternative_b >= 0)
+            use_a = same & ~use_b & (alternative_a >= 0)
+            row_b = np.where(use_b, alternative_b, row_b)
+            row_a = np.where(use_a, alternative_a, row_a)
+            unmatched = same & ~use_a & ~use_b
+            row_a = np.where(unmatched, -1, row_a)
+            row_b = np.where(unmatched, -1, row_b)
+
+        return np.column_stack([row_a, row_b])
+
+    @staticmethod
+    def find_near_duplicates(df: pd.DataFrame, threshold: float = 0.8, num_perm: int = 128,
+                             column: str = 'Tokenized Descriptors', sep: str = ',', cross_source_only: bool = True,
+                             max_bucket_size: int = 1000, seed: int = 1) -> pd.DataFrame:
+        """Find fields whose tokenized descriptors are near identical, e.g. from the output of collate_dfs_from_list.
+
+        Rows with identical signatures form a group, compared once. So that repeated standard fields do not
+        produce a pair for every two of their rows, each row of a group is reported once, paired with the group's
+        first row (or, if that is from the same source and only matches across sources are wanted, with the first row
+        from another source). Two groups that are near identical are reported by one pair of their rows. Column
+        Group A and Group B give the group of each row, to expand matches to all rows of their groups.
+
+        :param df: DataFrame with columns Source, Fields and the tokenized column.
+        :param threshold: Minimum estimated Jaccard similarity of matches (default: 0.8).
+        :param num_perm: MinHash signature length; longer is more accurate but slower (default: 128).
+        :param column: Name of column holding tokenized text (default: 'Tokenized Descriptors').
+        :param sep: String separator in tokenized text (default: ',').
+        :param cross_source_only: Whether to only report matches between different sources (default: True).
+        :param max_bucket_size: See candidate_pairs (default: 1000).
+        :param seed: Seed for the MinHash permutations (default: 1).
+        :return: DataFrame with columns Row A, Source A, Fields A, Group A, Row B, Source B, Fields B, Group B,
+        Estimated Jaccard, most similar first.
+        """
+        token_lists = [str(text).split(sep) if pd.notna(text) else [] for text in df[column]]
+        signatures = NearDuplicateTools.minhash_signatures(token_lists, num_perm, seed)
+        bands, rows = NearDuplicateTools.bands_and_rows(threshold, num_perm)
+
+        sources = df['Source'].astype(str).to_numpy()
+        fields = df['Fields'].astype(str).to_numpy()
+        source_codes = pd.factorize(sources)[0]
+
+        unique, groups, first = NearDuplicateTools.unique_signatures(signatures)
+        # First row of each group from another source than the group's first row
+        alternative = np.full(len(unique), len(signatures), dtype=np.int64)
+        other_rows = np.flatnonzero(source_codes != source_codes[first[groups]])
+        np.minimum.at(alternative, groups[other_rows], other_rows)
+        alternative[alternative == len(signatures)] = -1
+
+        # Rows of a group, each paired once with a representative of it
+        is_valid = (unique != NearDuplicateTools.MAX_HASH).any(axis=1)
+        members = np.flatnonzero(is_valid[groups] & (np.arange(len(signatures)) != first[groups]))
+        partners = first[groups[members]]
+        if cross_source_only:
+            partners = np.where(source_codes[members] == source_codes[partners], alternative[groups[members]],
+                                partners)
+        member_pairs = np.column_stack([members, partners])[partners >= 0]
+
+        # Near identical groups, compared once per pair of distinct signatures
+        group_pairs = NearDuplicateTools.candidate_pairs(unique, bands, rows, max_bucket_size)
+        similarity = (unique[group_pairs[:, 0]] == unique[group_pairs[:, 1]]).mean(axis=1) if len(group_pairs) > 0 \
+            else np.zeros(0)
+        keep = similarity >= threshold
+        near_pairs = NearDuplicateTools.representative_pairs(first, alternative, source_codes, group_pairs[keep],
+                                                             cross_source_only)
+        found = near_pairs[:, 0] >= 0
+
+        pairs = np.sort(np.vstack([member_pairs, near_pairs[found]]).astype(np.int64), axis=1)
+        similarity = np.concatenate([np.ones(len(member_pairs)), similarity[keep][found]])
+
+        result = pd.DataFrame({
+            'Row A': pairs[:, 0],
+            'Source A': sources[pairs[:, 0]],
+            'Fields A': fields[pairs[:, 0]],
+            'Group A': groups[pairs[:, 0]],
+            'Row B': pairs[:, 1],
+            'Source B': sources[pairs[:, 1]],
+            'Fields B': fields[pairs[:, 1]],
+            'Group B': groups[pairs[:, 1]],
+            'Estimated Jaccard': similarity
+        })
+
+        return result.sort_values('Estimated Jaccard', ascending=False, kind='stable').reset_index(drop=True)
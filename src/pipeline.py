@@ -0,0 +1,128 @@
+# pipeline.py
+import queue
+import threading
+
+
+class StagedPipeline:
+    """Three stage pipeline (read -> process -> write) connected by bounded queues.
+
+    Reader threads prefetch items ahead of processing and a background writer thread saves results behind it, so
+    that I/O overlaps with CPU work and throughput approaches that of the slowest stage. Processing runs in the
+    calling thread. Bounded queues cap the number of items held in memory between stages.
+    """
+
+    _DONE = object()
+    """Queue marker for the end of a stage's output."""
+
+    def __init__(self, read, process, write=None, readers: int = 2, queue_size: int = 4,
+                 is_recoverable=lambda ex: False):
+        """
+        :param read: Function item -> data, run in reader threads.
+        :param process: Function (item, data) -> result, run in the calling thread.
+        :param write: Optional function (item, result), run in the writer thread (default: None).
+        :param readers: Number of reader threads (default: 2).
+        :param queue_size: Maximum number of items waiting between stages (default: 4).
+        :param is_recoverable: Function exception -> bool. Recoverable exceptions are recorded against the item
+        and the run continues; any other exception stops the run and is raised from run() (default: none are).
+        """
+        self.read = read
+        self.process = process
+        self.write = write
+        self.readers = max(1, readers)
+        self.queue_size = max(1, queue_size)
+        self.is_recoverable = is_recoverable
+
+    def run(self, items) -> list:
+        """Run all items through the pipeline.
+
+        :param items: Iterable of items, e.g. file paths; consumed lazily by the readers.
+        :return: List of [item, result, exception] in the order of items; one of result and exception is None.
+        """
+        items = iter(enumerate(items))
+        items_lock = threading.Lock()
+        stop = threading.Event()
+        read_queue = queue.Queue(self.queue_size)
+        write_queue = queue.Queue(self.queue_size)
+        outcomes = {}
+        failures = []
+
+        def put(target_queue, value):
+            # Give up waiting if the run is stopping, so no thread blocks forever on a full queue
+            while not stop.is_set():
+                try:
+                    target_queue.put(value, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def record_exception(index, item, ex):
+            outcomes[index] = [item, None, ex]
+            if not self.is_recoverable(ex):
+                failures.append(ex)
+                stop.set()
+
+        def reader():
+            try:
+                while not stop.is_set():
+                    with items_lock:
+                        index, item = next(items, (None, None))
+                    if index is None:
+                        break
+                    try:
+                        put(read_queue, (index, item, self.read(item), None))
+                    except Exception as ex:
+                        put(read_queue, (index, item, None, ex))
+            finally:
+                put(read_queue, StagedPipeline._DONE)
+
+        def writer():
+            while True:
+                value = write_queue.get()
+                if value is StagedPipeline._DONE:
+                    break
+                index, item, result = value
+                try:
+                    self.write(item, result)
+                except Exception as ex:
+                    record_exception(index, item, ex)
+
+        reader_threads = [threading.Thread(target=reader, daemon=True) for _ in range(self.readers)]
+        writer_thread = threading.Thread(target=writer, daemon=True) if self.write is not None else None
+        for thread in reader_threads + ([writer_thread] if writer_thread else []):
+            thread.start()
+
+        readers_done = 0
+        try:
+            while readers_done < self.readers and not stop.is_set():
+                try:
+                    value = read_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if value is StagedPipeline._DONE:
+                    readers_done += 1
+                    continue
+
+                index, item, data, ex = value
+                if ex is None:
+                    try:
+                        result = self.process(item, data)
+                        outcomes[index] = [item, result, None]
+                        if writer_thread is not None:
+                            put(write_queue, (index, item, result))
+                    except Exception as process_ex:
+                        record_exception(index, item, process_ex)
+                else:
+                    record_exception(index, item, ex)
+        finally:
+            if writer_thread is not None:
+                # Unbounded wait is safe: the writer always drains the queue
+                write_queue.put(StagedPipeline._DONE)
+                writer_thread.join()
+            stop.set()
+            for thread in reader_threads:
+                thread.join()
+
+        if failures:
+            raise failures[0]
+
+        return [outcomes[index] for index in sorted(outcomes)]
@@ -0,0 +1,106 @@
+# run_journal.py
+import json
+import os
+from pathlib import Path
+import threading
+from src.custom_exceptions import RunJournalException
+
+
+class RunJournal:
+    """Append-only manifest of source files completed by a run, kept in the run's target directory.
+
+    Each completed file is recorded with its size and modification time once its output has been saved, and the
+    record is flushed to disk straight away. A later run can then skip files that are unchanged since they were
+    completed, so a failure costs only the unfinished remainder.
+
+    The options that shape the outputs are kept alongside, and a run with different options refuses to resume
+    rather than mixing outputs of both.
+    """
+
+    MANIFEST_NAME = 'run_manifest.jsonl'
+    OPTIONS_NAME = 'run_options.json'
+
+    def __init__(self, target_dir: str, options: dict = None):
+        """
+        :param target_dir: Directory holding the manifest and the run's outputs.
+        :param options: Optional JSON serialisable options of the run that affect its outputs, e.g. the parsing
+        engine; checked against those of an earlier run, or stored for a later one (default: None).
+        """
+        self.path = os.path.join(target_dir, RunJournal.MANIFEST_NAME)
+        self.options_path = os.path.join(target_dir, RunJournal.OPTIONS_NAME)
+        self._lock = threading.Lock()
+        self.completed = self.load()
+        if options is not None:
+            self.check_options(options)
+
+    def load(self) -> dict:
+        """Read completed records from the manifest, if any.
+
+        A partly written last line, e.g. from a crash mid-write, is ignored.
+
+        :return: Dict of absolute source path to record.
+        """
+        completed = {}
+        if Path(self.path).is_file():
+            with open(self.path, 'r', encoding='utf-8') as infile:
+                for line in infile:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    completed[record['source']] = record
+
+        return completed
+
+    def check_options(self, options: dict):
+        """Store the run's options, or raise RunJournalException if they differ from those of an earlier run.
+
+        :param options: JSON serialisable options of the run.
+        """
+        options = json.loads(json.dumps(options))
+        if Path(self.options_path).is_file():
+            with open(self.options_path, 'r', encoding='utf-8') as infile:
+                stored = json.load(infile)
+            if stored != options:
+                raise RunJournalException(f'Options {options} differ from those of the run being resumed, {stored}; '
+                                          f'outputs would not match. Rerun without resuming.')
+            return
+
+        with open(self.options_path, 'w', encoding='utf-8') as outfile:
+            json.dump(options, outfile, sort_keys=True)
+
+    @staticmethod
+    def file_state(src_path: str) -> dict:
+        stat = os.stat(src_path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def completed_output(self, src_path: str) -> str:
+        """Return the output of a source file completed by an earlier run, if still valid.
+
+        :param src_path: Path to source file.
+        :return: Path of output file, or '' if the file was not completed, has changed since, or its output is gone.
+        """
+        record = self.completed.get(os.path.abspath(src_path))
+        if record is None or not Path(record['output']).is_file():
+            return ''
+        if RunJournal.file_state(src_path) != {'size': record['size'], 'mtime_ns': record['mtime_ns']}:
+            return ''
+
+        return record['output']
+
+    def record(self, src_path: str, output_path: str, rows: int):
+        """Record a source file as completed, durably. Safe to call from multiple threads.
+
+        :param src_path: Path to source file.
+        :param output_path: Path to the saved output.
+        :param rows: Number of rows output.
+        """
+        record = {'source': os.path.abspath(src_path), 'output': os.path.abspath(output_path), 'rows': rows}
+        record.update(RunJournal.file_state(src_path))
+
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as outfile:
+                outfile.write(json.dumps(record) + '\n')
+                outfile.flush()
+                os.fsync(outfile.fileno())
+            self.completed[record['source']] = record
@@ -0,0 +1,189 @@
+# run_metrics.py
+import json
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class RunMetrics:
+    """Counters of a tokenization run, exported for monitoring while the run progresses.
+
+    Counters are updated from any thread at the cost of a lock. A background thread periodically writes them, with
+    derived rates and current memory use, to a Prometheus text format file, as read by node-exporter's textfile
+    collector; the file is replaced atomically so it is never seen part written. When the run stops, a final write
+    is made and a JSON summary saved next to it.
+    """
+
+    COUNTERS = {
+        'files_processed': 'Source files processed successfully',
+        'files_failed': 'Source files that failed',
+        'rows': 'Rows output',
+        'bytes_read': 'Bytes of source files read',
+        'bytes_written': 'Bytes of output files written',
+        'cache_hits': 'Sources served from a cache or an earlier run',
+        'cache_misses': 'Sources parsed afresh'
+    }
+    """Counter names and descriptions."""
+
+    PREFIX = 'tokenize_'
+    """Prefix of exported metric names."""
+
+    def __init__(self, metrics_file: str, job: str, interval: float = 15.0, labels: dict = None):
+        """
+        :param metrics_file: Path of Prometheus text file, e.g. ending .prom; the summary is saved with suffix .json.
+        :param job: Name of job, exported as label job.
+        :param interval: Seconds between writes (default: 15.0).
+        :param labels: Optional dict of further labels, e.g. {'shard': '0/4'} (default: None).
+        """
+        self.metrics_file = metrics_file
+        self.summary_file = str(Path(metrics_file).with_suffix('.json'))
+        self.labels = dict({'job': job}, **(labels or {}))
+        self.interval = interval
+        self.counts = {name: 0 for name in RunMetrics.COUNTERS}
+        self.start_time = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self.counts[name] += value
+
+    def record_file(self, src_path: str = '', rows: int = 0, save_path: str = ''):
+        """Count a file processed, with its output rows and the sizes of its source and saved output if given."""
+        with self._lock:
+            self.counts['files_processed'] += 1
+            self.counts['rows'] += rows
+            self.counts['bytes_read'] += os.path.getsize(src_path) if src_path else 0
+            self.counts['bytes_written'] += os.path.getsize(save_path) if save_path else 0
+
+    def counting_failures(self, function):
+        """Wrap function so that each exception it raises is counted as a failed file, then raised on."""
+        def counted(*args, **kwargs):
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                self.increment('files_failed')
+                raise
+
+        return counted
+
+    @staticmethod
+    def current_rss_bytes() -> int:
+        """Return the resident memory of this process in bytes, or its peak where the current value is unavailable.
+
+        :return: Bytes; 0 if unknown, e.g. on Windows.
+        """
+        try:
+            with open('/proc/self/statm', 'r') as infile:
+                return int(infile.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, AttributeError):
+            pass
+        if resource is not None:
+            # Kilobytes on Linux, bytes on macOS
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+        return 0
+
+    def snapshot(self) -> dict:
+        """Return counters with derived values: seconds, rows_per_second, cache_hit_ratio, memory_rss_bytes."""
+        with self._lock:
+            values = dict(self.counts)
+        seconds = time.time() - self.start_time
+        lookups = values['cache_hits'] + values['cache_misses']
+        values.update({
+            'seconds': seconds,
+            'rows_per_second': values['rows'] / seconds if seconds > 0 else 0.0,
+            'cache_hit_ratio': values['cache_hits'] / lookups if lookups > 0 else 0.0,
+            'memory_rss_bytes': RunMetrics.current_rss_bytes()
+        })
+
+        return values
+
+    def prometheus_text(self, values: dict) -> str:
+        """Format a snapshot in Prometheus text exposition format."""
+        label_text = ','.join(f'{name}="{value}"' for name, value in self.labels.items())
+        gauges = {
+            'seconds': 'Seconds since the run started',
+            'rows_per_second': 'Rows output per second since the run started',
+            'cache_hit_ratio': 'Proportion of sources served from a cache or an earlier run',
+            'memory_rss_bytes': 'Resident memory of the run process',
+            'last_update_timestamp_seconds': 'Unix time of this update'
+        }
+        values = dict(values, last_update_timestamp_seconds=time.time())
+
+        lines = []
+        for name, description in RunMetrics.COUNTERS.items():
+            metric = f'{RunMetrics.PREFIX}{name}_total'
+            lines += [f'# HELP {metric} {description}.', f'# TYPE {metric} counter',
+                      f'{metric}{{{label_text}}} {values[name]}']
+        for name, description in gauges.items():
+            metric = f'{RunMetrics.PREFIX}{name}'
+            lines += [f'# HELP {metric} {description}.', f'# TYPE {metric} gauge',
+                      f'{metric}{{{label_text}}} {round(values[name], 6)}']
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def write_atomically(save_path: str, text: str):
+        temp_path = f'{save_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8', newline='\n') as outfile:
+            outfile.write(text)
+        os.replace(temp_path, save_path)
+
+    def write(self) -> dict:
+        """Write current metrics to the metrics file.
+
+        :return: The snapshot written.
+        """
+        values = self.snapshot()
+        RunMetrics.write_atomically(self.metrics_file, self.prometheus_text(values))
+
+        return values
+
+    def start(self) -> 'RunMetrics':
+        """Write metrics now and then every interval seconds, in a background thread. Returns self."""
+        Path(self.metrics_file).parent.mkdir(parents=True, exist_ok=True)
+        self.write()
+
+        def run():
+            while not self._stop.wait(self.interval):
+                self.write()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self) -> dict:
+        """Stop periodic writes, write final metrics and save the JSON summary.
+
+        :return: Final snapshot.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        values = self.write()
+        summary = dict(labels=self.labels, **values)
+        RunMetrics.write_atomically(self.summary_file, json.dumps(summary, indent=2))
+        print(f"{values['files_processed']} files processed, {values['files_failed']} failed, "
+              f"{values['rows_per_second']:.1f} rows/s; metrics summary saved to {self.summary_file}.")
+
+        return values
+
+    def __enter__(self) -> 'RunMetrics':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # The run failed as a whole, e.g. its single source could not be parsed
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.increment('files_failed')
+        self.stop()
@@ -0,0 +1,232 @@
+# shard_tools.py
+import csv
+import glob
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+import subprocess
+import zlib
+from src.file_discovery import FileDiscovery
+from src.meta_data_tools import MetaDataTools
+
+
+class ShardTools:
+    """Split directory runs into deterministic shards, for running across several machines (or processes), and
+    merge the shard outputs afterwards"""
+
+    TIMING_NAME = 'shard_timing.json'
+
+    @staticmethod
+    def parse_shard_spec(spec: str) -> tuple:
+        """Parse a shard specification of the form 'i/N', i being the 0-based shard index and N the shard count.
+
+        :param spec: Shard specification, e.g. '0/4'.
+        :return: Tuple (index, count).
+        """
+        try:
+            index, count = [int(part) for part in spec.split('/')]
+        except ValueError:
+            raise ValueError(f'Invalid shard "{spec}", expected i/N, e.g. 0/4.')
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f'Invalid shard "{spec}", expected 0 <= i < N.')
+
+        return index, count
+
+    @staticmethod
+    def shard_of(relative_path: str, count: int) -> int:
+        """Return the shard a file belongs to, from a stable hash of its path relative to the source directory.
+
+        The same on every machine and operating system, so nodes agree on the partition without coordinating.
+
+        :param relative_path: Path of file relative to the source directory.
+        :param count: Number of shards.
+        :return: Shard index.
+        """
+        return zlib.crc32(Path(relative_path).as_posix().encode('utf-8')) % count
+
+    @staticmethod
+    def iter_shard_paths(src_path: str, index: int, count: int, suffix: str = '.txt'):
+        """Yield paths of files under src_path that belong to the given shard.
+
+        :param src_path: Source directory.
+        :param index: Shard index.
+        :param count: Number of shards.
+        :param suffix: Suffix of source files (default: '.txt').
+        :return: Generator of file paths.
+        """
+        for file_path in FileDiscovery.iter_file_paths(src_path, suffix):
+            if ShardTools.shard_of(os.path.relpath(file_path, src_path), count) == index:
+                yield file_path
+
+    @staticmethod
+    def shard_dir(target_dir: str, index: int, count: int) -> str:
+        """Return the directory for shard-local outputs, within target_dir."""
+        return os.path.join(target_dir, f'shard_{index:03d}_of_{count:03d}')
+
+    @staticmethod
+    def save_shard_timing(shard_dir: str, index: int, count: int, seconds: float, files: int, errors: int,
+                          rows: int, collated_name: str = ''):
+        """Save timing and counts of a completed shard; its presence marks the shard as complete.
+
+        :param shard_dir: Directory of shard-local outputs.
+        :param index: Shard index.
+        :param count: Number of shards.
+        :param seconds: Elapsed time of the shard run.
+        :param files: Number of files processed.
+        :param errors: Number of files with errors.
+        :param rows: Number of collated rows.
+        :param collated_name: File name of the shard's collated output in shard_dir, '' if none was saved
+        (default: '').
+        """
+        timing = {'shard': index, 'shards': count, 'seconds': seconds, 'files': files, 'errors': errors, 'rows': rows,
+                  'collated': collated_name}
+        with open(os.path.join(shard_dir, ShardTools.TIMING_NAME), 'w', encoding='utf-8') as outfile:
+            json.dump(timing, outfile, indent=2)
+
+    @staticmethod
+    def row_key_hash(values: list) -> int:
+        """Return a stable 64-bit hash of a row's key values."""
+        return int.from_bytes(hashlib.blake2b('\x1f'.join(values).encode('utf-8'), digest_size=8).digest(), 'big')
+
+    @staticmethod
+    def write_deduplicated_rows(shard_files: list, outfile, header: list, with_counts: bool = False,
+                                with_sources: bool = False) -> (int, int):
+        """Write the distinct rows of tab separated files, streaming rather than loading them.
+
+        Duplicates are identified by the columns of MetaDataTools.DEDUP_COLUMNS present in header, as
+        MetaDataTools.deduplicate_df. Memory holds a 64-bit hash per distinct row. Counts and sources need a first
+        pass over the files, reading them twice, and also hold a count per distinct row, and for sources the set of
+        its distinct source names, which can approach the size of the distinct rows themselves.
+
+        :param shard_files: Paths of files, all with header.
+        :param outfile: Open file to write to, header not yet written.
+        :param header: Column names of files.
+        :param with_counts: Whether to add column 'Count', the number of occurrences of each row (default: False).
+        :param with_sources: Whether to add column 'Sources', the distinct sources of each row (default: False).
+        :return: Tuple (rows read, distinct rows written).
+        """
+        key_indices = [header.index(column) for column in MetaDataTools.DEDUP_COLUMNS if column in header]
+        source_index = header.index('Source') if with_sources and 'Source' in header else None
+
+        def iter_rows():
+            for shard_file in shard_files:
+                with open(shard_file, 'r', encoding='utf-8', newline='') as infile:
+                    reader = csv.reader(infile, delimiter='\t')
+                    next(reader)
+                    for row in reader:
+                        yield ShardTools.row_key_hash([row[i] for i in key_indices]), row
+
+        counts = {}
+        sources = {}
+        if with_counts or source_index is not None:
+            for key_hash, row in iter_rows():
+                if with_counts:
+                    counts[key_hash] = counts.get(key_hash, 0) + 1
+                if source_index is not None:
+                    sources.setdefault(key_hash, set()).add(row[source_index])
+
+        writer = csv.writer(outfile, delimiter='\t', lineterminator=os.linesep)
+        writer.writerow(header + (['Count'] if with_counts else []) + (['Sources'] if source_index is not None else []))
+        seen = set()
+        rows = 0
+        for key_hash, row in iter_rows():
+            rows += 1
+            if key_hash in seen:
+                continue
+            seen.add(key_hash)
+            if with_counts:
+                row.append(counts[key_hash])
+            if source_index is not None:
+                row.append(MetaDataTools.SOURCES_SEP.join(sorted(sources[key_hash])))
+            writer.writerow(row)
+
+        return rows, len(seen)
+
+    @staticmethod
+    def merge_shard_outputs(target_dir: str, save_name: str, prefix: str = '', deduplicate: bool = False,
+                            with_counts: bool = False, with_sources: bool = False, count: int = None) -> str:
+        """Merge the collated outputs of all shards under target_dir into a single collated file, streaming.
+
+        The result is the same as collate_dfs_from_list followed by save_df over all files, but no shard output is
+        ever loaded into memory: the first header is written once and data lines are copied through. Deduplicated,
+        the result is as MetaDataTools.deduplicate_df, with memory for a hash per distinct row, plus its count and
+        sources if added; see write_deduplicated_rows.
+
+        :param target_dir: Directory holding the shard directories; the merged file is saved here.
+        :param save_name: Name of merged file without prefix, as of shard collated files, e.g. 'collated.txt'.
+        :param prefix: Prefix of merged file name (default: '').
+        :param deduplicate: Whether to drop duplicate rows across all shards (default: False).
+        :param with_counts: Whether to add column 'Count' when deduplicating (default: False).
+        :param with_sources: Whether to add column 'Sources' when deduplicating (default: False).
+        :param count: Number of shards of the run to merge; None to infer it from the shard directories, which must
+        then all be of one run (default: None).
+        :return: Path of merged file.
+        """
+        # Directories of earlier runs with another shard count are left out, not merged
+        shard_dirs = sorted(glob.glob(os.path.join(target_dir, 'shard_*_of_' + ('*' if count is None else
+                                                                                  f'{count:03d}'))))
+        if len(shard_dirs) == 0:
+            raise ValueError(f'No shard directories found in {target_dir}.')
+        counts = sorted({int(shard_dir.rsplit('_of_', 1)[1]) for shard_dir in shard_dirs})
+        if len(counts) > 1:
+            raise ValueError(f'Shard directories of runs with {counts} shards found in {target_dir}; '
+                             f'give the shard count to merge.')
+
+        timings = []
+        for shard_dir in shard_dirs:
+            timing_path = os.path.join(shard_dir, ShardTools.TIMING_NAME)
+            if not Path(timing_path).is_file():
+                raise ValueError(f'Shard {shard_dir} has not completed.')
+            with open(timing_path, 'r', encoding='utf-8') as infile:
+                timings.append(json.load(infile))
+
+        count = timings[0]['shards']
+        if sorted(timing['shard'] for timing in timings) != list(range(count)):
+            raise ValueError(f'Expected {count} completed shards in {target_dir}, found {len(timings)}.')
+
+        # Collated output of each shard's completed run, as recorded in its timing; none if the shard had no data
+        shard_files = []
+        header = None
+        for shard_dir, timing in zip(shard_dirs, timings):
+            if not timing.get('collated'):
+                continue
+            shard_collated = os.path.join(shard_dir, timing['collated'])
+            shard_files.append(shard_collated)
+            with open(shard_collated, 'r', encoding='utf-8', newline='') as infile:
+                shard_header = infile.readline()
+            if header is None:
+                header = shard_header
+            elif shard_header != header:
+                raise ValueError(f'Columns of {shard_collated} do not match those of other shards.')
+
+        save_path = os.path.join(target_dir, f'{prefix}{save_name}')
+        with open(save_path, 'w', encoding='utf-8', newline='') as outfile:
+            if deduplicate and header is not None:
+                rows, distinct_rows = ShardTools.write_deduplicated_rows(
+                    shard_files, outfile, next(csv.reader([header], delimiter='\t')), with_counts, with_sources)
+                print(f'{rows - distinct_rows} duplicate rows dropped, {distinct_rows} distinct rows kept.')
+            else:
+                for i, shard_file in enumerate(shard_files):
+                    with open(shard_file, 'r', encoding='utf-8', newline='') as infile:
+                        shard_header = infile.readline()
+                        if i == 0:
+                            outfile.write(shard_header)
+                        shutil.copyfileobj(infile, outfile)
+
+        print(f'{len(timings)} shards merged to {save_path}: {sum(t["files"] for t in timings)} files, '
+              f'{sum(t["errors"] for t in timings)} errors, {sum(t["rows"] for t in timings)} rows, '
+              f'slowest shard {max(t["seconds"] for t in timings):.1f}s.')
+
+        return save_path
+
+    @staticmethod
+    def run_local_shards(shard_commands: list) -> list:
+        """Run shard commands as local processes concurrently, standing in for separate nodes.
+
+        :param shard_commands: List of commands, each a list of arguments as for subprocess.
+        :return: List of process return codes, in command order.
+        """
+        processes = [subprocess.Popen(command) for command in shard_commands]
+        return [process.wait() for process in processes]
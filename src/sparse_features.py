@@ -0,0 +1,111 @@
+# sparse_features.py
+import numpy as np
+from scipy import sparse
+
+
+class SparseFeatures:
+    """Build sparse term matrices (bag-of-words or TF-IDF) directly from token lists.
+
+    Weighting follows scikit-learn's CountVectorizer/TfidfTransformer defaults (smoothed idf, l2 normalised rows),
+    so the saved matrices can be used in its place without a string round trip.
+    """
+
+    WEIGHTINGS = ['count', 'tfidf']
+
+    @staticmethod
+    def ngrams(tokens: list, ngram_range: tuple = (1, 1)) -> list:
+        """Return n-grams of tokens, joined by spaces.
+
+        :param tokens: List of tokens.
+        :param ngram_range: Tuple (min n, max n), inclusive (default: (1, 1)).
+        :return: List of n-grams.
+        """
+        min_n, max_n = ngram_range
+        if min_n == 1 and max_n == 1:
+            return tokens
+
+        grams = []
+        for n in range(min_n, max_n + 1):
+            grams.extend(' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+
+        return grams
+
+    @staticmethod
+    def build_term_matrix(token_lists, weighting: str = 'count', ngram_range: tuple = (1, 1)) -> tuple:
+        """Build a CSR term matrix, one row per token list and one column per term.
+
+        :param token_lists: Iterable of lists of tokens.
+        :param weighting: 'count' for term counts, 'tfidf' for TF-IDF (default: 'count').
+        :param ngram_range: Tuple (min n, max n) of n-gram sizes (default: (1, 1)).
+        :return: Tuple (scipy.sparse.csr_matrix, list of terms in column order, sorted).
+        """
+        if weighting not in SparseFeatures.WEIGHTINGS:
+            raise ValueError(f'Unknown weighting: {weighting}')
+
+        term_columns = {}
+        indices = []
+        indptr = [0]
+        for tokens in token_lists:
+            for term in SparseFeatures.ngrams([token for token in tokens if token], ngram_range):
+                indices.append(term_columns.setdefault(term, len(term_columns)))
+            indptr.append(len(indices))
+
+        # Sort the vocabulary, as scikit-learn does, and renumber the columns to match
+        vocabulary = sorted(term_columns)
+        remap = np.empty(len(term_columns), dtype=np.int32)
+        remap[[term_columns[term] for term in vocabulary]] = np.arange(len(vocabulary), dtype=np.int32)
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.float64), remap[np.array(indices, dtype=np.int64)], np.array(indptr)),
+            shape=(len(indptr) - 1, len(vocabulary)))
+        # Repeated terms within a row are summed into counts
+        matrix.sum_duplicates()
+
+        if weighting == 'tfidf':
+            matrix = SparseFeatures.tfidf(matrix)
+
+        return matrix, vocabulary
+
+    @staticmethod
+    def tfidf(counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        """Convert a count matrix to TF-IDF, with smoothed idf and l2 normalised rows.
+
+        :param counts: CSR matrix of term counts.
+        :return: CSR matrix of TF-IDF weights.
+        """
+        row_count = counts.shape[0]
+        document_freqs = np.bincount(counts.indices, minlength=counts.shape[1])
+        idf = np.log((1 + row_count) / (1 + document_freqs)) + 1
+
+        weighted = counts.multiply(idf).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+
+        return sparse.csr_matrix(sparse.diags(1 / norms) @ weighted)
+
+    @staticmethod
+    def save_npz(save_path: str, matrix: sparse.csr_matrix, vocabulary: list, labels: list = None):
+        """Save a term matrix with its vocabulary and labels in a single .npz file.
+
+        The matrix is stored as scipy.sparse.save_npz does, so scipy.sparse.load_npz can also read it directly.
+
+        :param save_path: Path to file.
+        :param matrix: CSR term matrix.
+        :param vocabulary: List of terms in column order.
+        :param labels: Optional list of labels, one per row (default: None).
+        """
+        matrix = matrix.tocsr()
+        np.savez_compressed(save_path, format=np.array(b'csr'), shape=np.array(matrix.shape), data=matrix.data,
+                            indices=matrix.indices, indptr=matrix.indptr, vocabulary=np.array(vocabulary, dtype=str),
+                            labels=np.array([] if labels is None else labels, dtype=str))
+
+    @staticmethod
+    def load_npz(load_path: str) -> tuple:
+        """Load a term matrix saved by save_npz.
+
+        :param load_path: Path to file.
+        :return: Tuple (CSR matrix, list of terms, list of labels).
+        """
+        with np.load(load_path, allow_pickle=False) as data:
+            matrix = sparse.csr_matrix((data['data'], data['indices'], data['indptr']), shape=tuple(data['shape']))
+            return matrix, list(data['vocabulary']), list(data['labels'])
@@ -0,0 +1,237 @@
+# token_index.py
+from bisect import bisect_left
+from collections import Counter
+import nltk
+import numpy as np
+import pandas as pd
+from src.meta_data_tools import MetaDataTools as MDT
+
+
+class PackedStrings:
+    """Sequence of strings held as a single UTF-8 byte array and offsets into it, as CSR postings are.
+
+    Unlike NumPy unicode arrays, strings are not padded to the longest one at 4 bytes per character, so millions of
+    field names cost little more than their text. Strings are decoded as they are accessed.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        """
+        :param blob: uint8 array of the UTF-8 encoded strings, concatenated.
+        :param offsets: int64 array of the start of each string in blob, followed by the length of blob.
+        """
+        self.blob = blob
+        self.offsets = offsets
+
+    @staticmethod
+    def from_strings(strings) -> 'PackedStrings':
+        encoded = [str(string).encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+
+        return PackedStrings(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def take(self, indices) -> np.ndarray:
+        """Return the strings at indices as an object array."""
+        return np.array([self[i] for i in indices], dtype=object)
+
+    def find_sorted(self, value: str) -> int:
+        """Return the position of value by binary search, if the strings are sorted, or -1 if not found."""
+        # UTF-8 preserves code point order, so this agrees with sorting the strings in Python
+        i = bisect_left(self, value)
+        return i if i < len(self) and self[i] == value else -1
+
+
+class TokenIndex:
+    """Inverted index over tokenized descriptors, mapping tokens and their stems to the rows mentioning them.
+
+    Postings are held in CSR form per vocabulary: sorted terms, offsets into a flat array of row IDs, and the
+    matching term frequencies. Terms, fields and source names are held as PackedStrings. Queries are answered with NumPy array operations, and the whole index is
+    persisted as a single uncompressed .npz file that loads without pickling.
+    """
+
+    VOCABULARIES = ['token', 'stem']
+    """Vocabularies held by the index: tokens as cleansed, and their Lancaster stems."""
+
+    def __init__(self, source_names: PackedStrings, source_codes: np.ndarray, fields: PackedStrings, postings: dict):
+        """An index. Use TokenIndex.build or TokenIndex.load rather than calling directly.
+
+        :param source_names: Distinct source names.
+        :param source_codes: Array of index into source_names, per row.
+        :param fields: Field names, per row.
+        :param postings: Dict of vocabulary name to dict of terms (PackedStrings) and arrays offsets, row_ids,
+        term_freqs.
+        """
+        self.source_names = source_names
+        self.source_codes = source_codes
+        self.fields = fields
+        self.postings = postings
+
+    @property
+    def row_count(self) -> int:
+        return len(self.fields)
+
+    @staticmethod
+    def build(df: pd.DataFrame, column: str = 'Tokenized Descriptors', sep: str = ',',
+              stemmer=nltk.LancasterStemmer()) -> 'TokenIndex':
+        """Build an index from a DataFrame as from field_tokenized_descriptor_df_from_df or collate_dfs_from_list.
+
+        :param df: DataFrame with columns Source, Fields and the tokenized column.
+        :param column: Name of column holding tokenized text (default: 'Tokenized Descriptors').
+        :param sep: String separator in tokenized text (default: ',').
+        :param stemmer: NLTK stemmer (default LancasterStemmer).
+        :return: TokenIndex.
+        """
+        token_lists = [str(text).split(sep) if pd.notna(text) else [] for text in df[column]]
+        return TokenIndex.build_from_token_lists(df['Source'], df['Fields'], token_lists, stemmer)
+
+    @staticmethod
+    def build_from_token_lists(sources, fields, token_lists, stemmer=nltk.LancasterStemmer()) -> 'TokenIndex':
+        """Build an index from parallel sequences of sources, fields and token lists, one item per row.
+
+        :param sources: Sequence of source names.
+        :param fields: Sequence of field names.
+        :param token_lists: Iterable of lists of tokens.
+        :param stemmer: NLTK stemmer (default LancasterStemmer).
+        :return: TokenIndex.
+        """
+        stems = {}
+        term_rows = {name: {} for name in TokenIndex.VOCABULARIES}
+
+        for row_id, tokens in enumerate(token_lists):
+            tokens = [token for token in tokens if token]
+            for name, terms in [('token', tokens), ('stem', [TokenIndex._stem(token, stems, stemmer)
+                                                             for token in tokens])]:
+                vocabulary = term_rows[name]
+                for term, count in Counter(terms).items():
+                    vocabulary.setdefault(term, []).append((row_id, count))
+
+        postings = {name: TokenIndex._csr_postings(vocabulary) for name, vocabulary in term_rows.items()}
+
+        source_codes, source_names = pd.factorize(pd.Series(sources, dtype=object).astype(str))
+        return TokenIndex(PackedStrings.from_strings(source_names), source_codes.astype(np.uint32),
+                          PackedStrings.from_strings(fields), postings)
+
+    @staticmethod
+    def _stem(token: str, stems: dict, stemmer) -> str:
+        # Stemming is slow relative to everything else, so stem each distinct token once
+        stem = stems.get(token)
+        if stem is None:
+            stem = stems[token] = stemmer.stem(token)
+        return stem
+
+    @staticmethod
+    def _csr_postings(vocabulary: dict) -> dict:
+        terms = sorted(vocabulary)
+        lengths = np.array([len(vocabulary[term]) for term in terms], dtype=np.int64)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        pairs = np.array([pair for term in terms for pair in vocabulary[term]], dtype=np.int64).reshape(-1, 2)
+
+        return {
+            'terms': PackedStrings.from_strings(terms),
+            'offsets': offsets,
+            'row_ids': pairs[:, 0].astype(np.uint32),
+            'term_freqs': np.minimum(pairs[:, 1], np.iinfo(np.uint16).max).astype(np.uint16)
+        }
+
+    def save(self, save_path: str):
+        """Save index as a single .npz file.
+
+        :param save_path: Path to file; '.npz' is appended by NumPy if missing.
+        """
+        arrays = {'source_codes': self.source_codes}
+        strings = {'source_names': self.source_names, 'fields': self.fields}
+        for name, postings in self.postings.items():
+            strings[f'{name}_terms'] = postings['terms']
+            for key in ['offsets', 'row_ids', 'term_freqs']:
+                arrays[f'{name}_{key}'] = postings[key]
+        for name, packed in strings.items():
+            arrays[f'{name}_blob'] = packed.blob
+            arrays[f'{name}_offsets'] = packed.offsets
+
+        np.savez(save_path, **arrays)
+
+    @staticmethod
+    def load(load_path: str) -> 'TokenIndex':
+        """Load an index saved by TokenIndex.save.
+
+        :param load_path: Path to .npz file.
+        :return: TokenIndex.
+        """
+        with np.load(load_path, allow_pickle=False) as data:
+            def packed(name: str) -> PackedStrings:
+                return PackedStrings(data[f'{name}_blob'], data[f'{name}_offsets'])
+
+            postings = {name: {key: data[f'{name}_{key}'] for key in ['offsets', 'row_ids', 'term_freqs']}
+                        for name in TokenIndex.VOCABULARIES}
+            for name in TokenIndex.VOCABULARIES:
+                postings[name]['terms'] = packed(f'{name}_terms')
+            return TokenIndex(packed('source_names'), data['source_codes'], packed('fields'), postings)
+
+    def term_postings(self, term: str, vocabulary: str = 'token') -> tuple:
+        """Return posting list of a term.
+
+        :param term: Term to look up.
+        :param vocabulary: One of VOCABULARIES (default: 'token').
+        :return: Tuple of arrays (row IDs, term frequencies); empty if term not found.
+        """
+        postings = self.postings[vocabulary]
+        i = postings['terms'].find_sorted(term)
+        if i >= 0:
+            start, end = postings['offsets'][i], postings['offsets'][i + 1]
+            return postings['row_ids'][start:end], postings['term_freqs'][start:end]
+
+        return np.array([], dtype=np.uint32), np.array([], dtype=np.uint16)
+
+    def search(self, query: str, mode: str = 'and', stemmed: bool = True, top_k: int = 10,
+               stemmer=nltk.LancasterStemmer()) -> pd.DataFrame:
+        """Find rows matching a free text query, ranked by TF-IDF.
+
+        The query is cleansed as descriptors are, so stop words and punctuation are ignored.
+
+        :param query: Free text, e.g. 'admission date'.
+        :param mode: 'and' for rows matching all terms, 'or' for rows matching any (default: 'and').
+        :param stemmed: Whether to match on stems rather than exact tokens (default: True).
+        :param top_k: Maximum number of rows returned (default: 10).
+        :param stemmer: NLTK stemmer used to build the index (default LancasterStemmer).
+        :return: DataFrame with columns Row, Source, Fields, Score, best first.
+        """
+        if mode not in ['and', 'or']:
+            raise ValueError(f'Unknown search mode: {mode}')
+
+        terms = MDT.cleanse_text(query)
+        vocabulary = 'token'
+        if stemmed:
+            terms = MDT.stemming(terms, stemmer)
+            vocabulary = 'stem'
+        terms = list(dict.fromkeys(terms))
+
+        scores = np.zeros(self.row_count, dtype=np.float64)
+        matches = np.zeros(self.row_count, dtype=np.int32)
+        for term in terms:
+            row_ids, term_freqs = self.term_postings(term, vocabulary)
+            if len(row_ids) == 0:
+                continue
+            idf = np.log(self.row_count / len(row_ids)) + 1.0
+            scores[row_ids] += (1.0 + np.log(term_freqs)) * idf
+            matches[row_ids] += 1
+
+        required = len(terms) if mode == 'and' else 1
+        candidates = np.flatnonzero(matches >= max(required, 1))
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        return pd.DataFrame({
+            'Row': candidates,
+            'Source': self.source_names.take(self.source_codes[candidates]),
+            'Fields': self.fields.take(candidates),
+            'Score': scores[candidates]
+        })
@@ -0,0 +1,166 @@
+# workbook_cache.py
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+import pandas as pd
+from src.memory_profiler import MemoryProfiler
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class WorkbookCache:
+    """Cache of Excel workbooks converted to columnar files, one per worksheet.
+
+    Parsing a large workbook through openpyxl is far slower than anything done with its data afterwards. The first
+    read of a workbook stores each worksheet as Parquet (or as a pickle, where a sheet's mixed-type columns cannot be
+    held in Parquet, or pyarrow is not installed); later reads of the unchanged workbook are served from those files.
+
+    Entries are kept per workbook path, validated by size and modification time, or with use_hash per workbook
+    content, so that copies of a workbook share one entry. Entries of earlier contents are then not replaced but
+    left until the cache directory is cleared.
+    """
+
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, cache_dir: str, use_hash: bool = False):
+        """
+        :param cache_dir: Directory holding the cache.
+        :param use_hash: Whether to key cached workbooks by content hash rather than path, size and modification
+        time; survives copies and touches of unchanged workbooks, at the cost of reading them (default: False).
+        """
+        self.cache_dir = cache_dir
+        self.use_hash = use_hash
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_hash(src_path: str, chunk_size: int = 1024 * 1024) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(src_path, 'rb') as infile:
+            for chunk in iter(lambda: infile.read(chunk_size), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def entry_dir(self, src_path: str, key: dict = None) -> str:
+        """Return the cache directory for a workbook, from its absolute path, or with use_hash its content hash.
+
+        :param src_path: Path to workbook.
+        :param key: Workbook key, as from workbook_key, if already computed (default: None).
+        :return: Path of cache directory.
+        """
+        if self.use_hash:
+            key = key if key is not None else self.workbook_key(src_path)
+            return os.path.join(self.cache_dir, f"content_{key['content_hash']}")
+        path_hash = hashlib.sha1(os.path.abspath(src_path).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f'{Path(src_path).stem}_{path_hash}')
+
+    def workbook_key(self, src_path: str) -> dict:
+        """Return the values identifying the current version of a workbook."""
+        if self.use_hash:
+            return {'content_hash': WorkbookCache.content_hash(src_path)}
+        stat = os.stat(src_path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def cached_sheets(self, src_path: str, key: dict = None):
+        """Read a workbook's worksheets from the cache, if cached and unchanged since.
+
+        :param src_path: Path to workbook.
+        :param key: Workbook key, as from workbook_key, if already computed (default: None).
+        :return: Dictionary of sheet name to DataFrame, or None if not cached.
+        """
+        key = key if key is not None else self.workbook_key(src_path)
+        entry_dir = self.entry_dir(src_path, key)
+        manifest_path = os.path.join(entry_dir, WorkbookCache.MANIFEST_NAME)
+        if not Path(manifest_path).is_file():
+            return None
+        with open(manifest_path, 'r', encoding='utf-8') as infile:
+            manifest = json.load(infile)
+        if manifest['key'] != key:
+            return None
+
+        dfs = {}
+        for sheet in manifest['sheets']:
+            sheet_path = os.path.join(entry_dir, sheet['file'])
+            dfs[sheet['name']] = pd.read_parquet(sheet_path) if sheet['file'].endswith('.parquet') \
+                else pd.read_pickle(sheet_path)
+
+        return dfs
+
+    def store(self, src_path: str, dfs: dict, key: dict = None):
+        """Store a workbook's worksheets in the cache, replacing any earlier version.
+
+        The entry is written to a temporary directory and moved into place, so an interrupted store leaves no entry.
+
+        :param src_path: Path to workbook.
+        :param dfs: Dictionary of sheet name to DataFrame.
+        :param key: Key of the workbook as it was when dfs were parsed, as from workbook_key; computed now if None
+        (default: None).
+        """
+        key = key if key is not None else self.workbook_key(src_path)
+        entry_dir = self.entry_dir(src_path, key)
+        temp_dir = f'{entry_dir}.tmp'
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        Path(temp_dir).mkdir(parents=True)
+
+        sheets = []
+        for i, (name, df) in enumerate(dfs.items()):
+            file_name = f'sheet_{i:03d}.parquet'
+            try:
+                if pyarrow is None:
+                    raise ImportError('pyarrow is not installed')
+                df.to_parquet(os.path.join(temp_dir, file_name))
+            except (ImportError, ValueError, TypeError, NotImplementedError):
+                # E.g. non-string column names or columns of mixed types
+                file_name = f'sheet_{i:03d}.pkl'
+                df.to_pickle(os.path.join(temp_dir, file_name))
+            sheets.append({'name': name, 'file': file_name})
+
+        manifest = {'source': os.path.abspath(src_path), 'key': key, 'sheets': sheets}
+        with open(os.path.join(temp_dir, WorkbookCache.MANIFEST_NAME), 'w', encoding='utf-8') as outfile:
+            json.dump(manifest, outfile, indent=2)
+
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(temp_dir, entry_dir)
+
+    @staticmethod
+    def read_sheets(wb: pd.ExcelFile, src_path: str) -> dict:
+        """Parse all worksheets of an open workbook, as pd.read_excel with sheet_name=None, one sheet at a time so
+        that memory profiling attributes each sheet.
+
+        :param wb: Open ExcelFile.
+        :param src_path: Path to workbook, to name profiled sheets.
+        :return: Dictionary of sheet name to DataFrame.
+        """
+        dfs = {}
+        for sheet_name in wb.sheet_names:
+            with MemoryProfiler.stage('read_excel', f'{Path(src_path).name}:{sheet_name}'):
+                dfs[sheet_name] = pd.read_excel(wb, sheet_name=sheet_name)
+
+        return dfs
+
+    def read_workbook(self, src_path: str) -> dict:
+        """Read all worksheets of a workbook, from the cache if possible, otherwise parsing and caching it.
+
+        :param src_path: Path to workbook.
+        :return: Dictionary of sheet name to DataFrame, as pd.read_excel with sheet_name=None.
+        """
+        # Taken before parsing, so that a workbook changed meanwhile is not cached under its new key
+        key = self.workbook_key(src_path)
+        dfs = self.cached_sheets(src_path, key)
+        if dfs is not None:
+            self.hits += 1
+            print(f'Workbook {src_path} read from cache {self.entry_dir(src_path, key)}.')
+            return dfs
+
+        self.misses += 1
+        with pd.ExcelFile(src_path) as wb:
+            dfs = WorkbookCache.read_sheets(wb, src_path)
+        self.store(src_path, dfs, key)
+
+        return dfs
@@ -0,0 +1,54 @@
+from pathlib import Path
+import os
+import tarfile
+import unittest
+from src.archive_tools import ArchiveTools
+from src.file_tools import FileTools
+
+
+class ArchiveToolsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_archive_tools')
+        self.ToArchiveDir = os.path.join(self.Temp, 'images')
+
+        FileTools.ensure_empty_directory(self.Temp)
+        Path(os.path.join(self.ToArchiveDir, 'sub')).mkdir(parents=True, exist_ok=True)
+        self.Contents = {'a.txt': os.urandom(3000), os.path.join('sub', 'b.txt'): b'b' * 5000}
+        for name, content in self.Contents.items():
+            with open(os.path.join(self.ToArchiveDir, name), 'wb') as outfile:
+                outfile.write(content)
+
+    def tearDown(self) -> None:
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def test_make_tar_archive__by_format__round_trips_content(self):
+        for archive_format in ['tar', 'gztar', 'xztar']:
+            with self.subTest(self):
+                print(f'Testing for: {archive_format}')
+                # Small chunks force multiple compressed members/streams
+                archive_path = ArchiveTools.make_tar_archive(
+                    os.path.join(self.Temp, archive_format), archive_format, self.Temp, 'images',
+                    compress_level=1, workers=2, chunk_size=2048)
+
+                self.assertTrue(archive_path.endswith(ArchiveTools.FORMAT_EXTENSIONS[archive_format]))
+                with tarfile.open(archive_path, 'r:*') as tar:
+                    for name, content in self.Contents.items():
+                        member = tar.extractfile('/'.join(['images'] + name.split(os.sep)))
+                        self.assertEqual(content, member.read())
+
+    def test_make_tar_archive__invalid_format__raises_exception(self):
+        self.assertRaises(ValueError, ArchiveTools.make_tar_archive,
+                          os.path.join(self.Temp, 'bad'), 'rar', self.Temp, 'images')
+
+    def test_make_tar_archive__failure__removes_partial_archive(self):
+        base_name = os.path.join(self.Temp, 'partial')
+
+        self.assertRaises(FileNotFoundError, ArchiveTools.make_tar_archive, base_name, 'gztar', self.Temp, 'missing',
+                          workers=2)
+        self.assertFalse(Path(base_name + '.tar.gz').exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
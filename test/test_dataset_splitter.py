@@ -0,0 +1,87 @@
+from pathlib import Path
+import os
+import unittest
+import pandas as pd
+from src.dataset_splitter import DatasetSplitter
+from src.file_tools import FileTools
+
+
+class DatasetSplitterTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_dataset_splitter')
+        FileTools.ensure_empty_directory(self.Temp)
+
+        rows = [[f'source_{i % 7}', f'field_{i}', f'tokens,of,{i}', ['key', 'person', 'date'][i % 3 if i < 900 else 0]]
+                for i in range(1000)]
+        self.LabelledDataFrame = pd.DataFrame(rows, columns=['Source', 'Fields', 'Tokenized Descriptors', 'Labels'])
+        self.LabelledFilePath = os.path.join(self.Temp, 'labelled.txt')
+        self.LabelledDataFrame.to_csv(self.LabelledFilePath, sep='\t', index=False)
+
+    def tearDown(self):
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def read_splits(self, target_dir: str, name: str, sep: str = '\t') -> dict:
+        return {split: pd.read_csv(os.path.join(target_dir, f'{split}_{name}'), sep=sep)
+                for split in DatasetSplitter.SPLITS}
+
+    def test_split_file__rows_kept_and_reproducible(self):
+        label_counts = DatasetSplitter.split_file(self.LabelledFilePath, os.path.join(self.Temp, 'first'))
+        first = self.read_splits(os.path.join(self.Temp, 'first'), 'labelled.txt')
+
+        shuffled_path = os.path.join(self.Temp, 'shuffled.txt')
+        self.LabelledDataFrame.sample(frac=1, random_state=1).to_csv(shuffled_path, sep='\t', index=False)
+        DatasetSplitter.split_file(shuffled_path, os.path.join(self.Temp, 'shuffled'))
+        shuffled = self.read_splits(os.path.join(self.Temp, 'shuffled'), 'shuffled.txt')
+
+        sub_tests = [
+            ('every row in one split', sorted(self.LabelledDataFrame['Fields']),
+             sorted(pd.concat(first.values())['Fields'])),
+            ('counts returned per split and label', [len(df) for df in first.values()],
+             [sum(counts.values()) for counts in label_counts.values()]),
+            ('same assignment whatever the row order', [sorted(df['Fields']) for df in first.values()],
+             [sorted(df['Fields']) for df in shuffled.values()]),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                self.assertEqual(expected, actual)
+
+    def test_split_file__balanced_by_label(self):
+        label_counts = DatasetSplitter.split_file(self.LabelledFilePath, self.Temp, ratios=[0.6, 0.2, 0.2],
+                                                  balanced=True)
+
+        for label, total in self.LabelledDataFrame['Labels'].value_counts().items():
+            with self.subTest(self):
+                print(f'Testing for: label {label} split in ratios')
+                for split, ratio in zip(DatasetSplitter.SPLITS, [0.6, 0.2, 0.2]):
+                    self.assertLessEqual(abs(label_counts[split][label] - ratio * total), 1)
+
+    def test_split_file__bert_type(self):
+        bert_path = os.path.join(self.Temp, 'bert.txt')
+        pd.DataFrame({'category': ['key', 'person'] * 10,
+                      'text': [f'text, with comma {i}' for i in range(20)]}).to_csv(bert_path, index=False)
+
+        DatasetSplitter.split_file(bert_path, self.Temp, ratios=[0.5, 0.25, 0.25])
+        splits = self.read_splits(self.Temp, 'bert.txt', sep=',')
+
+        self.assertEqual(20, sum(len(df) for df in splits.values()))
+        self.assertEqual(['category', 'text'], list(splits['train'].columns))
+
+    def test_parse_ratios(self):
+        sub_tests = [
+            ('normalised', [0.5, 0.25, 0.25], DatasetSplitter.parse_ratios('2,1,1')),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                self.assertEqual(expected, actual)
+
+        with self.subTest(self):
+            print('Testing for: invalid ratios')
+            self.assertRaises(ValueError, DatasetSplitter.parse_ratios, '0.8,0.2')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+from pathlib import Path
+import os
+import unittest
+from src.file_discovery import FileDiscovery
+from src.file_tools import FileTools
+
+
+class FileDiscoveryTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_file_discovery')
+        self.TestDataDir = os.path.join(self.Root, 'test_data')
+
+        FileTools.ensure_empty_directory(self.Temp)
+        # Tree: Temp/a.txt, Temp/b.csv, Temp/ch01/c.txt, Temp/ch01/01_Start/d.txt
+        self.NestedDir = os.path.join(self.Temp, 'ch01')
+        self.StartDir = os.path.join(self.NestedDir, '01_Start')
+        Path(self.StartDir).mkdir(parents=True, exist_ok=True)
+        for file_path in [os.path.join(self.Temp, 'a.txt'), os.path.join(self.Temp, 'b.csv'),
+                          os.path.join(self.NestedDir, 'c.txt'), os.path.join(self.StartDir, 'd.txt')]:
+            with open(file_path, 'w') as outfile:
+                outfile.write('x')
+
+    def tearDown(self) -> None:
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def test_iter_file_paths__by_filter(self):
+        sub_tests = [['No filter', {}, ['a.txt', 'b.csv', 'c.txt', 'd.txt']],
+                     ['Single suffix', {'suffix': '.txt'}, ['a.txt', 'c.txt', 'd.txt']],
+                     ['Suffix list', {'suffix': ['.txt', '.csv']}, ['a.txt', 'b.csv', 'c.txt', 'd.txt']],
+                     ['Not recursive', {'recursive': False}, ['a.txt', 'b.csv']],
+                     ['Max depth', {'max_depth': 1}, ['a.txt', 'b.csv', 'c.txt']],
+                     ['Parent name', {'parent_name_endswith': 'Start'}, ['d.txt']]]
+        for sub_test in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {sub_test[0]}')
+                actual = sorted(Path(p).name for p in FileDiscovery.iter_file_paths(self.Temp, **sub_test[1]))
+                self.assertEqual(sub_test[2], actual)
+
+    def test_iter_file_paths__returns_full_paths_of_nested_files(self):
+        paths = list(FileDiscovery.iter_file_paths(self.Temp, '.txt'))
+
+        self.assertIn(os.path.join(self.StartDir, 'd.txt'), paths)
+
+    def test_first_file_path__by_suffix(self):
+        sub_tests = [['Found', '.csv', os.path.join(self.Temp, 'b.csv')],
+                     ['Not found', '.jpg', '']]
+        for sub_test in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {sub_test[0]}')
+                actual = FileDiscovery.first_file_path(self.Temp, sub_test[1])
+                self.assertEqual(sub_test[2], actual)
+
+    def test_iter_file_entries__missing_directory__yields_nothing(self):
+        actual = list(FileDiscovery.iter_file_entries(os.path.join(self.Temp, 'missing')))
+
+        self.assertEqual([], actual)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+from pathlib import Path
+import numpy as np
+import os
+import pandas as pd
+from PIL import Image
+import unittest
+from src.file_discovery import FileDiscovery
+from src.file_tools import FileTools
+
+
+class FileToolsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_file_tools')
+        self.SourceDir = os.path.join(self.Temp, 'source')
+        self.TargetDir = os.path.join(self.Temp, 'target')
+
+        FileTools.ensure_empty_directory(self.Temp)
+        # Deep structure: source/chXX/XX_NN/Start/fileXX_NN.txt
+        for chapter, item in [('01', '01'), ('01', '02'), ('02', '01')]:
+            start_dir = os.path.join(self.SourceDir, f'ch{chapter}', f'{chapter}_{item}', 'Start')
+            Path(start_dir).mkdir(parents=True, exist_ok=True)
+            with open(os.path.join(start_dir, f'file{chapter}_{item}.txt'), 'w') as outfile:
+                outfile.write(chapter * 100)
+            with open(os.path.join(Path(start_dir).parent, 'ignored.txt'), 'w') as outfile:
+                outfile.write('ignored')
+
+    def tearDown(self) -> None:
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def test_collate_files_by_low_level_dir_name__copies_to_restructured_paths(self):
+        path_parts_re = [[self.SourceDir.replace('\\', '\\\\'), self.TargetDir.replace('\\', '\\\\')],
+                         [r'ch\d\d[\\/]', ''],
+                         [r'[\\/]Start', '']]
+
+        data = FileTools.collate_files_by_low_level_dir_name(self.SourceDir, 'Start', path_parts_re)
+
+        with self.subTest(self):
+            print('Testing for: only files in low level directories collated')
+            self.assertEqual(3, len(data))
+
+        with self.subTest(self):
+            print('Testing for: files copied to restructured paths')
+            expected = os.path.join(self.TargetDir, '02_01', 'file02_01.txt')
+            self.assertIn(expected, list(data['CopyPath']))
+            self.assertTrue(Path(expected).is_file())
+
+    def test_copy_files_in_parallel__returns_summary(self):
+        src_file = os.path.join(self.SourceDir, 'ch01', '01_01', 'Start', 'file01_01.txt')
+        copy_pairs = [(src_file, os.path.join(self.TargetDir, 'a', f'copy{i}.txt')) for i in range(5)]
+
+        summary = FileTools.copy_files_in_parallel(copy_pairs, max_workers=2)
+
+        self.assertEqual(5, summary['files'])
+        self.assertEqual(1000, summary['bytes'])
+        self.assertEqual(5, len(os.listdir(os.path.join(self.TargetDir, 'a'))))
+
+    def test_copy_files_in_parallel__incremental(self):
+        src_dir = os.path.join(self.SourceDir, 'ch01', '01_01', 'Start')
+        copy_pairs = [(os.path.join(src_dir, 'file01_01.txt'), os.path.join(self.TargetDir, 'a.txt')),
+                      (os.path.join(src_dir, 'file01_01.txt'), os.path.join(self.TargetDir, 'b.txt'))]
+        FileTools.copy_files_in_parallel(copy_pairs, incremental=True)
+        with open(os.path.join(self.TargetDir, 'stale.txt'), 'w') as outfile:
+            outfile.write('stale')
+        # A changed source is recopied even though its size is the same
+        with open(os.path.join(src_dir, 'new.txt'), 'w') as outfile:
+            outfile.write('01' * 100)
+        os.utime(os.path.join(src_dir, 'new.txt'), (0, 0))
+        copy_pairs[1] = (os.path.join(src_dir, 'new.txt'), os.path.join(self.TargetDir, 'b.txt'))
+
+        summary = FileTools.copy_files_in_parallel(copy_pairs, incremental=True, prune_dir=self.TargetDir)
+
+        sub_tests = [
+            ('changed file copied', 1, summary['files']),
+            ('unchanged file skipped', [1, 200], [summary['skipped_files'], summary['skipped_bytes']]),
+            ('stale file pruned', ['a.txt', 'b.txt'], sorted(os.listdir(self.TargetDir))),
+            ('unchanged by hash', True, FileTools.is_unchanged_copy(copy_pairs[1][0], copy_pairs[1][1],
+                                                                    use_hash=True)),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                self.assertEqual(expected, actual)
+
+    def write_files(self, contents: dict) -> list:
+        Path(self.SourceDir).mkdir(parents=True, exist_ok=True)
+        for name, content in contents.items():
+            with open(os.path.join(self.SourceDir, name), 'wb') as outfile:
+                outfile.write(content)
+        return [os.path.join(self.SourceDir, name) for name in contents]
+
+    def test_find_duplicate_files(self):
+        file_paths = self.write_files({'a': b'x' * 100 + b'1', 'b': b'x' * 100 + b'2', 'c': b'x' * 100 + b'1',
+                                       'd': b'short', 'e': b'short', 'f': b'unique size'})
+
+        # Small partial digests, so a and b match on their first bytes and must be compared whole
+        duplicates = FileTools.find_duplicate_files(file_paths, partial_bytes=10)
+
+        self.assertEqual({file_paths[2]: file_paths[0], file_paths[4]: file_paths[3]}, duplicates)
+
+    def test_copy_files_in_parallel__link_duplicates(self):
+        file_paths = self.write_files({'a.txt': b'same', 'b.txt': b'same', 'c.txt': b'other'})
+        copy_pairs = [(file_path, os.path.join(self.TargetDir, Path(file_path).name)) for file_path in file_paths]
+
+        summary = FileTools.copy_files_in_parallel(copy_pairs, link_duplicates=True)
+
+        sub_tests = [
+            ('distinct files copied', 2, summary['files']),
+            ('duplicate linked', 1, summary['linked_files']),
+            ('duplicate shares data with its original', True,
+             os.path.samefile(copy_pairs[0][1], copy_pairs[1][1])),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                self.assertEqual(expected, actual)
+
+    def test_copy_files_in_parallel__link_duplicates__source_changed(self):
+        file_paths = self.write_files({'a.txt': b'same', 'b.txt': b'same'})
+        copy_pairs = [(file_path, os.path.join(self.TargetDir, Path(file_path).name)) for file_path in file_paths]
+        FileTools.copy_files_in_parallel(copy_pairs, incremental=True, link_duplicates=True)
+
+        # Same size, so the first copy is replaced while the second stays linked to its old data
+        with open(file_paths[0], 'wb') as outfile:
+            outfile.write(b'diff')
+        os.utime(file_paths[0], (0, 0))
+        FileTools.copy_files_in_parallel(copy_pairs, incremental=True, link_duplicates=True)
+
+        for (src_path, target_path), expected in zip(copy_pairs, [b'diff', b'same']):
+            with self.subTest(self):
+                print(f'Testing for: {Path(target_path).name} copy of its own source')
+                with open(target_path, 'rb') as infile:
+                    self.assertEqual(expected, infile.read())
+
+    def test_create_numpy_archive_from_images_dir__deduplicate(self):
+        Path(self.SourceDir).mkdir(parents=True, exist_ok=True)
+        for name, value in [('a.png', 0), ('b.png', 255), ('c.png', 0)]:
+            Image.fromarray(np.full((4, 4), value, dtype=np.uint8)).save(os.path.join(self.SourceDir, name))
+        target_path = os.path.join(self.Temp, 'images')
+
+        FileTools.create_numpy_archive_from_images_dir(self.SourceDir, target_path, suffix='.png', deduplicate=True)
+
+        images = np.load(target_path + '.npy')
+        index = pd.read_csv(target_path + '_index.csv').set_index('FileName')['Row']
+        with self.subTest(self):
+            print('Testing for: each distinct image stored once')
+            self.assertEqual(2, len(images))
+        with self.subTest(self):
+            print('Testing for: index maps every file to its image')
+            for name, value in [('a.png', 0), ('b.png', 255), ('c.png', 0)]:
+                self.assertEqual(value, images[index[name]][0, 0])
+
+    def test_image_statistics_from_dir__and_archive_stats(self):
+        Path(self.SourceDir).mkdir(parents=True, exist_ok=True)
+        for i in range(5):
+            Image.fromarray(np.full((4, 6, 3), i * 10, dtype=np.uint8)).save(os.path.join(self.SourceDir, f'{i}.png'))
+        target_path = os.path.join(self.Temp, 'images')
+
+        statistics = FileTools.image_statistics_from_dir(self.SourceDir, suffix='.png', max_workers=2, chunk_size=2)
+        FileTools.create_numpy_archive_from_images_dir(self.SourceDir, target_path, suffix='.png', save_stats=True,
+                                                       max_workers=2, chunk_size=2)
+
+        with self.subTest(self):
+            print('Testing for: statistics of directory')
+            np.testing.assert_allclose([20.0] * 3, statistics.mean)
+            np.testing.assert_allclose([np.std([0, 10, 20, 30, 40])] * 3, statistics.std)
+            self.assertEqual({'4x6x3': 5}, statistics.shapes)
+
+        with self.subTest(self):
+            print('Testing for: statistics saved with archive')
+            with open(target_path + '_stats.json', 'r', encoding='utf-8') as infile:
+                self.assertEqual(statistics.to_dict(), json.load(infile))
+
+        with self.subTest(self):
+            print('Testing for: images archived in discovery order across chunks')
+            expected = [int(Path(image_path).stem) * 10
+                        for image_path in FileDiscovery.iter_file_paths(self.SourceDir, '.png', recursive=False)]
+            np.testing.assert_array_equal(expected, np.load(target_path + '.npy')[:, 0, 0, 0])
+
+    def test_create_numpy_archive_from_images_dir__by_resize_backend(self):
+        Path(self.SourceDir).mkdir(parents=True, exist_ok=True)
+        for i in range(2):
+            Image.fromarray(np.full((80, 60, 3), 100 + i, dtype=np.uint8)).save(os.path.join(self.SourceDir, f'{i}.jpg'))
+
+        sub_tests = [['skimage', 'int'], ['pil', 'uint8']]
+        for backend, dtype_kind in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {backend}')
+                target_path = os.path.join(self.Temp, backend)
+                FileTools.create_numpy_archive_from_images_dir(self.SourceDir, target_path, new_shape=(8, 6, 3),
+                                                               resize_backend=backend)
+                images = np.load(target_path + '.npy')
+                self.assertEqual((2, 8, 6, 3), images.shape)
+                self.assertEqual(np.dtype(dtype_kind), images.dtype)
+                self.assertLessEqual(np.abs(images.astype(int) - 100).max(), 3)
+
+        with self.subTest(self):
+            print('Testing for: unknown backend')
+            self.assertRaises(ValueError, FileTools.create_numpy_archive_from_images_dir, self.SourceDir,
+                              os.path.join(self.Temp, 'x'), resize_backend='opencv')
+
+    def test_chunks_generator__by_input_type(self):
+        sub_tests = [['List', list(range(7)), [[0, 1, 2], [3, 4, 5], [6]]],
+                     ['Generator', (i for i in range(7)), [[0, 1, 2], [3, 4, 5], [6]]],
+                     ['NumPy array', np.arange(7), [[0, 1, 2], [3, 4, 5], [6]]],
+                     ['DataFrame rows', pd.DataFrame({'a': range(7)}).itertuples(index=False),
+                      [[(0,), (1,), (2,)], [(3,), (4,), (5,)], [(6,)]]],
+                     ['Empty', [], []]]
+        for sub_test in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {sub_test[0]}')
+                actual = [[tuple(item) if isinstance(item, tuple) else item for item in chunk]
+                          for chunk in FileTools.chunks_generator(sub_test[1], 3)]
+                self.assertEqual(sub_test[2], [list(chunk) for chunk in actual])
+
+    def test_chunks_generator__numpy_chunks_are_views(self):
+        array = np.arange(10)
+
+        chunks = list(FileTools.chunks_generator(array, 4))
+
+        self.assertTrue(all(np.shares_memory(chunk, array) for chunk in chunks))
+
+    def test_chunks_generator__invalid_chunk_size__raises_exception(self):
+        self.assertRaises(ValueError, list, FileTools.chunks_generator([1, 2], 0))
+
+    def test_bounded_map__in_order_and_consumes_items_lazily(self):
+        consumed = []
+
+        def items():
+            for item in range(100):
+                consumed.append(item)
+                yield item
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = FileTools.bounded_map(executor, lambda item: item * item, items(), 4)
+            first = [next(results) for _ in range(3)]
+            consumed_after_first = len(consumed)
+            rest = list(results)
+
+        with self.subTest(self):
+            print('Testing for: order')
+            self.assertEqual([item * item for item in range(100)], first + rest)
+        with self.subTest(self):
+            print('Testing for: bounded')
+            self.assertLessEqual(consumed_after_first, 3 + 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import pandas as pd
+import unittest
+from src.identifier_tools import AbbreviationTrie, IdentifierTools
+
+
+class IdentifierToolsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Trie = AbbreviationTrie(IdentifierTools.DEFAULT_ABBREVIATIONS)
+
+    def test_split_identifier__by_style(self):
+        sub_tests = [['snake_case', 'ADMIT_DT', ['admit', 'date']],
+                     ['camelCase', 'PatientIdNo', ['patient', 'identifier', 'number']],
+                     ['Acronym then word', 'HTTPServerName', ['http', 'server', 'name']],
+                     ['Digits', 'addr_line2', ['address', 'line', '2']],
+                     ['Real word not broken up', 'NOTE', ['note']],
+                     ['Compound not split by default', 'PATTY', ['patty']]]
+        for sub_test in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {sub_test[0]}')
+                actual = IdentifierTools.split_identifier(sub_test[1], self.Trie)
+                self.assertEqual(sub_test[2], actual)
+
+    def test_split_identifier__compounds(self):
+        trie = AbbreviationTrie({'bew': 'movement', 'ty': 'type', 'pa': 'pa', 'pat': 'patient', 'tno': 'tno'})
+        sub_tests = [['SAP abbreviations', 'BEWTY', ['movement', 'type']],
+                     ['Backtracks from longest match', 'PATNO', ['pa', 'tno']],
+                     ['Real word not broken up', 'NOTE', ['note']]]
+        for sub_test in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {sub_test[0]}')
+                actual = IdentifierTools.split_identifier(sub_test[1], trie, compounds=True)
+                self.assertEqual(sub_test[2], actual)
+
+    def test_longest_prefix__prefers_longest_match(self):
+        trie = AbbreviationTrie({'pat': 'patient', 'patnr': 'patient number'})
+
+        self.assertEqual((5, 'patient number'), trie.longest_prefix('patnr'))
+        self.assertEqual((0, None), trie.longest_prefix('xyz'))
+
+    def test_tokenize_identifiers__maps_repeated_and_missing_values(self):
+        identifiers = pd.Series(['ADMIT_DT', None, 'ADMIT_DT', 'sex'], index=[10, 11, 12, 13])
+
+        actual = IdentifierTools.tokenize_identifiers(identifiers)
+
+        self.assertEqual(['admit,date', '', 'admit,date', 'sex'], list(actual))
+        self.assertEqual([10, 11, 12, 13], list(actual.index))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import numpy as np
+import unittest
+from src.image_statistics import ImageStatistics
+
+
+class ImageStatisticsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        rng = np.random.default_rng(0)
+        self.Images = [rng.integers(0, 256, size=shape) for shape in [(4, 5, 3), (6, 5, 3), (4, 5, 3), (2, 2, 3)]]
+        self.AllPixels = np.concatenate([image.reshape(-1, 3) for image in self.Images]).astype(np.float64)
+
+    def test_update__matches_whole_dataset(self):
+        statistics = ImageStatistics()
+        for image in self.Images:
+            statistics.update(image)
+
+        sub_tests = [
+            ('mean', self.AllPixels.mean(axis=0), statistics.mean),
+            ('std', self.AllPixels.std(axis=0), statistics.std),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                np.testing.assert_allclose(expected, actual)
+
+        with self.subTest(self):
+            print('Testing for: shape histogram')
+            self.assertEqual({'4x5x3': 2, '6x5x3': 1, '2x2x3': 1}, statistics.to_dict()['shapes'])
+
+    def test_merge__same_as_single_pass(self):
+        single = ImageStatistics()
+        parts = [ImageStatistics(), ImageStatistics(), ImageStatistics()]
+        for i, image in enumerate(self.Images):
+            single.update(image)
+            parts[i % 2].update(image)
+
+        merged = parts[0].merge(parts[1]).merge(parts[2])
+
+        np.testing.assert_allclose(single.mean, merged.mean)
+        np.testing.assert_allclose(single.std, merged.std)
+        self.assertEqual(single.to_dict()['images'], merged.to_dict()['images'])
+
+    def test_update__mixed_channels__raises_exception(self):
+        statistics = ImageStatistics()
+        statistics.update(np.zeros((2, 2)))
+
+        self.assertRaises(ValueError, statistics.update, np.zeros((2, 2, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import time
+import unittest
+from src.custom_exceptions import FileProcessingException
+from src.isolated_runner import IsolatedRunner, resource
+
+
+def slow_square(item: int, delay: float) -> int:
+    if item == 2:
+        time.sleep(delay)
+    if item == 3:
+        raise ValueError('Malformed item')
+    return item * item
+
+
+def allocate(item: int) -> int:
+    return len(bytearray(item * 1024 * 1024 * 1024))
+
+
+class IsolatedRunnerTestCase(unittest.TestCase):
+    def test_run__records_failures_and_continues(self):
+        failed = []
+        succeeded = []
+        runner = IsolatedRunner(slow_square, args=(30,), timeout=2, workers=2, on_failure=failed.append,
+                                on_success=lambda item, result: succeeded.append([item, result]))
+
+        start = time.perf_counter()
+        outcomes = runner.run(range(5))
+
+        self.assertLess(time.perf_counter() - start, 20)
+        sub_tests = [
+            ('results in item order', [[0, 0, None], [1, 1, None], [4, 16, None]],
+             [outcome for outcome in outcomes if outcome[2] is None]),
+            ('timeout recorded', FileProcessingException, type(outcomes[2][2])),
+            ('error from worker recorded', ValueError, type(outcomes[3][2])),
+            ('on_failure called for failures', [2, 3], sorted(failed)),
+            ('on_success called for results', [[0, 0], [1, 1], [4, 16]], sorted(succeeded)),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                self.assertEqual(expected, actual)
+
+    @unittest.skipIf(resource is None, 'Memory limits need the resource module')
+    def test_run__memory_limit(self):
+        runner = IsolatedRunner(allocate, memory_limit_mb=512, workers=1)
+
+        outcomes = runner.run([64])
+
+        self.assertIsInstance(outcomes[0][2], FileProcessingException)
+        self.assertIn('Memory limit', str(outcomes[0][2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
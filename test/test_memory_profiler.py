@@ -0,0 +1,79 @@
+import json
+import os
+from pathlib import Path
+import unittest
+from src.file_tools import FileTools
+from src.memory_profiler import MemoryProfiler
+from src.meta_data_tools import MetaDataTools
+
+
+def allocate_and_free(megabytes: int) -> int:
+    return len(bytearray(megabytes * 1024 * 1024))
+
+
+class MemoryProfilerTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_memory_profiler')
+        self.TestDataDir = os.path.join(self.Root, 'test_data')
+
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def tearDown(self) -> None:
+        if MemoryProfiler.active is not None:
+            MemoryProfiler.active.stop()
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def test_stage__without_profiler__does_nothing(self):
+        with MemoryProfiler.stage('read', 'file.txt'):
+            allocate_and_free(1)
+
+        self.assertIsNone(MemoryProfiler.active)
+
+    def test_stage__attributes_peaks_to_stages_and_items(self):
+        profiler = MemoryProfiler().start()
+        with MemoryProfiler.stage('tokenize', 'sheet_a'):
+            with MemoryProfiler.stage('cleanse'):
+                allocate_and_free(20)
+            held = bytearray(2 * 1024 * 1024)
+        with MemoryProfiler.stage('tokenize', 'sheet_b'):
+            allocate_and_free(5)
+        save_path = os.path.join(self.Temp, 'memory_profile.json')
+        profiler.finish(save_path)
+        with open(save_path, 'r', encoding='utf-8') as infile:
+            saved = json.load(infile)
+        records = {(record['stage'], record['item']): record for record in profiler.records}
+
+        sub_tests = [
+            ('peak freed within stage', True, records[('cleanse', 'sheet_a')]['peak_bytes'] >= 20 * 2 ** 20),
+            ('enclosing stage includes nested peak', True,
+             records[('tokenize', 'sheet_a')]['peak_bytes'] >= 20 * 2 ** 20),
+            ('stage peaked on largest item', ['tokenize', 'sheet_a'],
+             [profiler.summary()[0]['stage'], profiler.summary()[0]['peak_item']]),
+            ('held allocation site found', True,
+             any(Path(__file__).name in site for stage, site, size in profiler.top_allocation_sites())),
+            ('profiler no longer active', None, MemoryProfiler.active),
+            ('report saved', ['cleanse', 'tokenize'], sorted(stage['stage'] for stage in saved['stages'])),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                self.assertEqual(expected, actual)
+        del held
+
+    def test_stage__marks_pipeline_stages(self):
+        profiler = MemoryProfiler(top_sites=0).start()
+        df = MetaDataTools.read_source_file(os.path.join(self.TestDataDir, 'test_tsv_2_cols.txt'))
+        df = MetaDataTools.field_tokenized_descriptor_df_from_df(df, 'test_tsv_2_cols')
+        df = MetaDataTools.collate_dfs_from_list([df, df])
+        MetaDataTools.write_df(df, os.path.join(self.Temp, 'out.txt'))
+        profiler.stop()
+
+        self.assertEqual([['read', 'test_tsv_2_cols.txt'], ['cleanse', 'test_tsv_2_cols'],
+                          ['concat', '2 DataFrames'], ['to_csv', 'out.txt']],
+                         [[record['stage'], record['item']] for record in profiler.records])
+
+
+if __name__ == '__main__':
+    unittest.main()
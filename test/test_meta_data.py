@@ -2,6 +2,7 @@ from pathlib import Path
 import os
 import pandas as pd
 import unittest
+from src.custom_exceptions import DataFrameException
 from src.meta_data import MetaData
 
 
@@ -19,6 +20,47 @@ class MetaDataTestCase(unittest.TestCase):
         print(md.raw_data.head())
         self.assertEqual(md.raw_data.shape, (2, 5))
 
+    def test_init__does_not_read_data(self):
+        md = MetaData(os.path.join(self.TestDataDir, 'missing_file.txt'))
+
+        self.assertEqual('missing_file', md.source)
+
+    def test_tokenized__is_cached_until_released(self):
+        md = MetaData(self.TsvFilePath, is_labelled=True)
+
+        first = md.tokenized
+        with self.subTest(self):
+            print('Testing for: cached view returned')
+            self.assertIs(first, md.tokenized)
+            self.assertTrue('Labels' in first.columns)
+
+        md.release()
+        with self.subTest(self):
+            print('Testing for: view recomputed after release')
+            self.assertIsNot(first, md.tokenized)
+
+    def test_descriptor_column__returns_index_and_name(self):
+        md = MetaData(self.TsvFilePath)
+
+        self.assertEqual([1, 'Some Description'], md.descriptor_column)
+
+    def test_bert__by_labelling(self):
+        with self.subTest(self):
+            print('Testing for: labelled')
+            df = MetaData(self.TsvFilePath, is_labelled=True).bert
+            self.assertEqual(['category', 'text'], list(df.columns))
+            self.assertFalse(df['text'].str.contains(',').any())
+
+        with self.subTest(self):
+            print('Testing for: not labelled')
+            md = MetaData(self.TsvFilePath)
+            self.assertRaises(DataFrameException, getattr, md, 'bert')
+
+    def test_slots__no_instance_dict(self):
+        md = MetaData(self.TsvFilePath)
+
+        self.assertFalse(hasattr(md, '__dict__'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -6,6 +6,8 @@ import pandas as pd
 import os
 import unittest
 from src.meta_data_tools import MetaDataTools as MDT
+from src.run_journal import RunJournal
+from src.run_metrics import RunMetrics
 from src.custom_exceptions import DataFrameException
 
 
@@ -37,6 +39,53 @@ class MetaDataToolsTestCase(unittest.TestCase):
         print(df.head())
         self.assertEqual((2, 5), df.shape)
 
+    def test_read_raw_data__by_engine__reads_strings(self):
+        file_path = os.path.join(self.TestDataDir, 'test_tsv_5_cols_inc_labels.txt')
+        for engine in ['auto', 'default']:
+            with self.subTest(self):
+                print(f'Testing for: {engine}')
+                df = MDT.read_raw_data(file_path, engine=engine)
+                self.assertEqual((2, 5), df.shape)
+                self.assertEqual(['Fields', 'Some Description', 'Table', 'Table.1', 'Labels'], list(df.columns))
+                self.assertEqual('IS-H & Fred: Case Type', df['Some Description'][1])
+
+    def test_read_raw_data__usecols__projects_columns(self):
+        file_path = os.path.join(self.TestDataDir, 'test_tsv_5_cols_inc_labels.txt')
+
+        df = MDT.read_raw_data(file_path, engine='auto', usecols=[0, 1, 4])
+
+        self.assertEqual(['Fields', 'Some Description', 'Labels'], list(df.columns))
+
+    def test_read_raw_data__ragged_rows__auto_falls_back(self):
+        file_path = os.path.join(self.Temp, 'ragged.txt')
+        with open(file_path, 'w', encoding='utf-8') as outfile:
+            outfile.write('Fields\tSome Description\tLabels\nCASE_TYPE\tCase type\tcase\nADMIT_DT\tAdmission date\n')
+
+        df = MDT.read_raw_data(file_path, engine='auto')
+        tokenized = MDT.field_descriptors_df_from_file(file_path, self.Temp, engine='auto')
+
+        with self.subTest(self):
+            print('Testing for: short row filled with NaN')
+            self.assertEqual((2, 3), df.shape)
+            self.assertTrue(pd.isna(df['Labels'][1]))
+        with self.subTest(self):
+            print('Testing for: short row tokenized')
+            self.assertEqual(['case_type', 'admit_dt'], list(tokenized['Fields']))
+
+    def test_needed_column_indices__by_header(self):
+        sub_tests = [['Descriptor identified', ['Fields', 'Some Description', 'Table', 'Labels'], False, [0, 1]],
+                     ['Labelled', ['Fields', 'Table', 'Some Description', 'Labels'], True, [0, 2, 3]],
+                     ['Minimum columns', ['Fields', 'Flubber'], False, [0, 1]],
+                     ['Too few columns', ['Fields'], False, None],
+                     ['No descriptor', ['Fields', 'Flubber', 'Table'], False, None],
+                     ['Descriptor is fields', ['Field Description', 'Table', 'Type'], False, None],
+                     ['Descriptor is labels', ['Fields', 'Table', 'Type', 'Labels Description'], True, None]]
+        for sub_test in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {sub_test[0]}')
+                actual = MDT.needed_column_indices(sub_test[1], is_labelled=sub_test[2])
+                self.assertEqual(sub_test[3], actual)
+
     def test_cleanse_text_in_dataframe__returns_dataframe_with_punctuation_stripped(self):
         test_df = self.Test5ColIncLabelDataFrame
         columns_to_lower = [0, 4]
@@ -152,6 +201,36 @@ class MetaDataToolsTestCase(unittest.TestCase):
 
         self.assertTrue('Labels' in fdl.columns)
 
+    def test_field_tokenized_descriptor_df_from_df__when_split_fields__adds_tokenized_fields(self):
+        df = pd.DataFrame({'Fields': ['BEW_TY', 'PatientIdNo'], 'Description': ['Movement type', 'Patient number']})
+
+        fdl = MDT.field_tokenized_descriptor_df_from_df(df, 'test_name', split_fields=True)
+
+        self.assertEqual('Tokenized Fields', fdl.columns[fdl.columns.get_loc('Fields') + 1])
+        self.assertEqual(['movement,type', 'patient,identifier,number'], list(fdl['Tokenized Fields']))
+
+    def test_split_fields__abbreviations_and_compounds__reach_outputs(self):
+        df = pd.DataFrame({'Fields': ['BEWTY', 'WARD_CD'], 'Description': ['Movement type', 'Ward code']})
+        abbreviations = {'bew': 'movement', 'ty': 'type', 'cd': 'code', 'ward': 'hospital ward'}
+        src_dir = os.path.join(self.Temp, 'src')
+        Path(src_dir).mkdir()
+        df.to_csv(os.path.join(src_dir, 'sap.txt'), sep='\t', index=False)
+        expected = ['movement,type', 'hospital,ward,code']
+
+        token_lists, labels = MDT.field_token_lists_from_df(df, 'sap', split_fields=True,
+                                                            abbreviations=abbreviations, compounds=True)
+        with self.subTest(self):
+            print('Testing for: token lists')
+            self.assertEqual(['sap', 'bewty', 'movement', 'type', 'movement', 'type'], token_lists[0])
+        for isolated in [False, True]:
+            results, errors = MDT.field_descriptors_dfs_from_files(src_dir, os.path.join(self.Temp, 'out'),
+                                                                   split_fields=True, abbreviations=abbreviations,
+                                                                   compounds=True, isolated=isolated, workers=1)
+            with self.subTest(self):
+                print(f'Testing for: directory run, isolated={isolated}')
+                self.assertEqual([], errors)
+                self.assertEqual(expected, list(results[0][1]['Tokenized Fields']))
+
     def test_field_descriptors_df_from_file__when_valid_file(self):
         src_path = self.Test2ColFile
         target_dir = self.Temp
@@ -225,6 +304,43 @@ class MetaDataToolsTestCase(unittest.TestCase):
 
             self.assertEqual(expected, actual)
 
+    def test_field_descriptors_dfs_from_files__isolated(self):
+        results, errors = MDT.field_descriptors_dfs_from_files(self.ErrorCheckDir, self.Temp, 'dummy', to_save=True,
+                                                               isolated=True, timeout=60, workers=2)
+
+        sub_tests = [
+            ('same results as in process', 2, len(results)),
+            ('errors recorded with cause', 2, len([ex for file_path, ex in errors if isinstance(ex, Exception)])),
+            ('outputs saved only for results', 2, len(os.listdir(self.Temp))),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                self.assertEqual(expected, actual)
+
+    def test_field_descriptors_dfs_from_files__updates_metrics(self):
+        sub_tests = [['in process', False], ['isolated', True]]
+        for test_name, isolated in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                FileTools.ensure_empty_directory(self.Temp)
+                metrics = RunMetrics(os.path.join(self.Temp, 'metrics.prom'), job='test')
+                results, errors = MDT.field_descriptors_dfs_from_files(
+                    self.ErrorCheckDir, self.Temp, 'dummy', to_save=True, journal=RunJournal(self.Temp),
+                    isolated=isolated, workers=2, metrics=metrics)
+                resumed_metrics = RunMetrics(os.path.join(self.Temp, 'metrics.prom'), job='test')
+                MDT.field_descriptors_dfs_from_files(self.ErrorCheckDir, self.Temp, 'dummy', to_save=True,
+                                                     journal=RunJournal(self.Temp), isolated=isolated, workers=2,
+                                                     metrics=resumed_metrics)
+
+                self.assertEqual([2, 2, sum(len(df) for file_path, df in results)],
+                                 [metrics.counts['files_processed'], metrics.counts['files_failed'],
+                                  metrics.counts['rows']])
+                self.assertGreater(metrics.counts['bytes_read'], 0)
+                self.assertGreater(metrics.counts['bytes_written'], 0)
+                self.assertEqual([2, 2], [resumed_metrics.counts['cache_hits'],
+                                          resumed_metrics.counts['cache_misses']])
+
     def test_collate_dfs_from_list(self):
         dataframes, errors = MDT.list_of_field_descriptors_dfs_from_files(
             src_path=self.TestDataDir, target_dir=self.Temp, prefix='from_list', to_save=False)
@@ -235,6 +351,72 @@ class MetaDataToolsTestCase(unittest.TestCase):
 
         self.assertTrue(compare_column_names.all())
 
+    def test_collate_dfs_from_list__keeps_categories_across_sources(self):
+        df_list = [MDT.field_tokenized_descriptor_df_from_df(self.Test5ColIncLabelDataFrame, name, is_labelled=True)
+                   for name in ['source_a', 'source_b']]
+
+        df = MDT.collate_dfs_from_list(df_list=df_list)
+
+        with self.subTest(self):
+            print('Testing for: Source and Labels are category')
+            for column in ['Source', 'Labels']:
+                self.assertIsInstance(df[column].dtype, pd.CategoricalDtype)
+            self.assertEqual(['source_a', 'source_b'], sorted(df['Source'].cat.categories))
+
+        with self.subTest(self):
+            print('Testing for: other columns are strings')
+            self.assertIsInstance(df['Tokenized Descriptors'].dtype, pd.StringDtype)
+            self.assertEqual('h,fred,case,type', df['Tokenized Descriptors'][3])
+
+    def test_iter_field_tokens__by_source_type(self):
+        tsv_path = os.path.join(self.TestDataDir, 'test_tsv_5_cols_inc_labels.txt')
+        token_lists, labels = MDT.field_token_lists_from_df(self.Test5ColIncLabelDataFrame, 'test', is_labelled=True)
+        expected = [(token_list[1], token_list[2:], label) for token_list, label in zip(token_lists, labels)]
+
+        sub_tests = [
+            ('TSV file', tsv_path),
+            ('DataFrame', self.Test5ColIncLabelDataFrame),
+        ]
+        for test_name, source in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                actual = [(field, tokens, label) for _, field, tokens, label
+                          in MDT.iter_field_tokens(source, is_labelled=True, source_name='test')]
+                self.assertEqual(expected, actual)
+
+        with self.subTest(self):
+            print('Testing for: workbook, a source per sheet')
+            expected_sources = [name for name in pd.ExcelFile(self.ExcelXlsmFilePath).sheet_names
+                                if name != 'Status list']
+            rows = list(MDT.iter_field_tokens(self.ExcelXlsmFilePath, is_labelled=True, skip_sheets=('Status list',)))
+            self.assertEqual(expected_sources, list(dict.fromkeys(row[0] for row in rows)))
+            self.assertEqual(sum(len(df) for name, df in pd.read_excel(self.ExcelXlsmFilePath, sheet_name=None).items()
+                                 if name != 'Status list'), len(rows))
+
+        with self.subTest(self):
+            print('Testing for: lazy, columns checked when reached')
+            rows = MDT.iter_field_tokens(self.Test1ColDataFrame)
+            self.assertRaises(DataFrameException, next, rows)
+
+    def test_deduplicate_df(self):
+        df_list = [MDT.field_tokenized_descriptor_df_from_df(self.Test5ColIncLabelDataFrame, name, is_labelled=True)
+                   for name in ['source_a', 'source_b', 'source_a']]
+        df = MDT.collate_dfs_from_list(df_list=df_list)
+
+        deduplicated = MDT.deduplicate_df(df, with_counts=True, with_sources=True)
+
+        sub_tests = [
+            ('first occurrences kept', df.iloc[:len(df_list[0])]['Fields'].tolist(),
+             deduplicated['Fields'].tolist()),
+            ('counts', [3] * len(df_list[0]), deduplicated['Count'].tolist()),
+            ('distinct sources', ['source_a|source_b'] * len(df_list[0]), deduplicated['Sources'].tolist()),
+            ('no extra columns by default', list(df.columns), list(MDT.deduplicate_df(df).columns)),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                self.assertEqual(expected, actual)
+
     def test_save_df(self):
         dataframes, errors = MDT.list_of_field_descriptors_dfs_from_files(
             src_path=self.TestDataDir, target_dir=self.Temp, prefix='from_list', to_save=False)
@@ -244,6 +426,16 @@ class MetaDataToolsTestCase(unittest.TestCase):
         MDT.save_df(df=df, save_dir=self.Temp, save_name='all_data.txt', prefix='from_list_')
         self.assertTrue(Path(os.path.join(self.Temp, 'from_list_all_data.txt')).is_file())
 
+    def test_write_df__in_chunks__matches_single_write(self):
+        df = MDT.field_tokenized_descriptor_df_from_df(self.Test5ColIncLabelDataFrame, 'test_name', is_labelled=True)
+        save_path = os.path.join(self.Temp, 'chunked.txt')
+
+        MDT.write_df(df, save_path, chunk_size=1)
+
+        with open(save_path, 'r', encoding='utf-8', newline='') as infile:
+            actual = infile.read()
+        self.assertEqual(df.to_csv(sep='\t', index=False), actual)
+
     def test_prep_df_for_bert(self):
         df = MDT.field_tokenized_descriptor_df_from_df(
             self.TestTokenizedLabelledDataFrame, 'test_name', is_labelled=True, sep=' ')
@@ -262,6 +454,22 @@ class MetaDataToolsTestCase(unittest.TestCase):
             for column in df.columns:
                 self.assertFalse(df[column].str.contains(',').any())
 
+    def test_split_fields__in_bert_text_and_token_lists(self):
+        df = pd.DataFrame({'Fields': ['ADMIT_DT'], 'Some Description': ['Admission date'], 'Labels': ['Date']})
+
+        bert = MDT.prep_df_for_bert(MDT.field_tokenized_descriptor_df_from_df(df, 'test_name', is_labelled=True,
+                                                                              sep=' ', split_fields=True))
+        token_lists, labels = MDT.field_token_lists_from_df(df, 'test_name', is_labelled=True, split_fields=True)
+
+        sub_tests = [
+            ('bert text', 'test name admit_dt admit date admission date', bert['text'][0]),
+            ('token lists', ['test', 'name', 'admit_dt', 'admit', 'date', 'admission', 'date'], token_lists[0]),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                self.assertEqual(expected, actual)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import unittest
+from src.near_duplicates import NearDuplicateTools as NDT
+
+
+class NearDuplicateToolsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.CollatedDataFrame = pd.DataFrame({
+            'Source': ['hospital_a', 'hospital_a', 'hospital_b', 'hospital_b', 'hospital_b'],
+            'Fields': ['admit_dt', 'admit_dt_2', 'adm_date', 'sex', 'empty'],
+            'Tokenized Descriptors': ['patient,admission,date,time,ward',
+                                      'patient,admission,date,time,ward',
+                                      'patient,admission,date,time,ward,hospital',
+                                      'patient,sex',
+                                      '']
+        })
+
+    def test_minhash_signatures__estimates_jaccard(self):
+        token_lists = [['a', 'b', 'c', 'd'], ['a', 'b', 'c', 'e'], ['x', 'y', 'z', 'w']]
+
+        signatures = NDT.minhash_signatures(token_lists, num_perm=256)
+
+        with self.subTest(self):
+            print('Testing for: similar sets')
+            # True Jaccard is 3/5
+            self.assertAlmostEqual(0.6, (signatures[0] == signatures[1]).mean(), delta=0.15)
+
+        with self.subTest(self):
+            print('Testing for: disjoint sets')
+            self.assertLess((signatures[0] == signatures[2]).mean(), 0.1)
+
+    def test_minhash_signatures__reproducible(self):
+        token_lists = [['a', 'b'], ['c']]
+
+        self.assertTrue(np.array_equal(NDT.minhash_signatures(token_lists), NDT.minhash_signatures(token_lists)))
+
+    def test_find_near_duplicates__by_source_filter(self):
+        # admit_dt_2 is identical to admit_dt, so it is matched through its group rather than pair by pair
+        sub_tests = [['Cross source only', True, [('admit_dt', 'adm_date')]],
+                     ['All sources', False, [('admit_dt', 'adm_date'), ('admit_dt', 'admit_dt_2')]]]
+        for sub_test in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {sub_test[0]}')
+                result = NDT.find_near_duplicates(self.CollatedDataFrame, threshold=0.7,
+                                                  cross_source_only=sub_test[1])
+                actual = sorted(zip(result['Fields A'], result['Fields B']))
+                self.assertEqual(sorted(sub_test[2]), actual)
+
+    def test_find_near_duplicates__large_identical_group__bounded_output(self):
+        rows = 8000
+        df = pd.DataFrame({'Source': [f'source_{i % 4000}' for i in range(rows)] + ['other_a', 'other_b'],
+                           'Fields': [f'pat_id_{i}' for i in range(rows)] + ['pat_local', 'pat_local_2'],
+                           'Tokenized Descriptors': ['patient,identifier'] * rows +
+                                                    ['patient,identifier,local'] * 2})
+
+        result = NDT.find_near_duplicates(df, threshold=0.5, max_bucket_size=5)
+        identical = result[result['Estimated Jaccard'] == 1.0]
+
+        with self.subTest(self):
+            print('Testing for: one pair per row of the identical group')
+            self.assertEqual(rows - 1 + 1, len(identical))
+            self.assertEqual(set(range(rows + 2)), set(identical['Row A']) | set(identical['Row B']))
+
+        with self.subTest(self):
+            print('Testing for: near identical groups matched once')
+            self.assertEqual(len(identical) + 1, len(result))
+
+        with self.subTest(self):
+            print('Testing for: signatures below the empty row marker')
+            signatures = NDT.minhash_signatures([['patient', 'identifier']])
+            self.assertTrue((signatures < NDT.MAX_HASH).all())
+
+    def test_bands_and_rows__fits_signature(self):
+        bands, rows = NDT.bands_and_rows(0.8, 128)
+
+        self.assertLessEqual(bands * rows, 128)
+        self.assertAlmostEqual(0.8, (1.0 / bands) ** (1.0 / rows), delta=0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import threading
+import time
+import unittest
+from src.pipeline import StagedPipeline
+
+
+class StagedPipelineTestCase(unittest.TestCase):
+    def test_run__returns_outcomes_in_item_order(self):
+        written = []
+        # Later items read faster, so they reach the processor out of order
+        pipeline = StagedPipeline(read=lambda item: time.sleep(0.01 * (5 - item)) or item,
+                                  process=lambda item, data: data * 10,
+                                  write=lambda item, result: written.append(result),
+                                  readers=3, queue_size=2)
+
+        outcomes = pipeline.run(range(5))
+
+        self.assertEqual([[i, i * 10, None] for i in range(5)], outcomes)
+        self.assertEqual([0, 10, 20, 30, 40], sorted(written))
+
+    def test_run__by_exception_type(self):
+        def process(item, data):
+            if item == 2:
+                raise KeyError(item)
+            return data
+
+        with self.subTest(self):
+            print('Testing for: recoverable exception recorded')
+            pipeline = StagedPipeline(read=lambda item: item, process=process,
+                                      is_recoverable=lambda ex: isinstance(ex, KeyError))
+            outcomes = pipeline.run(range(4))
+            self.assertEqual([0, 1, 3], [item for item, result, ex in outcomes if ex is None])
+            self.assertIsInstance(outcomes[2][2], KeyError)
+
+        with self.subTest(self):
+            print('Testing for: other exception raised')
+            pipeline = StagedPipeline(read=lambda item: item, process=process)
+            self.assertRaises(KeyError, pipeline.run, range(4))
+
+    def test_run__writes_in_background_thread(self):
+        writer_threads = set()
+        pipeline = StagedPipeline(read=lambda item: item, process=lambda item, data: data,
+                                  write=lambda item, result: writer_threads.add(threading.get_ident()))
+
+        pipeline.run(range(3))
+
+        self.assertEqual(1, len(writer_threads))
+        self.assertNotIn(threading.get_ident(), writer_threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+from pathlib import Path
+import os
+import shutil
+import unittest
+import pandas as pd
+from src.custom_exceptions import RunJournalException
+from src.file_tools import FileTools
+from src.meta_data_tools import MetaDataTools as MDT
+from src.run_journal import RunJournal
+
+
+class RunJournalTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_run_journal')
+        self.SourceDir = os.path.join(self.Temp, 'source')
+        self.TargetDir = os.path.join(self.Temp, 'target')
+        self.ErrorCheckDir = os.path.join(self.Root, 'error_check')
+
+        FileTools.ensure_empty_directory(self.Temp)
+        shutil.copytree(self.ErrorCheckDir, self.SourceDir)
+        Path(self.TargetDir).mkdir()
+
+    def tearDown(self) -> None:
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def test_completed_output__by_file_state(self):
+        src_path = os.path.join(self.SourceDir, 'test_tsv_2_cols.txt')
+        output_path = os.path.join(self.TargetDir, 'output.txt')
+        with open(output_path, 'w') as outfile:
+            outfile.write('x')
+        RunJournal(self.TargetDir).record(src_path, output_path, 2)
+
+        with self.subTest(self):
+            print('Testing for: unchanged file completed, after reloading manifest')
+            self.assertEqual(os.path.abspath(output_path), RunJournal(self.TargetDir).completed_output(src_path))
+
+        with self.subTest(self):
+            print('Testing for: changed file not completed')
+            with open(src_path, 'a') as outfile:
+                outfile.write('NEW\tNew field\n')
+            self.assertEqual('', RunJournal(self.TargetDir).completed_output(src_path))
+
+    def test_load__ignores_partly_written_line(self):
+        journal = RunJournal(self.TargetDir)
+        with open(journal.path, 'w') as outfile:
+            outfile.write('{"source": "a"')
+
+        self.assertEqual({}, RunJournal(self.TargetDir).completed)
+
+    def test_list_of_field_descriptors_dfs_from_files__resumes_completed_files(self):
+        first_list, first_errors = MDT.list_of_field_descriptors_dfs_from_files(
+            self.SourceDir, self.TargetDir, 'first', to_save=True, journal=RunJournal(self.TargetDir))
+        # Interrupted run: only one file's output and manifest record survive
+        journal = RunJournal(self.TargetDir)
+        kept = os.path.join(self.SourceDir, 'test_tsv_2_cols.txt')
+        os.remove(journal.completed_output(os.path.join(self.SourceDir, 'test_tsv_5_cols_inc_labels.txt')))
+
+        second_list, second_errors = MDT.list_of_field_descriptors_dfs_from_files(
+            self.SourceDir, self.TargetDir, 'second', to_save=True, journal=journal)
+        saved = sorted(name for name in os.listdir(self.TargetDir) if name not in [RunJournal.MANIFEST_NAME, RunJournal.OPTIONS_NAME])
+
+        with self.subTest(self):
+            print('Testing for: only unfinished file processed again')
+            self.assertEqual(['first_ProcessedDF test_tsv_2_cols.txt',
+                              'second_ProcessedDF test_tsv_5_cols_inc_labels.txt'], saved)
+            self.assertTrue(journal.completed_output(kept).endswith('first_ProcessedDF test_tsv_2_cols.txt'))
+
+        with self.subTest(self):
+            print('Testing for: same results as uninterrupted run')
+            self.assertEqual(len(first_errors), len(second_errors))
+            self.assertTrue(MDT.collate_dfs_from_list(first_list).astype(str).equals(
+                MDT.collate_dfs_from_list(second_list).astype(str)))
+
+    def test_check_options__refuses_to_resume_with_other_options(self):
+        RunJournal(self.TargetDir, options={'engine': 'auto', 'split_fields': False})
+
+        with self.subTest(self):
+            print('Testing for: same options resume')
+            RunJournal(self.TargetDir, options={'engine': 'auto', 'split_fields': False})
+
+        with self.subTest(self):
+            print('Testing for: other options refused')
+            with self.assertRaises(RunJournalException):
+                RunJournal(self.TargetDir, options={'engine': 'auto', 'split_fields': True})
+
+    def test_read_field_descriptors_output__keeps_values_as_saved(self):
+        df = pd.DataFrame({'Source': ['codes', 'codes'], 'Fields': ['007', 'NA'], 'Tokenized Descriptors': ['1.50', '']})
+        save_path = os.path.join(self.TargetDir, 'output.txt')
+        MDT.write_df(df, save_path)
+
+        read_df = MDT.read_field_descriptors_output(save_path)
+
+        self.assertEqual(['007', 'NA'], list(read_df['Fields']))
+        self.assertEqual('1.50', read_df['Tokenized Descriptors'][0])
+        self.assertTrue(pd.isna(read_df['Tokenized Descriptors'][1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import os
+from pathlib import Path
+import time
+import unittest
+from src.file_tools import FileTools
+from src.run_metrics import RunMetrics
+
+
+class RunMetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_run_metrics')
+        self.MetricsFile = os.path.join(self.Temp, 'metrics', 'run.prom')
+
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def tearDown(self) -> None:
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def test_run_metrics__writes_text_file_and_summary(self):
+        src_path = os.path.join(self.Temp, 'source.txt')
+        with open(src_path, 'w') as outfile:
+            outfile.write('x' * 100)
+
+        with RunMetrics(self.MetricsFile, job='test', labels={'shard': '0/2'}) as metrics:
+            metrics.record_file(src_path, rows=10, save_path=src_path)
+            metrics.increment('cache_hits', 3)
+            metrics.increment('cache_misses')
+        with open(self.MetricsFile, 'r', encoding='utf-8') as infile:
+            lines = infile.read().splitlines()
+        with open(os.path.join(self.Temp, 'metrics', 'run.json'), 'r', encoding='utf-8') as infile:
+            summary = json.load(infile)
+
+        sub_tests = [
+            ('counter exported with labels', True,
+             'tokenize_files_processed_total{job="test",shard="0/2"} 1' in lines),
+            ('counter typed', True, '# TYPE tokenize_rows_total counter' in lines),
+            ('bytes counted', [100, 100], [summary['bytes_read'], summary['bytes_written']]),
+            ('cache hit ratio', 0.75, summary['cache_hit_ratio']),
+            ('memory sampled', True, summary['memory_rss_bytes'] > 0),
+            ('no temporary file left', ['run.json', 'run.prom'], sorted(os.listdir(Path(self.MetricsFile).parent))),
+        ]
+        for test_name, expected, actual in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                self.assertEqual(expected, actual)
+
+    def test_run_metrics__written_periodically(self):
+        metrics = RunMetrics(self.MetricsFile, job='test', interval=0.05).start()
+        metrics.increment('rows', 5)
+        time.sleep(0.5)
+        with open(self.MetricsFile, 'r', encoding='utf-8') as infile:
+            text = infile.read()
+        metrics.stop()
+
+        self.assertIn('tokenize_rows_total{job="test"} 5', text)
+
+    def test_counting_failures__counts_and_raises(self):
+        metrics = RunMetrics(self.MetricsFile, job='test')
+
+        def fail():
+            raise ValueError('Malformed')
+
+        self.assertRaises(ValueError, metrics.counting_failures(fail))
+        self.assertEqual(1, metrics.counts['files_failed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
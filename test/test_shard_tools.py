@@ -0,0 +1,107 @@
+from pathlib import Path
+import os
+import unittest
+from src.file_discovery import FileDiscovery
+from src.file_tools import FileTools
+from src.shard_tools import ShardTools
+
+
+class ShardToolsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_shard_tools')
+        self.TestDataDir = os.path.join(self.Root, 'test_data')
+
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def tearDown(self) -> None:
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def save_shard(self, index: int, count: int, lines: list):
+        shard_dir = ShardTools.shard_dir(self.Temp, index, count)
+        Path(shard_dir).mkdir()
+        if lines:
+            with open(os.path.join(shard_dir, '220101_000000collated.txt'), 'w', encoding='utf-8', newline='') \
+                    as outfile:
+                outfile.write(''.join(lines))
+        ShardTools.save_shard_timing(shard_dir, index, count, seconds=1.0, files=1, errors=0,
+                                     rows=max(len(lines) - 1, 0),
+                                     collated_name='220101_000000collated.txt' if lines else '')
+
+    def test_parse_shard_spec__by_spec(self):
+        sub_tests = [['Valid', '1/4', (1, 4)], ['Index too high', '4/4', ValueError],
+                     ['Not a number', 'a/4', ValueError], ['Missing count', '1', ValueError]]
+        for sub_test in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {sub_test[0]}')
+                if sub_test[2] is ValueError:
+                    self.assertRaises(ValueError, ShardTools.parse_shard_spec, sub_test[1])
+                else:
+                    self.assertEqual(sub_test[2], ShardTools.parse_shard_spec(sub_test[1]))
+
+    def test_iter_shard_paths__shards_partition_files(self):
+        all_paths = sorted(FileDiscovery.iter_file_paths(self.TestDataDir, '.txt'))
+
+        shard_paths = [list(ShardTools.iter_shard_paths(self.TestDataDir, index, 3)) for index in range(3)]
+
+        self.assertEqual(all_paths, sorted(path for paths in shard_paths for path in paths))
+        self.assertEqual(shard_paths, [list(ShardTools.iter_shard_paths(self.TestDataDir, index, 3))
+                                       for index in range(3)])
+
+    def test_merge_shard_outputs__writes_header_once(self):
+        self.save_shard(0, 3, ['Source\tFields\n', 'a\tx\n'])
+        self.save_shard(1, 3, [])
+        self.save_shard(2, 3, ['Source\tFields\n', 'b\ty\n', 'b\tz\n'])
+
+        save_path = ShardTools.merge_shard_outputs(self.Temp, 'collated.txt', prefix='merged_')
+
+        with open(save_path, 'r', encoding='utf-8') as infile:
+            self.assertEqual('Source\tFields\na\tx\nb\ty\nb\tz\n', infile.read())
+
+    def test_merge_shard_outputs__deduplicate(self):
+        header = 'Source\tFields\tTokenized Descriptors\tLabels\n'
+        self.save_shard(0, 2, [header, 'a\tid\tidentifier\tkey\n', 'a\tdob\tdate,birth\tdate\n'])
+        self.save_shard(1, 2, [header, 'b\tid\tidentifier\tkey\n', 'b\tid\tidentifier\tperson\n'])
+
+        sub_tests = [
+            ('without counts', {},
+             header + 'a\tid\tidentifier\tkey\na\tdob\tdate,birth\tdate\nb\tid\tidentifier\tperson\n'),
+            ('with counts and sources', {'with_counts': True, 'with_sources': True},
+             header.replace('\n', '\tCount\tSources\n') + 'a\tid\tidentifier\tkey\t2\ta|b\n'
+             'a\tdob\tdate,birth\tdate\t1\ta\nb\tid\tidentifier\tperson\t1\tb\n'),
+        ]
+        for test_name, kwargs, expected in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {test_name}')
+                save_path = ShardTools.merge_shard_outputs(self.Temp, 'collated.txt', deduplicate=True, **kwargs)
+                with open(save_path, 'r', encoding='utf-8', newline='') as infile:
+                    self.assertEqual(expected.replace('\n', os.linesep), infile.read())
+
+    def test_merge_shard_outputs__stale_shards_of_other_count(self):
+        self.save_shard(0, 2, ['Source\tFields\n', 'a\tx\n'])
+        self.save_shard(1, 2, ['Source\tFields\n', 'b\ty\n'])
+        self.save_shard(0, 3, ['Source\tFields\n', 'stale\tz\n'])
+        # Per-file output of a source named '... collated.txt', not a collated file
+        with open(os.path.join(ShardTools.shard_dir(self.Temp, 1, 2), '220101_000000_ProcessedDF x collated.txt'),
+                  'w', encoding='utf-8') as outfile:
+            outfile.write('Source\tFields\nx collated\tw\n')
+
+        with self.subTest(self):
+            print('Testing for: shard count not given')
+            self.assertRaises(ValueError, ShardTools.merge_shard_outputs, self.Temp, 'collated.txt')
+
+        with self.subTest(self):
+            print('Testing for: shards of given count only')
+            save_path = ShardTools.merge_shard_outputs(self.Temp, 'collated.txt', prefix='merged_', count=2)
+            with open(save_path, 'r', encoding='utf-8') as infile:
+                self.assertEqual('Source\tFields\na\tx\nb\ty\n', infile.read())
+
+    def test_merge_shard_outputs__incomplete_shards__raises_exception(self):
+        self.save_shard(0, 2, ['Source\tFields\n', 'a\tx\n'])
+
+        self.assertRaises(ValueError, ShardTools.merge_shard_outputs, self.Temp, 'collated.txt')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+from pathlib import Path
+import numpy as np
+import os
+from scipy import sparse
+import unittest
+from src.file_tools import FileTools
+from src.meta_data_tools import MetaDataTools as MDT
+from src.sparse_features import SparseFeatures
+
+
+class SparseFeaturesTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_sparse_features')
+        self.TestDataDir = os.path.join(self.Root, 'test_data')
+        self.TokenLists = [['patient', 'admission', 'date', 'date'], ['patient', 'sex'], []]
+
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def tearDown(self) -> None:
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def test_build_term_matrix__counts(self):
+        matrix, vocabulary = SparseFeatures.build_term_matrix(self.TokenLists)
+
+        self.assertEqual(['admission', 'date', 'patient', 'sex'], vocabulary)
+        self.assertEqual([[1, 2, 1, 0], [0, 0, 1, 1], [0, 0, 0, 0]], matrix.toarray().tolist())
+
+    def test_build_term_matrix__ngrams(self):
+        matrix, vocabulary = SparseFeatures.build_term_matrix(self.TokenLists, ngram_range=(1, 2))
+
+        self.assertIn('admission date', vocabulary)
+        self.assertEqual(1, matrix[0, vocabulary.index('admission date')])
+
+    def test_build_term_matrix__tfidf_rows_normalised(self):
+        matrix, vocabulary = SparseFeatures.build_term_matrix(self.TokenLists, weighting='tfidf')
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        self.assertTrue(np.allclose([1, 1, 0], norms))
+        # Common term weighted below rare term within the same row
+        self.assertLess(matrix[1, vocabulary.index('patient')], matrix[1, vocabulary.index('sex')])
+
+    def test_save_npz__round_trips_and_scipy_readable(self):
+        df = MDT.read_raw_data(os.path.join(self.TestDataDir, 'test_tsv_5_cols_inc_labels.txt'))
+        token_lists, labels = MDT.field_token_lists_from_df(df, 'Test Source', is_labelled=True)
+        matrix, vocabulary = SparseFeatures.build_term_matrix(token_lists)
+        save_path = os.path.join(self.Temp, 'labelled.npz')
+
+        SparseFeatures.save_npz(save_path, matrix, vocabulary, labels)
+        loaded, loaded_vocabulary, loaded_labels = SparseFeatures.load_npz(save_path)
+
+        self.assertEqual(['key', 'object'], loaded_labels)
+        self.assertEqual(vocabulary, loaded_vocabulary)
+        self.assertEqual(0, (loaded != matrix).nnz)
+        self.assertEqual(matrix.shape, sparse.load_npz(save_path).shape)
+
+
+if __name__ == '__main__':
+    unittest.main()
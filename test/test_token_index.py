@@ -0,0 +1,81 @@
+from pathlib import Path
+import os
+import pandas as pd
+import unittest
+from src.file_tools import FileTools
+from src.meta_data_tools import MetaDataTools as MDT
+from src.token_index import PackedStrings, TokenIndex
+
+
+class TokenIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_token_index')
+        self.TestDataDir = os.path.join(self.Root, 'test_data')
+        patient_df = pd.DataFrame({'Fields': ['PATNR', 'GSCHL'], 'Description': ['Patient ID Number', 'Genere (Sex)']})
+        df_list = [MDT.field_tokenized_descriptor_df_from_df(
+                       MDT.read_raw_data(os.path.join(self.TestDataDir, 'test_tsv_2_cols.txt')), 'test_tsv_2_cols'),
+                   MDT.field_tokenized_descriptor_df_from_df(patient_df, 'Pacient DM')]
+        self.Index = TokenIndex.build(MDT.collate_dfs_from_list(df_list))
+
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def tearDown(self) -> None:
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def test_search__by_mode(self):
+        sub_tests = [['And', 'Case type', 'and', ['falar']],
+                     ['And, no match', 'Case number', 'and', []],
+                     ['Or', 'Case number', 'or', ['falar', 'patnr']],
+                     ['Stop words and punctuation ignored', 'the case-type', 'and', ['falar']]]
+        for sub_test in sub_tests:
+            with self.subTest(self):
+                print(f'Testing for: {sub_test[0]}')
+                result = self.Index.search(sub_test[1], mode=sub_test[2])
+                self.assertEqual(sub_test[3], sorted(result['Fields']))
+
+    def test_search__stemmed_matches_word_forms(self):
+        with self.subTest(self):
+            print('Testing for: stemmed')
+            result = self.Index.search('institutions')
+            self.assertEqual(['einri'], list(result['Fields']))
+
+        with self.subTest(self):
+            print('Testing for: not stemmed')
+            result = self.Index.search('institutions', stemmed=False)
+            self.assertEqual(0, len(result))
+
+    def test_search__or__ranks_rows_matching_more_terms_higher(self):
+        result = self.Index.search('patient number', mode='or')
+
+        self.assertEqual('patnr', result['Fields'][0])
+        self.assertEqual('Pacient DM', result['Source'][0])
+
+    def test_save_and_load__round_trips(self):
+        save_path = os.path.join(self.Temp, 'index.npz')
+        self.Index.save(save_path)
+
+        loaded = TokenIndex.load(save_path)
+
+        self.assertEqual(self.Index.row_count, loaded.row_count)
+        self.assertEqual(list(self.Index.fields.take(range(self.Index.row_count))),
+                         list(loaded.fields.take(range(loaded.row_count))))
+        self.assertTrue(self.Index.search('case type').equals(loaded.search('case type')))
+
+    def test_packed_strings__round_trips_and_finds(self):
+        strings = ['', 'adm_dt', 'fecha_émission', 'patnr']
+        packed = PackedStrings.from_strings(strings)
+
+        with self.subTest(self):
+            print('Testing for: strings round trip, with no padding')
+            self.assertEqual(strings, list(packed.take(range(len(packed)))))
+            self.assertEqual(sum(len(string.encode('utf-8')) for string in strings), len(packed.blob))
+
+        with self.subTest(self):
+            print('Testing for: sorted lookup')
+            self.assertEqual([2, -1], [packed.find_sorted('fecha_émission'), packed.find_sorted('fecha')])
+
+
+if __name__ == '__main__':
+    unittest.main()
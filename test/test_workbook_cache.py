@@ -0,0 +1,66 @@
+from pathlib import Path
+import os
+import unittest
+import pandas as pd
+import shutil
+from src.file_tools import FileTools
+from src.workbook_cache import WorkbookCache
+
+
+class WorkbookCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        """Fixtures used by test."""
+        self.Root = Path(__file__).parent
+        self.Temp = os.path.join(self.Root, 'temp_workbook_cache')
+        self.XlsmFilePath = os.path.join(self.Root, 'test_data', 'test_xlsm.xlsm')
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def tearDown(self):
+        FileTools.ensure_empty_directory(self.Temp)
+
+    def test_read_workbook__served_from_cache(self):
+        cache = WorkbookCache(self.Temp)
+        expected = pd.read_excel(self.XlsmFilePath, sheet_name=None)
+
+        with self.subTest(self):
+            print('Testing for: not cached before first read')
+            self.assertIsNone(cache.cached_sheets(self.XlsmFilePath))
+
+        cache.read_workbook(self.XlsmFilePath)
+        cached = cache.cached_sheets(self.XlsmFilePath)
+
+        with self.subTest(self):
+            print('Testing for: cached sheets equal parsed sheets')
+            self.assertEqual(list(expected), list(cached))
+            for name, df in expected.items():
+                pd.testing.assert_frame_equal(df, cached[name])
+
+    def test_cached_sheets__invalidated_by_change(self):
+        workbook_path = os.path.join(self.Temp, 'workbook.xlsm')
+        shutil.copy(self.XlsmFilePath, workbook_path)
+        cache = WorkbookCache(os.path.join(self.Temp, 'cache'))
+        cache.read_workbook(workbook_path)
+        stat = os.stat(workbook_path)
+
+        os.utime(workbook_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        with self.subTest(self):
+            print('Testing for: changed modification time invalidates')
+            self.assertIsNone(cache.cached_sheets(workbook_path))
+
+        with self.subTest(self):
+            print('Testing for: content hash survives touch')
+            hash_cache = WorkbookCache(os.path.join(self.Temp, 'hash_cache'), use_hash=True)
+            hash_cache.read_workbook(workbook_path)
+            os.utime(workbook_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 9))
+            self.assertIsNotNone(hash_cache.cached_sheets(workbook_path))
+
+        with self.subTest(self):
+            print('Testing for: content hash served to copy')
+            copy_path = os.path.join(self.Temp, 'copy.xlsm')
+            shutil.copy(workbook_path, copy_path)
+            self.assertIsNotNone(hash_cache.cached_sheets(copy_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
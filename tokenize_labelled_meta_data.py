@@ -2,10 +2,15 @@
 import argparse
 import datetime
 
+from src.excel_tools import ExcelTools
 from src.file_tools import FileTools
+from src.identifier_tools import IdentifierTools
+from src.memory_profiler import MemoryProfiler
 from src.meta_data_tools import MetaDataTools
+from src.run_metrics import RunMetrics
+from src.sparse_features import SparseFeatures
+from src.workbook_cache import WorkbookCache
 import os
-import pandas as pd
 from pathlib import Path
 
 TEST_FILEPATH = os.path.join(Path(__file__).parent, 'test', 'test_data', 'test_xls.xlsx')
@@ -16,6 +21,10 @@ Description: Extract fields, tokenized descriptors and labels from data dictiona
 Example usage:
 py tokenize_labelled_meta_data.py -s "C:/temp/TableMetaData/Source/FCRB_Data Model_v0.5 CFF 1g.xlsm" -td C:/temp/TableMetaData/Results 
 py tokenize_labelled_meta_data.py -s "C:/temp/TableMetaData/Source/FCRB_Data Model_v0.5 CFF 1g.xlsm" -td C:/temp/TableMetaData/Results -ot bert
+py tokenize_labelled_meta_data.py -s "C:/temp/TableMetaData/Source/FCRB_Data Model_v0.5 CFF 1g.xlsm" -td C:/temp/TableMetaData/Results -ot sparse -wt tfidf -ng 2
+py tokenize_labelled_meta_data.py -s "C:/temp/TableMetaData/Source/FCRB_Data Model_v0.5 CFF 1g.xlsm" -td C:/temp/TableMetaData/Results -cd C:/temp/TableMetaData/Cache
+py tokenize_labelled_meta_data.py -s "C:/temp/TableMetaData/Source/FCRB_Data Model_v0.5 CFF 1g.xlsm" -td C:/temp/TableMetaData/Results -mf C:/temp/Metrics/labelled.prom
+py tokenize_labelled_meta_data.py -s "C:/temp/TableMetaData/Source/FCRB_Data Model_v0.5 CFF 1g.xlsm" -td C:/temp/TableMetaData/Results --profile-memory
 """
 
 
@@ -26,19 +35,52 @@ def parse_args():
     parser.add_argument('-td', '--target_dir', type=str, default=Path(__file__).parent,
                         help='Working directory for saving files etc')
     parser.add_argument('-ot', '--output_type', type=str, default='tokenized',
-                        help='Output type (tokenized, bert')
+                        help='Output type (tokenized, bert, sparse)')
+    parser.add_argument('-wt', '--weighting', type=str, default='count', choices=SparseFeatures.WEIGHTINGS,
+                        help='Term weighting for sparse output type (count, tfidf)')
+    parser.add_argument('-ng', '--ngram_max', type=int, default=1,
+                        help='Maximum n-gram size for sparse output type')
+    parser.add_argument('-sf', '--split_fields', action='store_true',
+                        help='Add Tokenized Fields, field names split into words with abbreviations expanded')
+    parser.add_argument('-af', '--abbreviations_file', type=str, default='',
+                        help='File of abbreviation and expansion per line, tab separated, for -sf; added to and '
+                             'overriding the built in SAP/clinical abbreviations')
+    parser.add_argument('-sc', '--split_compounds', action='store_true',
+                        help='With -sf, also split words covered by a sequence of abbreviations, e.g. BEWTY as '
+                             'movement type')
+    parser.add_argument('-cd', '--cache_dir', type=str, default='',
+                        help='Directory to cache worksheets of the workbook in as columnar files, so later runs '
+                             'skip parsing it')
+    parser.add_argument('-ch', '--cache_hash', action='store_true',
+                        help='Key the cache by workbook content hash rather than path, size and modification time')
+    parser.add_argument('-dd', '--deduplicate', action='store_true',
+                        help='Drop rows of the collated output duplicating an earlier row in Fields, '
+                             'Tokenized Descriptors and Labels')
+    parser.add_argument('-dc', '--dedup_counts', action='store_true',
+                        help='With -dd, add columns Count and Sources, the occurrences and sources of each row')
+    parser.add_argument('-mf', '--metrics_file', type=str, default='',
+                        help='Prometheus text file to write run metrics to periodically, e.g. in the directory of '
+                             'the node-exporter textfile collector; a JSON summary is saved next to it at the end')
+    parser.add_argument('-mi', '--metrics_interval', type=float, default=15.0,
+                        help='Seconds between writes of the metrics file')
+    parser.add_argument('-pm', '--profile_memory', '--profile-memory', action='store_true',
+                        help='Profile memory: report the peak memory of each stage (read_excel, cleanse, concat, '
+                             'to_csv) and the sheet it peaked on, and the top allocation sites; saved as '
+                             '<yymmdd_HHMMSS>memory_profile.json in target_dir, prefixed by the run\'s timestamp as '
+                             'the labelled output is. Stages run one at a time, so the run is slower')
 
     args = parser.parse_args()
 
     return args
 
 
-def main():
-    args = parse_args()
+def tokenize(args, metrics: RunMetrics = None):
     # Declare args - helps with auto-completion. Convert to object?
     src_path = args.src_path
     target_dir = args.target_dir
     output_type = args.output_type
+    abbreviations = {**IdentifierTools.DEFAULT_ABBREVIATIONS,
+                     **IdentifierTools.load_abbreviations(args.abbreviations_file)} if args.abbreviations_file else None
 
     prefix = datetime.datetime.now().strftime('%y%m%d_%H%M%S')
     command_filename = f'{prefix} Command args.txt'
@@ -47,12 +89,42 @@ def main():
                                         to_print=True
                                         )
 
+    profiler = MemoryProfiler().start() if args.profile_memory else None
     # read file
-    wb = pd.ExcelFile(src_path)
-
-    df_dict = pd.read_excel(wb, sheet_name=None)
+    if args.cache_dir:
+        cache = WorkbookCache(args.cache_dir, args.cache_hash)
+        df_dict = cache.read_workbook(src_path)
+    else:
+        cache = None
+        df_dict = ExcelTools.dataframes_dictionary_from_excel_file(src_path)
+    # Without a cache there are no lookups, so no hits or misses to count
+    if metrics is not None and cache is not None:
+        metrics.increment('cache_hits', cache.hits)
+        metrics.increment('cache_misses', cache.misses)
     df_dict.pop('Status list', None)
 
+    if output_type == 'sparse':
+        # Build the term matrix straight from token lists, no joined token strings
+        token_lists = []
+        labels = []
+        for k, v in df_dict.items():
+            sheet_token_lists, sheet_labels = MetaDataTools.field_token_lists_from_df(
+                df=v, source=k, is_labelled=True, split_fields=args.split_fields, abbreviations=abbreviations,
+                compounds=args.split_compounds)
+            token_lists.extend(sheet_token_lists)
+            labels.extend(sheet_labels)
+
+        matrix, vocabulary = SparseFeatures.build_term_matrix(token_lists, weighting=args.weighting,
+                                                              ngram_range=(1, args.ngram_max))
+        save_path = os.path.join(target_dir, f'{prefix}labelled.npz')
+        SparseFeatures.save_npz(save_path, matrix, vocabulary, labels)
+        if metrics is not None:
+            metrics.record_file(src_path, matrix.shape[0], save_path)
+        print(f'Sparse {matrix.shape[0]} x {matrix.shape[1]} term matrix saved to {save_path}.')
+        if profiler is not None:
+            profiler.finish(os.path.join(target_dir, f'{prefix}memory_profile.json'))
+        return
+
     # Word separator for tokenized text - default
     token_sep = ','
     column_save_sep = '\t'
@@ -60,17 +132,37 @@ def main():
         token_sep = ' '
         column_save_sep = ','
 
-    df_list = [MetaDataTools.field_tokenized_descriptor_df_from_df(df=v, source=k, is_labelled=True, sep=token_sep)
+    df_list = [MetaDataTools.field_tokenized_descriptor_df_from_df(df=v, source=k, is_labelled=True, sep=token_sep,
+                                                                   split_fields=args.split_fields,
+                                                                   abbreviations=abbreviations,
+                                                                   compounds=args.split_compounds)
                for k, v in df_dict.items()
                if k != 'Status list']
     save_name = f'labelled.txt'
 
     # If default output_type (i.e. 'tokenized') then leave as is.
     df = MetaDataTools.collate_dfs_from_list(df_list=df_list)
+    if args.deduplicate:
+        df = MetaDataTools.deduplicate_df(df, with_counts=args.dedup_counts, with_sources=args.dedup_counts)
     if output_type == 'bert':
         df = MetaDataTools.prep_df_for_bert(df)
 
     MetaDataTools.save_df(df=df, save_name=save_name, save_dir=target_dir, prefix=prefix, sep=column_save_sep)
+    save_path = os.path.join(target_dir, f'{prefix}{save_name}')
+    if metrics is not None:
+        metrics.record_file(src_path, len(df), save_path if Path(save_path).is_file() else '')
+    if profiler is not None:
+        profiler.finish(os.path.join(target_dir, f'{prefix}memory_profile.json'))
+
+
+def main():
+    args = parse_args()
+    if not args.metrics_file:
+        tokenize(args)
+        return
+
+    with RunMetrics(args.metrics_file, job='tokenize_labelled_meta_data', interval=args.metrics_interval) as metrics:
+        tokenize(args, metrics)
 
 
 if __name__ == '__main__':
@@ -3,9 +3,16 @@ import argparse
 import datetime
 
 from src.file_tools import FileTools
+from src.identifier_tools import IdentifierTools
+from src.memory_profiler import MemoryProfiler
 from src.meta_data_tools import MetaDataTools
+from src.run_journal import RunJournal
+from src.run_metrics import RunMetrics
+from src.shard_tools import ShardTools
 import os
 from pathlib import Path
+import sys
+import time
 
 TEST_FILEPATH = os.path.join(Path(__file__).parent, 'test', 'test_data', 'test_tsv_5_cols_inc_labels.txt')
 
@@ -15,6 +22,12 @@ Description: Read in a data dictionary file and output a tokenized version.
 Example usage:
 py tokenize_meta_data.py -s "C:/temp/TableMetaData/Source/SAP IS-H Case Attribute.txt" -td C:/temp/TableMetaData/Results 
 py tokenize_meta_data.py -s "C:/temp/TableMetaData/Source" -d -td C:/temp/TableMetaData/Results 
+py tokenize_meta_data.py -s "C:/temp/TableMetaData/Source" -d -td C:/temp/TableMetaData/Results -r
+py tokenize_meta_data.py -s "C:/temp/TableMetaData/Source" -d -td C:/temp/TableMetaData/Results -y --shard 0/4
+py tokenize_meta_data.py -s "C:/temp/TableMetaData/Source" -d -td C:/temp/TableMetaData/Results --local_shards 4
+py tokenize_meta_data.py -s "C:/temp/TableMetaData/Source" -d -td C:/temp/TableMetaData/Results -to 60 -ml 2048
+py tokenize_meta_data.py -s "C:/temp/TableMetaData/Source" -d -td C:/temp/TableMetaData/Results -mf C:/temp/Metrics/tokenize.prom
+py tokenize_meta_data.py -s "C:/temp/TableMetaData/Source" -d -td C:/temp/TableMetaData/Results --profile-memory
 """
 
 
@@ -28,52 +41,199 @@ def parse_args():
                         help='Working directory for saving files etc')
     parser.add_argument('-ext', '--suffix', type=str, default='.txt',
                         help='Suffix/extension for saving files')
+    parser.add_argument('-en', '--engine', type=str, default='auto', choices=['auto', 'pyarrow', 'default'],
+                        help='Parsing engine for source files (auto, pyarrow, default)')
+    parser.add_argument('-sf', '--split_fields', action='store_true',
+                        help='Add Tokenized Fields, field names split into words with abbreviations expanded')
+    parser.add_argument('-af', '--abbreviations_file', type=str, default='',
+                        help='File of abbreviation and expansion per line, tab separated, for -sf; added to and '
+                             'overriding the built in SAP/clinical abbreviations')
+    parser.add_argument('-sc', '--split_compounds', action='store_true',
+                        help='With -sf, also split words covered by a sequence of abbreviations, e.g. BEWTY as '
+                             'movement type')
+    parser.add_argument('-r', '--resume', action='store_true',
+                        help='Resume a directory run from the manifest in target_dir, skipping completed files; '
+                             'target_dir is not cleared')
+    parser.add_argument('-y', '--yes', action='store_true',
+                        help='Do not prompt before clearing target_dir, for non-interactive runs')
+    parser.add_argument('--shard', type=str, default='',
+                        help='Process only shard i/N (0-based) of the files in a directory run, saving outputs and '
+                             'timing to a shard directory in target_dir; merge with merge_shards.py')
+    parser.add_argument('--local_shards', type=int, default=0,
+                        help='Run a directory run as this many local shard processes, then merge their outputs')
+    parser.add_argument('-to', '--timeout', type=float, default=None,
+                        help='Seconds allowed per file in a directory run; each file is processed in an isolated '
+                             'worker process and a file that overruns is recorded as an error')
+    parser.add_argument('-ml', '--memory_limit', type=int, default=None,
+                        help='Memory in MB allowed per isolated worker process in a directory run (POSIX only)')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Number of isolated worker processes in a directory run (default: number of CPUs)')
+    parser.add_argument('-dd', '--deduplicate', action='store_true',
+                        help='Drop rows of the collated output duplicating an earlier row in Fields, '
+                             'Tokenized Descriptors and Labels')
+    parser.add_argument('-dc', '--dedup_counts', action='store_true',
+                        help='With -dd, add columns Count and Sources, the occurrences and sources of each row')
+    parser.add_argument('-mf', '--metrics_file', type=str, default='',
+                        help='Prometheus text file to write run metrics to periodically, e.g. in the directory of '
+                             'the node-exporter textfile collector; a JSON summary is saved next to it at the end')
+    parser.add_argument('-mi', '--metrics_interval', type=float, default=15.0,
+                        help='Seconds between writes of the metrics file')
+    parser.add_argument('-pm', '--profile_memory', '--profile-memory', action='store_true',
+                        help='Profile memory: report the peak memory of each stage (read, cleanse, concat, to_csv) '
+                             'and the file or sheet it peaked on, and the top allocation sites; saved as '
+                             '<yymmdd_HHMMSS>memory_profile.json in target_dir, prefixed by the run\'s timestamp as '
+                             'the collated output is. Stages run one at a time, so the run is slower')
 
     args = parser.parse_args()
 
     return args
 
 
-def main():
-    args = parse_args()
+def local_shard_commands(args, count: int) -> list:
+    """Build the command line of each shard process of a local sharded run."""
+    command = [sys.executable, os.path.abspath(__file__), '-s', args.src_path, '-d', '-td', str(args.target_dir),
+               '-ext', args.suffix, '-en', args.engine, '-y']
+    if args.split_fields:
+        command.append('-sf')
+    if args.abbreviations_file:
+        command.extend(['-af', args.abbreviations_file])
+    if args.split_compounds:
+        command.append('-sc')
+    if args.resume:
+        command.append('-r')
+    if args.profile_memory:
+        command.append('-pm')
+    for flag, value in [('-to', args.timeout), ('-ml', args.memory_limit), ('-w', args.workers)]:
+        if value is not None:
+            command.extend([flag, str(value)])
+
+    commands = []
+    for index in range(count):
+        shard_command = command + ['--shard', f'{index}/{count}']
+        # One metrics file per shard, each labelled with its shard
+        if args.metrics_file:
+            metrics_path = Path(args.metrics_file)
+            shard_metrics_path = metrics_path.with_name(f'{metrics_path.stem}_shard{index}{metrics_path.suffix}')
+            shard_command += ['-mf', str(shard_metrics_path), '-mi', str(args.metrics_interval)]
+        commands.append(shard_command)
+
+    return commands
+
+
+def tokenize(args, metrics: RunMetrics = None):
     # Declare args - helps with auto-completion. Convert to object?
     src_path = args.src_path
     target_dir = args.target_dir
     is_directory = args.is_directory
     suffix = args.suffix
-
-    if input(f'WARNING Will clear directory {target_dir} if it exists.\n'
-             f'Continue (n and Enter, or just Enter to continue)?').lower() == 'n':
-        print('Chosen to quit.')
+    engine = args.engine
+    split_fields = args.split_fields
+    abbreviations = {**IdentifierTools.DEFAULT_ABBREVIATIONS,
+                     **IdentifierTools.load_abbreviations(args.abbreviations_file)} if args.abbreviations_file else None
+    compounds = args.split_compounds
+    shard = ShardTools.parse_shard_spec(args.shard) if args.shard else None
+
+    if (shard or args.local_shards) and not is_directory:
+        print('Sharding applies to directory runs only, use -d.')
         quit()
 
-    FileTools.ensure_empty_directory(target_dir)
+    if args.local_shards:
+        return_codes = ShardTools.run_local_shards(local_shard_commands(args, args.local_shards))
+        if any(return_codes):
+            print(f'Shard processes failed, return codes: {return_codes}')
+            quit()
+        prefix = datetime.datetime.now().strftime('%y%m%d_%H%M%S')
+        ShardTools.merge_shard_outputs(target_dir, save_name=f'collated{suffix}', prefix=prefix,
+                                       deduplicate=args.deduplicate, with_counts=args.dedup_counts,
+                                       with_sources=args.dedup_counts, count=args.local_shards)
+        return
+
+    # Shard-local outputs go to their own directory, so shards can share target_dir
+    if shard:
+        target_dir = ShardTools.shard_dir(target_dir, shard[0], shard[1])
+
+    if args.resume:
+        Path(target_dir).mkdir(parents=True, exist_ok=True)
+    else:
+        if not args.yes and input(f'WARNING Will clear directory {target_dir} if it exists.\n'
+                                  f'Continue (n and Enter, or just Enter to continue)?').lower() == 'n':
+            print('Chosen to quit.')
+            quit()
+
+        FileTools.ensure_empty_directory(target_dir)
 
+    start = time.perf_counter()
     prefix = datetime.datetime.now().strftime('%y%m%d_%H%M%S')
     command_filename = f'{prefix} Command args.txt'
     FileTools.save_command_args_to_file(vars(args),
                                         save_path=os.path.join(Path(target_dir).parent, command_filename),
                                         to_print=True
                                         )
+    profiler = MemoryProfiler().start() if args.profile_memory else None
     if not is_directory:
-        MetaDataTools.field_descriptors_df_from_file(src_path, target_dir, prefix, to_save=True)
+        df = MetaDataTools.field_descriptors_df_from_file(src_path, target_dir, prefix, to_save=True, engine=engine,
+                                                          split_fields=split_fields, abbreviations=abbreviations,
+                                                          compounds=compounds)
+        # A single file run has no journal, so no cache hits or misses
+        if metrics is not None:
+            metrics.record_file(src_path, len(df), MetaDataTools.field_descriptors_save_path(src_path, target_dir,
+                                                                                             prefix))
     else:
-        df_list, errors = \
-            MetaDataTools.list_of_field_descriptors_dfs_from_files(
-                src_path, target_dir, prefix, to_save=True, suffix=suffix)
+        file_paths = ShardTools.iter_shard_paths(src_path, shard[0], shard[1], suffix) if shard else None
+        # Outputs of a resumed run must have been made with the same options
+        journal = RunJournal(target_dir, options={'engine': engine, 'split_fields': split_fields,
+                                                  'abbreviations_file': args.abbreviations_file,
+                                                  'split_compounds': compounds})
+        results, errors = \
+            MetaDataTools.field_descriptors_dfs_from_files(
+                src_path, target_dir, prefix, to_save=True, suffix=suffix, engine=engine,
+                split_fields=split_fields, abbreviations=abbreviations, compounds=compounds, journal=journal,
+                file_paths=file_paths,
+                isolated=any(value is not None for value in [args.timeout, args.memory_limit, args.workers]),
+                timeout=args.timeout, memory_limit_mb=args.memory_limit, workers=args.workers, metrics=metrics)
 
         for err in errors:
             print(err)
 
         save_name = f'collated{suffix}'
 
-        collated_dfs = MetaDataTools.collate_dfs_from_list(df_list=df_list)
+        collated_dfs = MetaDataTools.collate_dfs_from_list(df_list=[df for file_path, df in results])
+        # Shards are deduplicated as they are merged, so duplicates across shards are counted too
+        if args.deduplicate and not shard:
+            collated_dfs = MetaDataTools.deduplicate_df(collated_dfs, with_counts=args.dedup_counts,
+                                                        with_sources=args.dedup_counts)
 
         if len(collated_dfs) > 0:
             print('First few records in collated DataFrames:\n')
             print(collated_dfs.head())
 
         MetaDataTools.save_df(df=collated_dfs, save_name=save_name, save_dir=target_dir, prefix=prefix)
+        collated_path = os.path.join(target_dir, f'{prefix}{save_name}')
+        if metrics is not None and Path(collated_path).is_file():
+            metrics.increment('bytes_written', os.path.getsize(collated_path))
+
+        if shard:
+            ShardTools.save_shard_timing(target_dir, shard[0], shard[1], seconds=time.perf_counter() - start,
+                                         files=len(results) + len(errors), errors=len(errors),
+                                         rows=len(collated_dfs),
+                                         collated_name=f'{prefix}{save_name}' if Path(collated_path).is_file() else '')
+
+    if profiler is not None:
+        if any(value is not None for value in [args.timeout, args.memory_limit, args.workers]):
+            print('Files processed in isolated worker processes are not covered by the memory profile.')
+        profiler.finish(os.path.join(target_dir, f'{prefix}memory_profile.json'))
+
+
+def main():
+    args = parse_args()
+    # Shards of a local sharded run write their own metrics
+    if not args.metrics_file or args.local_shards:
+        tokenize(args)
+        return
+
+    with RunMetrics(args.metrics_file, job='tokenize_meta_data', interval=args.metrics_interval,
+                    labels={'shard': args.shard} if args.shard else None) as metrics:
+        tokenize(args, metrics)
 
 
 if __name__ == '__main__':